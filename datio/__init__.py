@@ -18,3 +18,21 @@ __homepage__ = "http://github.com/taylortree/datio"
 __copyright__ = "Copyright 2011, Mike Taylor <mike@taylortree.com>"
 __license__ = "MIT"
 
+
+from core import Series
+from core import between
+from core import concat
+from core import merge_iter
+from core import lol2dol
+from core import csv2lol
+from core import csv2dol
+from core import dol2csv
+from core import format_values
+from column import TypedColumn
+from cache import CsvCache
+from dataset import Dataset
+from lazy import scan_csv
+from records import fixed2series
+from records import struct2series
+from panel import Panel
+from memory import summary as memory_summary
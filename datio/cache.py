@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Parse-once cache for csv files.
+
+The parsed and typed columns of a csv file are stored in a binary column
+file within the cache directory.  Entries are keyed by the path, mtime
+and size of the csv file plus the options it was loaded with, so a
+changed file is parsed again.  Options are keyed by their repr, so files
+loaded with functions or lambdas as types or where tests, whose repr is
+only their address, are not cached.  The least recently used entries are
+evicted once the cache grows past its byte limit.
+
+Pass a CsvCache to csv2dol to use it.
+"""
+
+import os
+import types
+import hashlib
+
+try:
+    import cPickle as pickle
+
+except ImportError:
+    import pickle
+
+from colfile import read_columns
+from colfile import write_columns
+
+
+EXTENSION = '.dcol'
+
+
+def _canonical(value):
+    """
+    Returns a string for value that does not depend on dict order.
+    """
+    if isinstance(value, dict):
+        items = sorted((_canonical(k), _canonical(v))
+                       for k, v in value.iteritems())
+        return '{%s}' % (', '.join('%s: %s' % item for item in items),)
+
+    if isinstance(value, (list, tuple)):
+        return '[%s]' % (', '.join(_canonical(x) for x in value),)
+
+    if isinstance(value, (set, frozenset)):
+        return '{%s}' % (', '.join(sorted(_canonical(x) for x in value)),)
+
+    return repr(value)
+
+
+def _stable(value):
+    """
+    Returns True when the repr of value identifies it in any process:
+    values, types and objects with their own repr such as between(), but
+    not functions, methods or objects only known by their address.
+    """
+    if value is None or isinstance(value, (basestring, int, long, float,
+                                           type)):
+        return True
+
+    if isinstance(value, dict):
+        return all(_stable(k) and _stable(v) for k, v in value.iteritems())
+
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return all(_stable(x) for x in value)
+
+    if isinstance(value, (types.FunctionType, types.MethodType,
+                          types.BuiltinFunctionType)):
+        return False
+
+    return type(value).__repr__ is not object.__repr__
+
+
+class CsvCache(object):
+    """
+    Directory of parsed csv files.
+    """
+    def __init__(self, directory, max_bytes=1 << 30):
+        """
+        :param directory: directory holding the cache entries.  Created
+            when missing.
+        :param max_bytes: evict entries once their total size is larger.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _entryname(self, filename, options):
+        """
+        Returns the cache entry filename for a csv file.
+        """
+        path = os.path.abspath(filename)
+        stat = os.stat(path)
+        ident = _canonical((path, stat.st_mtime, stat.st_size, options))
+        digest = hashlib.sha1(ident).hexdigest()
+        return os.path.join(self.directory, ''.join((digest, EXTENSION)))
+
+    def get(self, filename, options):
+        """
+        Returns the (keys, dol, kinds) cached for a csv file, or None.
+        Always None when the options can not be keyed, see _stable().
+
+        :param filename: full path of the csv file.
+        :param options: dict of the options the file is loaded with.
+        """
+        if not _stable(options):
+            return None
+
+        entryname = self._entryname(filename, options)
+        try:
+            keys, dol, meta = read_columns(entryname)
+
+        except (IOError, OSError):
+            return None
+
+        try:
+            os.utime(entryname, None)
+
+        except OSError:
+            pass
+
+        return keys, dol, meta['kinds']
+
+    def put(self, filename, options, keys, dol, kinds):
+        """
+        Stores the (keys, dol, kinds) of a csv file and evicts the least
+        recently used entries over max_bytes.  Entries whose options
+        hold functions, such as lambda types or where tests, are not
+        stored.
+
+        :param filename: full path of the csv file.
+        :param options: dict of the options the file was loaded with.
+        """
+        if not _stable(options):
+            return
+
+        try:
+            pickle.dumps(kinds, pickle.HIGHEST_PROTOCOL)
+
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+
+        entryname = self._entryname(filename, options)
+        write_columns(entryname, keys, dol, meta=dict(kinds=kinds))
+        self.evict()
+
+    def entries(self):
+        """
+        Returns a list of (mtime, size, filename) of the cache entries
+        from least to most recently used.
+        """
+        results = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(EXTENSION):
+                continue
+
+            entryname = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(entryname)
+
+            except OSError:
+                continue
+
+            results.append((stat.st_mtime, stat.st_size, entryname))
+
+        results.sort()
+        return results
+
+    def size(self):
+        """
+        Returns the total bytes of the cache entries.
+        """
+        return sum(size for mtime, size, entryname in self.entries())
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache holds at
+        most max_bytes.
+        """
+        entries = self.entries()
+        total = sum(size for mtime, size, entryname in entries)
+        for mtime, size, entryname in entries:
+            if total <= self.max_bytes:
+                break
+
+            try:
+                os.remove(entryname)
+
+            except OSError:
+                pass
+
+            total -= size
+
+    def clear(self):
+        """
+        Removes every cache entry.
+        """
+        for mtime, size, entryname in self.entries():
+            os.remove(entryname)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Binary column file format.
+
+Each column is stored as its own blob so a reader can load only the
+columns it needs.  The layout of a column file is:
+
+    MAGIC | column blob ... | header | header offset | MAGIC
+
+The header is a pickled dict holding the keys, number of rows, any
+caller supplied meta data and the (offset, length) of every column blob.
+
+A TypedColumn blob holds its raw array and validity mask bytes, other
+columns are pickled lists.
+"""
+
+import os
+import struct
+
+try:
+    import cPickle as pickle
+
+except ImportError:
+    import pickle
+
+from column import TypedColumn
+
+
+MAGIC = 'DATIOCF1'
+_FOOTER = struct.Struct('<Q')
+_TYPED = struct.Struct('<cQQ')
+_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+def _encode(column):
+    """
+    Returns the blob for a column of values.
+    """
+    if isinstance(column, TypedColumn):
+        data = column.data.tostring()
+        valid = column.nullmask() or ''
+        header = _TYPED.pack(column.typecode, len(data), len(valid))
+        return ''.join(('T', header, data, str(valid)))
+
+    return ''.join(('P', pickle.dumps(list(column), _PROTOCOL)))
+
+
+def _decode(blob):
+    """
+    Returns the column of values stored within blob.
+    """
+    if blob[0] == 'P':
+        return pickle.loads(blob[1:])
+
+    start = 1 + _TYPED.size
+    typecode, datasize, validsize = _TYPED.unpack(blob[1:start])
+    column = TypedColumn(typecode)
+    column.data.fromstring(blob[start:start + datasize])
+    if validsize:
+        column.valid = bytearray(blob[start + datasize:])
+
+    return column
+
+
+def write_columns(filename, keys, dol, rows=None, meta=None, sync=False):
+    """
+    Writes columns to a binary column file.
+
+    The file is written to a temporary name and renamed into place so
+    readers never see a partial file.
+
+    :param filename: full path of filename to write.
+    :param keys: column names in the order to store them.
+    :param dol: dict of lists holding the column values.
+    :param rows: (optional) number of rows. Defaults to the length of
+        the first column.
+    :param meta: (optional) dict of extra values to keep in the header.
+    :param sync: set to True to fsync the file before it is renamed.
+    """
+    if rows is None:
+        rows = len(dol[keys[0]]) if keys else 0
+
+    tmpname = '%s.%d.tmp' % (filename, os.getpid())
+    offsets = []
+    with open(tmpname, 'wb') as f1:
+        f1.write(MAGIC)
+        for key in keys:
+            blob = _encode(dol[key])
+            offsets.append((f1.tell(), len(blob)))
+            f1.write(blob)
+
+        header = dict(keys=list(keys), rows=rows, meta=meta or {},
+                      offsets=offsets)
+        hdroffset = f1.tell()
+        f1.write(pickle.dumps(header, _PROTOCOL))
+        f1.write(_FOOTER.pack(hdroffset))
+        f1.write(MAGIC)
+
+        if sync:
+            f1.flush()
+            os.fsync(f1.fileno())
+
+    os.rename(tmpname, filename)
+
+
+def read_header(f1):
+    """
+    Returns the header dict of an open column file.
+
+    :param f1: column file opened in binary mode.
+    """
+    f1.seek(0)
+    if f1.read(len(MAGIC)) != MAGIC:
+        msg = "'%s' is not a column file" % (getattr(f1, 'name', f1),)
+        raise IOError(msg)
+
+    f1.seek(-(_FOOTER.size + len(MAGIC)), os.SEEK_END)
+    hdroffset, = _FOOTER.unpack(f1.read(_FOOTER.size))
+    if f1.read(len(MAGIC)) != MAGIC:
+        msg = "'%s' is truncated" % (getattr(f1, 'name', f1),)
+        raise IOError(msg)
+
+    f1.seek(hdroffset)
+    length = os.fstat(f1.fileno()).st_size - hdroffset
+    length -= _FOOTER.size + len(MAGIC)
+    return pickle.loads(f1.read(length))
+
+
+def read_columns(filename, keys=None):
+    """
+    Returns a tuple of (keys, dol, meta) from a binary column file.
+
+    :param filename: full path of filename to read.
+    :param keys: (optional) only load these columns.  Missing columns
+        are returned as lists of None.
+    """
+    dol = {}
+    with open(filename, 'rb') as f1:
+        header = read_header(f1)
+        allkeys = header['keys']
+        offsets = dict(zip(allkeys, header['offsets']))
+
+        if keys is None:
+            keys = allkeys
+
+        for key in keys:
+            if key not in offsets:
+                dol[key] = [None] * header['rows']
+                continue
+
+            offset, length = offsets[key]
+            f1.seek(offset)
+            dol[key] = _decode(f1.read(length))
+
+    return list(keys), dol, header['meta']
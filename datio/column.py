@@ -0,0 +1,719 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Typed columns for Series.
+
+A TypedColumn keeps its values in an array.array and its missing values
+in a validity mask: a bytearray holding 1 for a valid row and 0 for a
+null row.  The mask is None while every row is valid.  Null rows hold 0
+in the array, so bulk operations can run over the array and skip nulls
+through the mask with itertools.compress instead of testing each value
+for None.
+
+When NumPy is installed a TypedColumn converts to an ndarray view of its
+array without copying, and an ndarray can be wrapped as a TypedColumn
+without copying.  A wrapped ndarray is copied into an array the first
+time the column changes length.
+"""
+
+from array import array
+import sys
+from itertools import chain
+from itertools import compress
+from itertools import izip
+
+try:
+    import numpy
+
+except ImportError:
+    numpy = None
+
+
+TYPECODES = {float: 'd', int: 'l', long: 'l'}
+
+ARRAY_TYPECODES = 'bBhHiIlLfd'
+
+VALID = b'\x01'
+NULL = b'\x00'
+
+
+def typecode_of(atype):
+    """
+    Returns the array typecode for a type such as float or int, or the
+    typecode itself.
+    """
+    return TYPECODES.get(atype, atype)
+
+
+class TypedColumn(object):
+    """
+    Column of values stored in a typed array with a validity mask.
+
+    Usage:
+    >>> closes = TypedColumn('d', [32.0, None, 34.0])
+    >>> closes
+    [32.0, None, 34.0]
+    >>> closes.nullcount()
+    1
+    >>> closes.append(35)
+    >>> sum(closes.compressed())
+    101.0
+    """
+    def __init__(self, typecode, values=()):
+        """
+        :param typecode: array typecode of the values such as 'd' or 'l'.
+        :param values: (optional) values to initialize the column with.
+        """
+        self.typecode = typecode
+        self.data = array(typecode)
+        self.valid = None
+        self.extend(values)
+
+    @classmethod
+    def wrap(cls, typecode, data, valid=None):
+        """
+        Returns a TypedColumn using data as its values without copying.
+
+        :param typecode: array typecode of the values.
+        :param data: array.array or 1-dimensional ndarray of the values.
+        :param valid: (optional) validity mask bytearray.
+        """
+        column = cls(typecode)
+        column.data = data
+        column.valid = valid
+        return column
+
+    def _own(self):
+        """
+        Copies wrapped values into an array before the column grows.
+        """
+        if not isinstance(self.data, array):
+            data = array(self.typecode)
+            data.fromstring(self.data.tostring())
+            self.data = data
+
+    def __array__(self, dtype=None):
+        """
+        Returns an ndarray view of the values.  Null rows hold 0.
+
+        The view shares memory with the column, so do not append to the
+        column while the view is in use.
+        """
+        if numpy is None:
+            msg = "NumPy is not installed"
+            raise ImportError(msg)
+
+        view = self.data
+        if not isinstance(view, numpy.ndarray):
+            view = numpy.frombuffer(view, self.typecode)
+
+        if dtype is not None:
+            return view.astype(dtype)
+
+        return view
+
+    def __len__(self):
+        """
+        Returns number of values in your column.
+        """
+        return len(self.data)
+
+    def __iter__(self):
+        """
+        Returns an iterator of the values with None for null rows.
+        """
+        if self.valid is None:
+            return iter(self.data)
+
+        return (x if v else None for x, v in izip(self.data, self.valid))
+
+    def __getitem__(self, index):
+        """
+        Returns the value at index, None for a null row.  A slice
+        returns a list of values.
+        """
+        if isinstance(index, slice):
+            if self.valid is None:
+                return self.data[index].tolist()
+
+            return [x if v else None for x, v in
+                    izip(self.data[index], self.valid[index])]
+
+        if self.valid is not None and not self.valid[index]:
+            return None
+
+        return self.data[index]
+
+    def __setitem__(self, index, value):
+        """
+        Sets the value at index.  Setting None makes the row null.
+        """
+        if isinstance(index, slice):
+            if index == slice(None):
+                if value is self:
+                    return
+
+                values = value
+
+            else:
+                values = self.tolist()
+                values[index] = value
+
+            column = TypedColumn(self.typecode, values)
+            self.data, self.valid = column.data, column.valid
+            return
+
+        if value is None:
+            self.data[index] = 0
+            self._mask()[index] = 0
+            return
+
+        self.data[index] = value
+        if self.valid is not None:
+            self.valid[index] = 1
+
+    def __eq__(self, other):
+        """
+        Returns True if other holds the same values in the same order.
+        """
+        if isinstance(other, TypedColumn):
+            return (self.typecode == other.typecode and
+                    self.nullmask() == other.nullmask() and
+                    self.data.tostring() == other.data.tostring())
+
+        try:
+            return len(self) == len(other) and self.tolist() == list(other)
+
+        except TypeError:
+            return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    def _mask(self):
+        """
+        Returns the validity mask, creating it when every row is valid.
+        """
+        if self.valid is None:
+            self.valid = bytearray(VALID) * len(self.data)
+
+        return self.valid
+
+    def append(self, value):
+        """
+        Appends a value to the end of your column.
+        """
+        self._own()
+        if value is None:
+            self._mask()
+            self.data.append(0)
+            self.valid.append(0)
+            return
+
+        self.data.append(value)
+        if self.valid is not None:
+            self.valid.append(1)
+
+    def extend(self, values):
+        """
+        Appends many values to the end of your column.  Typed columns
+        with the same typecode are copied as a block.
+        """
+        self._own()
+        if isinstance(values, TypedColumn) and \
+           values.typecode == self.typecode:
+            if values.valid is not None:
+                self._mask().extend(values.valid)
+
+            elif self.valid is not None:
+                self.valid.extend(VALID * len(values))
+
+            if isinstance(values.data, array):
+                self.data.extend(values.data)
+
+            else:
+                self.data.fromstring(values.data.tostring())
+
+            return
+
+        if not isinstance(values, list):
+            values = list(values)
+
+        size = len(values)
+        nulls = values.count(None)
+        if not nulls:
+            self.data.extend(array(self.typecode, values))
+            if self.valid is not None:
+                self.valid.extend(VALID * size)
+
+            return
+
+        if nulls == size:
+            newdata = array(self.typecode, [0]) * size
+            newvalid = bytearray(size)
+
+        else:
+            newdata = array(self.typecode,
+                            [0 if x is None else x for x in values])
+            newvalid = bytearray([x is not None for x in values])
+
+        self._mask().extend(newvalid)
+        self.data.extend(newdata)
+
+    def insert(self, index, value):
+        """
+        Inserts a value before index.
+        """
+        self._own()
+        if value is None:
+            self._mask().insert(index, 0)
+            self.data.insert(index, 0)
+            return
+
+        if self.valid is not None:
+            self.valid.insert(index, 1)
+
+        self.data.insert(index, value)
+
+    def tolist(self):
+        """
+        Returns a list of the values with None for null rows.
+        """
+        if self.valid is None:
+            return self.data.tolist()
+
+        return [x if v else None for x, v in
+                izip(self.data.tolist(), self.valid)]
+
+    def nullcount(self):
+        """
+        Returns the number of null rows.
+        """
+        if self.valid is None:
+            return 0
+
+        return self.valid.count(NULL)
+
+    def nullmask(self):
+        """
+        Returns the validity mask, or None if every row is valid.  A mask
+        made only of valid rows is returned as None as well.
+        """
+        if self.valid is None or not self.valid.count(NULL):
+            return None
+
+        return self.valid
+
+    def compressed(self):
+        """
+        Returns an iterator of the valid values.
+        """
+        if self.valid is None:
+            return iter(self.data)
+
+        return compress(self.data, self.valid)
+
+
+class RingColumn(object):
+    """
+    Column holding only its last capacity values in a circular buffer.
+
+    Appending to a full column overwrites its oldest value, so an append
+    never copies the column and its memory never grows.  Indexes are
+    logical: 0 is the oldest value and -1 the newest.  With a typecode
+    the values are kept in an array with a validity mask, otherwise in
+    a list.
+
+    Usage:
+    >>> closes = RingColumn(3, 'd', [32.0, 33.0])
+    >>> closes.extend([34.0, None])
+    >>> closes
+    [33.0, 34.0, None]
+    >>> closes[-2]
+    34.0
+    """
+    def __init__(self, capacity, typecode=None, values=()):
+        """
+        :param capacity: number of values to keep.
+        :param typecode: (optional) array typecode such as 'd' or 'l'.
+        :param values: (optional) values to initialize the column with.
+        """
+        if capacity < 1:
+            msg = "capacity must be at least 1"
+            raise ValueError(msg)
+
+        self.capacity = capacity
+        self.typecode = typecode
+        if typecode is None:
+            self.data = [None] * capacity
+            self.valid = None
+
+        else:
+            self.data = array(typecode, [0]) * capacity
+            self.valid = bytearray(capacity)
+
+        self.start = 0
+        self.size = 0
+        self.extend(values)
+
+    def _cell(self, index):
+        """
+        Returns the buffer index of a logical index.
+        """
+        if index < 0:
+            index += self.size
+
+        if not 0 <= index < self.size:
+            msg = "ring index out of range"
+            raise IndexError(msg)
+
+        return (self.start + index) % self.capacity
+
+    def _put(self, cell, value):
+        """
+        Stores a value in a cell of the buffer.
+        """
+        if self.valid is None:
+            self.data[cell] = value
+
+        elif value is None:
+            self.data[cell] = 0
+            self.valid[cell] = 0
+
+        else:
+            self.data[cell] = value
+            self.valid[cell] = 1
+
+    def __len__(self):
+        """
+        Returns number of values in your column.
+        """
+        return self.size
+
+    def __iter__(self):
+        """
+        Returns an iterator of the values from the oldest to the newest.
+        """
+        stop = self.start + self.size
+        first = slice(self.start, min(stop, self.capacity))
+        second = slice(0, max(stop - self.capacity, 0))
+        if self.valid is None:
+            return chain(self.data[first], self.data[second])
+
+        return (x if v else None for x, v in
+                chain(izip(self.data[first], self.valid[first]),
+                      izip(self.data[second], self.valid[second])))
+
+    def __getitem__(self, index):
+        """
+        Returns the value at a logical index.  A slice returns a list.
+        """
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.size)
+            if step == 1:
+                return self.tolist()[start:stop]
+
+            return [self[i] for i in xrange(start, stop, step)]
+
+        cell = self._cell(index)
+        if self.valid is not None and not self.valid[cell]:
+            return None
+
+        return self.data[cell]
+
+    def __setitem__(self, index, value):
+        """
+        Sets the value at a logical index.  Slice assignment replaces the
+        values, keeping the last capacity of them.
+        """
+        if isinstance(index, slice):
+            values = value
+            if index != slice(None):
+                values = self.tolist()
+                values[index] = value
+
+            column = RingColumn(self.capacity, self.typecode, values)
+            self.data, self.valid = column.data, column.valid
+            self.start, self.size = column.start, column.size
+            return
+
+        self._put(self._cell(index), value)
+
+    def __eq__(self, other):
+        """
+        Returns True if other holds the same values in the same order.
+        """
+        try:
+            return len(self) == len(other) and self.tolist() == list(other)
+
+        except TypeError:
+            return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    def __sizeof__(self):
+        """
+        Returns the bytes used by the column and its buffers.
+        """
+        size = object.__sizeof__(self) + sys.getsizeof(self.data)
+        if self.valid is not None:
+            size += sys.getsizeof(self.valid)
+
+        return size
+
+    def append(self, value):
+        """
+        Appends a value, dropping the oldest value of a full column.
+        """
+        if self.size < self.capacity:
+            self._put((self.start + self.size) % self.capacity, value)
+            self.size += 1
+
+        else:
+            self._put(self.start, value)
+            self.start = (self.start + 1) % self.capacity
+
+    def extend(self, values):
+        """
+        Appends many values, dropping the oldest values as needed.
+        """
+        if not isinstance(values, list):
+            values = list(values)
+
+        if len(values) > self.capacity:
+            self.start = self.size = 0
+            values = values[-self.capacity:]
+
+        for value in values:
+            self.append(value)
+
+    def count(self, value):
+        """
+        Returns the number of values equal to value.
+        """
+        return self.tolist().count(value)
+
+    def tolist(self):
+        """
+        Returns a list of the values from the oldest to the newest.
+        """
+        return list(self)
+
+
+def to_numpy(column, masked=False):
+    """
+    Returns an ndarray of a column.  A TypedColumn returns a view of its
+    values without copying, other columns are copied.
+
+    :param column: TypedColumn or list of values.
+    :param masked: set to True to return a numpy.ma.MaskedArray masking
+        the null rows of a TypedColumn.
+    """
+    if numpy is None:
+        msg = "NumPy is not installed"
+        raise ImportError(msg)
+
+    if not isinstance(column, TypedColumn):
+        return numpy.array(column)
+
+    view = column.__array__()
+    if not masked:
+        return view
+
+    mask = column.nullmask()
+    if mask is None:
+        return numpy.ma.MaskedArray(view)
+
+    valid = numpy.frombuffer(mask, numpy.uint8)
+    return numpy.ma.MaskedArray(view, mask=valid == 0)
+
+
+def from_numpy(values):
+    """
+    Returns a TypedColumn wrapping a 1-dimensional ndarray without
+    copying.  Arrays that are not contiguous or whose dtype has no array
+    typecode are copied into a list.
+
+    :param values: 1-dimensional ndarray.
+    """
+    if values.ndim != 1:
+        msg = "only 1-dimensional arrays can be a column"
+        raise ValueError(msg)
+
+    typecode = values.dtype.char
+    if typecode in ARRAY_TYPECODES and values.flags.c_contiguous and \
+       values.dtype.isnative:
+        return TypedColumn.wrap(typecode, values)
+
+    return values.tolist()
+
+
+def take(column, positions):
+    """
+    Returns a new column holding the rows of column at positions.  A
+    TypedColumn returns a TypedColumn of the same typecode.
+
+    :param column: TypedColumn or list of values.
+    :param positions: list of row indexes.
+    """
+    if not isinstance(column, TypedColumn):
+        return map(column.__getitem__, positions)
+
+    data = array(column.typecode, map(column.data.__getitem__, positions))
+    valid = column.nullmask()
+    if valid is not None:
+        valid = bytearray(map(valid.__getitem__, positions))
+
+    return TypedColumn.wrap(column.typecode, data, valid)
+
+
+def concat(columns, sizes):
+    """
+    Returns one column holding columns one after the other.  The column
+    is allocated once at its final length and typed columns are copied
+    in blocks.  A TypedColumn is returned when every column is typed
+    with the same typecode.
+
+    :param columns: list of TypedColumns, lists of values, or None for
+        a block of null rows.
+    :param sizes: number of rows of each column.
+    """
+    total = sum(sizes)
+    typecodes = set(column.typecode if isinstance(column, TypedColumn)
+                    else None for column in columns if column is not None)
+    if len(typecodes) != 1 or None in typecodes:
+        results = [None] * total
+        start = 0
+        for column, size in izip(columns, sizes):
+            if column is not None:
+                results[start:start + size] = column
+
+            start += size
+
+        return results
+
+    typecode = typecodes.pop()
+    data = array(typecode, [0]) * total
+    valid = None
+    if any(column is None or column.nullmask() is not None
+           for column in columns):
+        valid = bytearray(VALID) * total
+
+    start = 0
+    for column, size in izip(columns, sizes):
+        stop = start + size
+        if column is None:
+            valid[start:stop] = bytearray(size)
+
+        else:
+            block = column.data
+            if not isinstance(block, array):
+                block = array(typecode, block.tostring())
+
+            data[start:stop] = block
+            mask = column.nullmask()
+            if mask is not None:
+                valid[start:stop] = mask
+
+        start = stop
+
+    return TypedColumn.wrap(typecode, data, valid)
+
+
+def insert_rows(column, positions, values):
+    """
+    Inserts values[i] before row positions[i] of a column in place.  The
+    positions are rows of the column before any insert and must not
+    decrease.  The rows between positions are copied in blocks.
+
+    :param column: TypedColumn or list of values.
+    :param positions: list of row indexes.
+    :param values: list of the values to insert.
+    """
+    if isinstance(column, TypedColumn):
+        column._own()
+        new = TypedColumn(column.typecode, values)
+        data, newdata = column.data, new.data
+        merged = array(column.typecode)
+        valid = None
+        if column.valid is not None or new.valid is not None:
+            valid = bytearray()
+            oldvalid = column._mask()
+            newvalid = new._mask()
+
+        start = 0
+        for i, position in enumerate(positions):
+            merged.extend(data[start:position])
+            merged.append(newdata[i])
+            if valid is not None:
+                valid.extend(oldvalid[start:position])
+                valid.append(newvalid[i])
+
+            start = position
+
+        merged.extend(data[start:])
+        if valid is not None:
+            valid.extend(oldvalid[start:])
+
+        column.data, column.valid = merged, valid
+        return
+
+    merged = []
+    start = 0
+    for position, value in izip(positions, values):
+        merged.extend(column[start:position])
+        merged.append(value)
+        start = position
+
+    merged.extend(column[start:])
+    column[:] = merged
+
+
+def data_and_mask(column):
+    """
+    Returns a tuple of (data, mask) for a column.  Nulls hold 0 in data
+    and mask is None when every row is valid.
+
+    :param column: TypedColumn or list of values.
+    """
+    if isinstance(column, TypedColumn):
+        return column.data, column.nullmask()
+
+    if None not in column:
+        return column, None
+
+    data = [0 if x is None else x for x in column]
+    return data, bytearray([x is not None for x in column])
+
+
+def valid_values(column):
+    """
+    Returns an iterator of the non null values of a column.
+
+    :param column: TypedColumn or list of values.
+    """
+    if isinstance(column, TypedColumn):
+        return column.compressed()
+
+    return (x for x in column if x is not None)
+
+
+def _testit(verbose=None):
+    import doctest
+    doctest.testmod(verbose=verbose)
+
+if __name__ == "__main__":
+    _testit()
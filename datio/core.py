@@ -16,7 +16,61 @@ Terminology used
     * lol -- list of lists or tuples
 """
 
+import os
+import io
+import re
 import csv
+import bz2
+import bisect
+import gzip
+import Queue
+import heapq
+import random
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from operator import itemgetter
+from itertools import imap
+from itertools import chain
+from itertools import compress
+from itertools import ifilter
+from itertools import izip
+from itertools import islice
+
+try:
+    import lzma
+
+except ImportError:
+    try:
+        from backports import lzma
+
+    except ImportError:
+        lzma = None
+
+import counts
+import journal
+import memory
+import parallel
+import resample
+import rolling
+import scans
+from column import RingColumn
+from column import TypedColumn
+from column import concat as concat_columns
+from column import from_numpy
+from column import insert_rows
+from column import take
+from column import to_numpy
+from column import typecode_of
+from column import valid_values
+
+
+BUFFER_SIZE = 1 << 20
+CHUNK_SIZE = 10000
+SAMPLE_SIZE = 1000
+COMPRESSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+MAGICS = (('\x1f\x8b', 'gzip'), ('BZh', 'bz2'), ('\xfd7zXZ\x00', 'xz'))
+MAGIC_SIZE = 6
 
 
 class Series(object):
@@ -84,17 +138,33 @@ class Series(object):
     >>> series.closes
     [38, 34.0, 33.0, 32.0]
     """
-    def __init__(self, *keys):
+    def __init__(self, *keys, **kwargs):
         """
+        :param *keys: names for your columns.
+        :param capacity: (optional) keep only the last capacity rows.
+            Columns are circular buffers, so appending to a full series
+            drops its oldest row without copying.  series[-1] is the
+            newest row.
         """
+        capacity = kwargs.pop('capacity', None)
+        if kwargs:
+            msg = "unexpected keyword arguments %s" % (sorted(kwargs),)
+            raise TypeError(msg)
+
+        self._capacity = capacity
         self._keys = []
         self._barcnt = 0
+        self._journal = None
+        self._indexes = {}
+        self._sortkey = None
+        self._scans = []
 
         if not keys:
             msg = "Missing *keys to Series"
             raise ValueError(msg)
 
         self._newkeys(*keys)
+        memory.register(self)
 
     def _newkeys(self, *keys):
         """
@@ -114,13 +184,27 @@ class Series(object):
                 raise KeyError(msg)
 
             self._keys.append(newkey)
-            self.__dict__[newkey] = []
+            self.__dict__[newkey] = self._newcol()
+
+    def _newcol(self, typecode=None, values=()):
+        """
+        Returns a new column of values: a RingColumn for a series with a
+        capacity, otherwise a TypedColumn with a typecode or a list.
+        """
+        if self._capacity is not None:
+            return RingColumn(self._capacity, typecode, values)
+
+        if typecode is not None:
+            return TypedColumn(typecode, values)
+
+        return list(values)
 
     def clear(self):
         """
         Initialize class dict with any previously defined attributes.
         """
         self._barcnt = 0
+        self._indexes.clear()
         values = self.__dict__
         for key in self._keys:
             values[key][:] = []
@@ -173,6 +257,24 @@ class Series(object):
             newargs = self._keys
 
         dol = lol2dol(values, *newargs, **kwargs)
+        self.from_dol(dol)
+
+    def from_dol(self, dol, **kwargs):
+        """
+        Loads the series from a dict of lists.
+
+        :param dol: dict of lists such as the one returned by csv2dol.
+            TypedColumns are copied into TypedColumns of the same
+            typecode.
+        :param **kwargs: map series key to key of dol.  Defaults to the
+            series keys found in dol.
+        """
+        self._barcnt = 0
+        self._indexes.clear()
+
+        if kwargs:
+            dol = dict((label, dol[key]) for label, key in kwargs.iteritems()
+                       if key in dol)
 
         barcnt = 0
         if dol:
@@ -181,7 +283,13 @@ class Series(object):
         keyfound = False
         for key in self._keys:
             if key in dol:
-                self.__dict__[key][:] = dol[key]
+                values = dol[key]
+                if isinstance(values, TypedColumn):
+                    self.__dict__[key] = self._newcol(values.typecode, values)
+
+                else:
+                    self.__dict__[key][:] = values
+
                 keyfound = True
 
             else:
@@ -189,8 +297,10 @@ class Series(object):
 
         if keyfound:
             self._barcnt = barcnt
+            if self._capacity is not None:
+                self._barcnt = min(barcnt, self._capacity)
 
-    def initcol(self, key, value=None):
+    def initcol(self, key, value=None, typecode=None):
         """
         Initialize a column to a default value. Can be a new column or
         an existing column in your series.
@@ -198,13 +308,25 @@ class Series(object):
         :param key: name of new or existing column for the series.
             * new column will be appended to the series.
         :param value: default value to initialize the column with.
+        :param typecode: (optional) array typecode such as 'd' to store
+            the column as a TypedColumn.
         """
-        if key in self.__dict__:
-            self.__dict__[key][:] = [value] * self._barcnt
+        self._indexes.pop(key, None)
+        values = [value] * self._barcnt
+        if typecode is not None:
+            values = self._newcol(typecode_of(typecode), values)
 
-        else:
+        elif key in self.__dict__:
+            self.__dict__[key][:] = values
+            return
+
+        elif self._capacity is not None:
+            values = self._newcol(None, values)
+
+        if key not in self.__dict__:
             self._keys.append(key)
-            self.__dict__[key] = [value] * self._barcnt
+
+        self.__dict__[key] = values
 
     def appendcol(self, key, values):
         """
@@ -221,6 +343,13 @@ class Series(object):
             msg = "values mismatch length of series."
             raise ValueError(msg)
 
+        if self._capacity is not None and not isinstance(values, RingColumn):
+            typecode = None
+            if isinstance(values, TypedColumn):
+                typecode = values.typecode
+
+            values = self._newcol(typecode, values)
+
         self._keys.append(key)
         self.__dict__[key] = values
 
@@ -232,18 +361,72 @@ class Series(object):
         :param *args: positional key names of value columns.
         :param **kwargs: map series key names to value position or key name.
         """
-        newargs = args
-        if not args and not kwargs:
-            newargs = self._keys
+        self.extend([values], *args, **kwargs)
 
-        dol = lol2dol([values], *newargs, **kwargs)
+    def extend(self, values, *args, **kwargs):
+        """
+        Append many rows to your series.
 
-        barcnt = 0
-        if dol:
-            barcnt = len(dol[dol.keys()[0]])
+        :param values: list of lists or dicts, or a Series, to append to
+            end of series.  The columns of a Series are copied by key.
+        :param *args: positional key names of value columns.
+        :param **kwargs: map series key names to value position or key name.
+        """
+        if isinstance(values, Series):
+            dol = dict((k, values.__dict__[k]) for k in values._keys)
+            barcnt = len(values)
+
+        else:
+            newargs = args
+            if not args and not kwargs:
+                newargs = self._keys
+
+            dol = lol2dol(values, *newargs, **kwargs)
+
+            barcnt = 0
+            if dol:
+                barcnt = len(dol[dol.keys()[0]])
+
+        self._append_dol(dol, barcnt)
+
+    def _append_dol(self, dol, barcnt):
+        """
+        Extends your series with barcnt values from dol and journals them.
+        """
+        if self._extend_dol(dol, barcnt) and self._journal is not None:
+            record = dict((k, list(dol[k])) for k in self._keys if k in dol)
+            self._journal.write(barcnt, record)
+            if self._journal.compact_due():
+                self.compact_journal()
+
+    def _extend_dol(self, dol, barcnt):
+        """
+        Extends every column with barcnt values from dol.  Columns missing
+        from dol are padded with None.  Returns True if any column was
+        found in dol.
+        """
+        dol = self._typed_dol(dol)
+        sortkey = self._sortkey
+        if sortkey is not None and barcnt:
+            if sortkey not in dol:
+                msg = "'%s' is kept sorted and missing from values" % (
+                    sortkey,)
+                raise KeyError(msg)
+
+            order = sorted(xrange(barcnt), key=dol[sortkey].__getitem__)
+            if order != range(barcnt):
+                dol = dict((k, take(v, order)) for k, v in dol.iteritems())
+
+            last = self._barcnt - 1
+            if last >= 0 and dol[sortkey][0] < self.__dict__[sortkey][last]:
+                return self._insert_dol(dol, barcnt)
 
+        scanned = set(dest for key, dest, state in self._scans)
         keyfound = False
         for key in self._keys:
+            if key in scanned:
+                continue
+
             if key in dol:
                 self.__dict__[key].extend(dol[key])
                 keyfound = True
@@ -253,6 +436,203 @@ class Series(object):
 
         if keyfound:
             self._barcnt += barcnt
+            if self._capacity is not None and self._barcnt > self._capacity:
+                self._barcnt = self._capacity
+                self._indexes.clear()
+
+            # scans see every row of the batch, including rows a capacity
+            # has already dropped from their column.
+            batch = dict(dol)
+            for key, dest, state in self._scans:
+                values = batch.get(key)
+                if values is None:
+                    values = [None] * barcnt
+
+                batch[dest] = state.update(values)
+                self.__dict__[dest].extend(batch[dest])
+
+        return keyfound
+
+    def _typed_dol(self, dol):
+        """
+        Returns dol with the values of your typed columns converted to
+        TypedColumns, so a value a typed column rejects raises before any
+        column is extended.
+        """
+        keys = set(self._keys)
+        typed = {}
+        for key, values in dol.iteritems():
+            typecode = None
+            if key in keys:
+                typecode = getattr(self.__dict__[key], 'typecode', None)
+
+            if typecode is not None and not (
+                    isinstance(values, TypedColumn) and
+                    values.typecode == typecode):
+                values = TypedColumn(typecode, values)
+
+            typed[key] = values
+
+        return typed
+
+    def _insert_dol(self, dol, barcnt):
+        """
+        Inserts barcnt values from dol, sorted by the kept sorted column,
+        in order.  A single row is placed by bisection, a batch is merged
+        with your series in one pass.  New rows go after rows holding an
+        equal value.
+        """
+        column = self.__dict__[self._sortkey]
+        values = dol[self._sortkey]
+        if barcnt == 1:
+            position = bisect.bisect_right(column, values[0])
+            for k in self._keys:
+                self.__dict__[k].insert(position,
+                                        dol[k][0] if k in dol else None)
+
+        else:
+            positions = []
+            position = 0
+            for value in values:
+                position = bisect.bisect_right(column, value, position)
+                positions.append(position)
+
+            for k in self._keys:
+                insert_rows(self.__dict__[k], positions,
+                            dol[k] if k in dol else [None] * barcnt)
+
+        self._barcnt += barcnt
+        self._indexes.clear()
+        for key, dest, state in self._scans:
+            state.reset()
+            self.__dict__[dest][:] = state.update(self.__dict__[key])
+
+        return True
+
+    def keep_sorted(self, key):
+        """
+        Sorts your series by a column and keeps it sorted: append and
+        extend insert the new rows in order instead of at the end.
+        Sorting by another column stops it.
+
+        A journaled series is compacted so recover() keeps it sorted.
+
+        :param key: name of your column, or None to append at the end
+            again.
+        """
+        if key is not None:
+            self._getcol(key)
+            if self._capacity is not None:
+                msg = "a series with a capacity can not be kept sorted"
+                raise ValueError(msg)
+
+            if self._barcnt:
+                self.sort(key)
+
+        self._sortkey = key
+        if self._journal is not None:
+            self.compact_journal()
+
+    def attach_journal(self, path, sync_every=64, sync_interval=1.0,
+                       compact_every=None):
+        """
+        Journal every append and extend made to your series.
+
+        The current values of the series are written to a snapshot and
+        each later append writes a compact record to the journal at path.
+        Use Series.recover(path) to rebuild the series after a crash.
+
+        Only appends are journaled.  Call compact_journal() after other
+        changes (format, sort, initcol, ...) so they reach the snapshot.
+
+        :param path: full path of the journal file.
+        Each record reaches the operating system as it is written, so a
+        crash of the process loses no appends.  The fsync to disk is
+        batched.
+
+        :param sync_every: fsync the journal after this many records.
+        :param sync_interval: fsync the journal when this many seconds have
+            passed since the last fsync, checked on the next append.
+        :param compact_every: (optional) compact the journal into a new
+            snapshot after this many records.
+        """
+        self.close_journal()
+        self._journal = journal.Journal(path, sync_every, sync_interval,
+                                        compact_every)
+        self.compact_journal()
+
+    def compact_journal(self):
+        """
+        Write all values of your series to the journal snapshot and
+        truncate the journal.
+        """
+        if self._journal is None:
+            msg = "no journal attached to series"
+            raise ValueError(msg)
+
+        dol = dict((k, self.__dict__[k]) for k in self._keys)
+        for k, column in dol.iteritems():
+            if isinstance(column, RingColumn) and column.typecode:
+                dol[k] = TypedColumn(column.typecode, column)
+
+        self._journal.compact(self._keys, dol, self._barcnt,
+                              dict(sortkey=self._sortkey,
+                                   capacity=self._capacity))
+
+    def close_journal(self):
+        """
+        Sync and detach the journal from your series.
+        """
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    @classmethod
+    def recover(cls, path, sync_every=64, sync_interval=1.0,
+                compact_every=None):
+        """
+        Returns the series rebuilt from a journal snapshot and the records
+        written after it.  The journal is attached to the new series so
+        appends carry on where they left off.
+
+        :param path: full path of the journal file.
+        :param sync_every: fsync the journal after this many records.
+        :param sync_interval: fsync the journal when this many seconds have
+            passed since the last fsync.
+        :param compact_every: (optional) compact the journal into a new
+            snapshot after this many records.
+        """
+        keys, dol, barcnt, lastseq, meta = journal.read_snapshot(path)
+
+        series = cls(*keys, capacity=meta.get('capacity'))
+        for key, column in dol.iteritems():
+            if series._capacity is not None:
+                column = series._newcol(getattr(column, 'typecode', None),
+                                        column)
+
+            series.__dict__[key] = column
+
+        series._barcnt = barcnt
+        series._sortkey = meta.get('sortkey')
+
+        for lastseq, barcnt, dol, rows in journal.read_records(path,
+                                                               lastseq):
+            for key in dol:
+                if key not in series.__dict__:
+                    series.initcol(key)
+
+            if rows is None:
+                series._extend_dol(dol, barcnt)
+                continue
+
+            for key, values in dol.iteritems():
+                column = series.__dict__[key]
+                for row, value in izip(rows, values):
+                    column[row] = value
+
+        series._journal = journal.Journal(path, sync_every, sync_interval,
+                                          compact_every, lastseq)
+        return series
 
     def format(self, key, atype, aformat=None):
         """
@@ -267,135 +647,1502 @@ class Series(object):
             raise KeyError(msg)
 
         values = self.__dict__[key]
+        results = format_values(values, atype, aformat)
+        self._indexes.pop(key, None)
+
+        try:
+            values[:] = results
 
-        self.__dict__[key][:] = format_values(values, atype, aformat)
+        except TypeError:
+            self.__dict__[key] = self._newcol(None, results)
 
-    def sort(self, *args, **kwargs):
+    def astype(self, key, atype):
         """
-        Sort the series in place.
+        Store a column of your series as a TypedColumn.  Missing values
+        are kept in the column's validity mask.
 
-        :param args: keys of your columns to sort by.
-        :param kwargs: options you can use in python sort.
-            * order can be passed with 'd' for descending or
-              'a' for ascending (default).
+        :param key: name of your column to store.
+        :param atype: array typecode such as 'd' or 'l', or float or int.
+            None stores the column as a list again.
         """
-        keys = [self.__dict__[key] for key in args]
+        values = self._getcol(key)
+        if atype is None:
+            self.__dict__[key] = self._newcol(None, values)
 
-        uids = range(self._barcnt)
-        keys.append(uids)
+        else:
+            self.__dict__[key] = self._newcol(typecode_of(atype), values)
 
-        rows = zip(*keys)
+    def memory_usage(self, deep=False, sample=memory.SAMPLE_SIZE):
+        """
+        Returns a dict of the number of bytes used by each column of your
+        series.  Typed columns count their array and validity mask.
+
+        :param deep: set to True to count the objects held by list
+            columns as well as the lists.
+        :param sample: number of elements sized per list column when
+            deep.  Longer columns are estimated from a sample of evenly
+            spaced elements.  None sizes every element.
+        """
+        return dict((key, memory.column_usage(self.__dict__[key], deep,
+                                              sample))
+                    for key in self._keys)
 
-        reverse = False
-        if 'order' in kwargs:
-            orderflag = kwargs['order'].lower()
-            if orderflag.startswith('d'):
-                reverse = True
+    def take(self, positions):
+        """
+        Returns a new series holding the rows at positions.
 
-        rows.sort(reverse=reverse)
+        :param positions: list of row indexes (zero-based indexing).
+        """
+        series = self.__class__(*self._keys)
+        for key in self._keys:
+            series.__dict__[key] = take(self.__dict__[key], positions)
 
-        uids[:] = zip(*rows)[-1]
+        series._barcnt = len(positions)
+        return series
 
-        adict = self.__dict__
-        for key in self._keys:
-            adict[key][:] = [adict[key][i] for i in uids]
+    def to_numpy(self, key, masked=False):
+        """
+        Returns a column of your series as a NumPy ndarray.  A TypedColumn
+        returns a view sharing its memory, so do not append to the series
+        while the view is in use.  Null rows of the view hold 0.  Other
+        columns are copied.
+
+        :param key: name of your column.
+        :param masked: set to True to return a numpy.ma.MaskedArray with
+            the null rows masked.
+        """
+        return to_numpy(self._getcol(key), masked)
 
+    @classmethod
+    def from_arrays(cls, *items, **arrays):
+        """
+        Returns a series whose columns wrap NumPy ndarrays without copying.
 
-def lol2dol(lol=None, *args, **kwargs):
-    """
-    Returns a dict of lists (dol) from a list of lists or dicts (lol).
+        :param *items: (key, ndarray) pairs for the columns in order.
+        :param **arrays: map key to ndarray.  These columns follow the
+            *items columns in sorted key order.
+        """
+        items = list(items) + sorted(arrays.iteritems())
+        if not items:
+            msg = "Missing arrays to Series"
+            raise ValueError(msg)
 
-    :param lol: (optional) list of lists or dicts to convert to dict of lists.
-    :param *args: (optional) key names for dol.
-    :param **kwargs: (optional) key name for dol and associated key in row.
+        sizes = set(len(values) for key, values in items)
+        if len(sizes) != 1:
+            msg = "arrays mismatch in length."
+            raise ValueError(msg)
 
-    Usage:
-    >>> values = [[0, 'yhoo', 32.0], [1, 'goog', 200]]
-    >>> dol = lol2dol(values, bar=0, symbol=1, close=2)
-    >>> dol['bar']
-    [0, 1]
-    >>> dol['symbol']
-    ['yhoo', 'goog']
-    >>> dol['close']
-    [32.0, 200]
-    """
-    labels = {}
-    lolkeys = []
+        series = cls(*[key for key, values in items])
+        for key, values in zip(series._keys, [v for k, v in items]):
+            series.__dict__[key] = from_numpy(values)
 
-    if lol:
-        try:
-            lolkeys = lol[0].keys()
-            isdict = True
+        series._barcnt = sizes.pop()
+        return series
 
-        except AttributeError:
-            lolkeys = xrange(len(lol[0]))
-            isdict = False
+    def _getcol(self, key):
+        """
+        Returns the column for key.
+        """
+        if key not in self._keys:
+            msg = "'%s' not defined as key to series" % (key,)
+            raise KeyError(msg)
 
-    if args:
-        if lol and not isdict:
-            cnts = xrange(len(args))
-            labels = dict(zip(cnts, args))
+        return self.__dict__[key]
+
+    def _setcol(self, key, values):
+        """
+        Replace the values of a column, appending it when it is new.
+        """
+        self._indexes.pop(key, None)
+        if key in self._keys:
+            self.__dict__[key][:] = values
 
         else:
-            labels = dict(zip(args, args))
+            self.appendcol(key, values)
 
-    if kwargs:
-        for label, key in kwargs.iteritems():
-            labels[key] = label
+    def _index(self, key):
+        """
+        Returns a dict mapping each value of a column to its last row.
+        The index is kept between calls and catches up with rows appended
+        since the last call.
+        """
+        column = self._getcol(key)
+        index = self._indexes.get(key)
+        if index is None or index[0] is not column:
+            index = self._indexes[key] = [column, 0, {}]
 
-    if not labels:
-        labels = dict(zip(lolkeys, lolkeys))
+        rows, lookup = index[1], index[2]
+        if rows < self._barcnt:
+            lookup.update(izip(column[rows:self._barcnt],
+                               xrange(rows, self._barcnt)))
+            index[1] = self._barcnt
 
-    results = {}
-    for label in labels.values():
-        results[label] = []
+        return lookup
 
-    if lol is None:
-        return results
+    def upsert(self, values, key='dates', *args, **kwargs):
+        """
+        Updates the rows of your series whose key matches a new row and
+        appends the other rows in one block.  Returns a tuple of the
+        number of rows (updated, appended).
 
-    for row in lol:
-        for key, label in labels.iteritems():
-            try:
-                value = row[key]
+        Rows are found through a hash index of the key column, so an
+        upsert costs about the number of new rows.  When a key value is
+        repeated within your series its last row is updated.  Updated
+        rows are journaled as one record of their row numbers and values.
 
-            except IndexError:
-                value = None
+        :param values: list of lists or dicts, or a Series, of new rows.
+        :param key: name of the column identifying a row.
+        :param *args: positional key names of value columns.
+        :param **kwargs: map series key names to value position or key name.
+        """
+        self._getcol(key)
+        if isinstance(values, Series):
+            dol = dict((k, values.__dict__[k]) for k in values._keys)
 
-            except KeyError:
-                value = None
+        else:
+            newargs = args
+            if not args and not kwargs:
+                newargs = self._keys
 
-            results[label].append(value)
+            dol = lol2dol(values, *newargs, **kwargs)
 
-    return results
+        if key not in dol:
+            msg = "'%s' not found in values to upsert" % (key,)
+            raise KeyError(msg)
 
+        index = self._index(key)
+        columns = [(self.__dict__[k], dol[k]) for k in self._keys if k in dol]
+        newrows = {}
+        positions = []
+        updates = []
+        updated = 0
+        for i, value in enumerate(dol[key]):
+            row = index.get(value)
+            if row is not None:
+                for column, newvalues in columns:
+                    column[row] = newvalues[i]
+
+                updates.append((row, i))
+                updated += 1
+
+            elif value in newrows:
+                positions[newrows[value]] = i
+                updated += 1
 
-def csv2lol(filename, header=False, **kwargs):
-    """
-    Returns a list of lists from csv file.
+            else:
+                newrows[value] = len(positions)
+                positions.append(i)
+
+        if updated:
+            for k in dol:
+                if k != key:
+                    self._indexes.pop(k, None)
+
+        if updates and self._journal is not None:
+            rows, items = zip(*updates)
+            record = dict((k, [dol[k][i] for i in items])
+                          for k in self._keys if k in dol)
+            self._journal.write(len(rows), record, list(rows))
+            if self._journal.compact_due():
+                self.compact_journal()
+
+        if positions:
+            newdol = dict((k, take(v, positions)) for k, v in dol.iteritems()
+                          if k in self.__dict__)
+            self._append_dol(newdol, len(positions))
+
+        return updated, len(positions)
+
+    def drop_duplicates(self, key, keep='last'):
+        """
+        Removes the rows of your series repeating a value of a column in
+        one pass.  Returns the number of rows removed.
 
-    :param filename: full path of filename to read.
-    :param header: set to True if 1st record is header record.
-        (optional - default is False.)
-    :param **kwargs: keyargs you can pass to csv.reader module.
-    :rtype: (tuple of [list of keys] and [list of lists])
-    """
-    keys = []
-    results = []
-    with open(filename, 'rb') as f1:
-        rdr = csv.reader(f1, **kwargs)
-        if header:
-            try:
-                keys[:] = next(rdr)
+        :param key: name of the column to compare.
+        :param keep: 'last' or 'first' row of each value to keep.
+        """
+        column = self._getcol(key)
+        if keep == 'last':
+            rows = dict(izip(column, xrange(self._barcnt)))
 
-            except StopIteration:
-                pass
+        elif keep == 'first':
+            rows = {}
+            for i, value in enumerate(column):
+                rows.setdefault(value, i)
 
-        results[:] = list(rdr)
+        else:
+            msg = "keep must be 'first' or 'last', not %r" % (keep,)
+            raise ValueError(msg)
 
-    if results and not keys:
-        keys[:] = list(xrange(len(results[0])))
+        dropped = self._barcnt - len(rows)
+        if not dropped:
+            return 0
 
-    return keys, results
+        positions = sorted(rows.itervalues())
+        for k in self._keys:
+            self.__dict__[k][:] = take(self.__dict__[k], positions)
+
+        self._barcnt = len(positions)
+        self._indexes.clear()
+        return dropped
+
+    def count(self, key):
+        """
+        Returns the number of non null values in a column.
+        """
+        column = self._getcol(key)
+        if isinstance(column, TypedColumn):
+            return len(column) - column.nullcount()
+
+        return len(column) - column.count(None)
+
+    def sum(self, key):
+        """
+        Returns the sum of the non null values in a column.
+        """
+        return sum(valid_values(self._getcol(key)))
+
+    def mean(self, key):
+        """
+        Returns the mean of the non null values in a column, or None when
+        there are none.
+        """
+        count = self.count(key)
+        if not count:
+            return None
+
+        return self.sum(key) / float(count)
+
+    def min(self, key):
+        """
+        Returns the smallest non null value in a column, or None when
+        there are none.
+        """
+        try:
+            return min(valid_values(self._getcol(key)))
+
+        except ValueError:
+            return None
+
+    def max(self, key):
+        """
+        Returns the largest non null value in a column, or None when
+        there are none.
+        """
+        try:
+            return max(valid_values(self._getcol(key)))
+
+        except ValueError:
+            return None
+
+    def unique(self, key):
+        """
+        Returns a list of the distinct non null values of a column in the
+        order they are first found.
+
+        :param key: name of your column.
+        """
+        return counts.unique(self._getcol(key))
+
+    def value_counts(self, key):
+        """
+        Returns a list of (value, count) of the distinct non null values
+        of a column, the most frequent first.
+
+        :param key: name of your column.
+        """
+        return counts.value_counts(self._getcol(key))
+
+    def histogram(self, key, bins=10, limits=None):
+        """
+        Returns a tuple of (counts, edges) of the non null values of a
+        column.  Typed columns are binned by NumPy when it is installed.
+
+        :param key: name of your column.
+        :param bins: number of equal width bins, or a list of bin edges.
+        :param limits: (optional) tuple of (low, high) of equal width
+            bins.  Defaults to the smallest and largest value.
+        """
+        return counts.histogram(self._getcol(key), bins, limits)
+
+    def _validrows(self, key):
+        """
+        Returns an iterator of the rows of a column holding a value.
+        """
+        column = self._getcol(key)
+        if isinstance(column, TypedColumn):
+            mask = column.nullmask()
+            if mask is not None:
+                return compress(xrange(len(column)), mask)
+
+            return iter(xrange(len(column)))
+
+        return (i for i, x in enumerate(column) if x is not None)
+
+    def nlargest(self, n, key, positions=False):
+        """
+        Returns a series of the n rows with the largest values in a
+        column, largest first, without sorting your series.  Null values
+        are skipped and ties keep their order within your series.
+
+        :param n: number of rows to return.
+        :param key: name of your column.
+        :param positions: set to True to return the list of row indexes
+            instead of a series.
+        """
+        column = self._getcol(key)
+        rows = heapq.nlargest(n, self._validrows(key), column.__getitem__)
+        return rows if positions else self.take(rows)
+
+    def nsmallest(self, n, key, positions=False):
+        """
+        Returns a series of the n rows with the smallest values in a
+        column, smallest first, without sorting your series.  Null values
+        are skipped and ties keep their order within your series.
+
+        :param n: number of rows to return.
+        :param key: name of your column.
+        :param positions: set to True to return the list of row indexes
+            instead of a series.
+        """
+        column = self._getcol(key)
+        rows = heapq.nsmallest(n, self._validrows(key), column.__getitem__)
+        return rows if positions else self.take(rows)
+
+    def quantile(self, key, q):
+        """
+        Returns the q quantile of the non null values in a column, or
+        None when there are none.  Values between two rows are linearly
+        interpolated.  The quantile is found by selection on a copy of
+        the values, so your series is not sorted.
+
+        :param key: name of your column.
+        :param q: quantile from 0 to 1, or a list of them.
+        """
+        if isinstance(q, (list, tuple)):
+            return [self.quantile(key, x) for x in q]
+
+        if not 0 <= q <= 1:
+            msg = "quantile must be between 0 and 1, not %r" % (q,)
+            raise ValueError(msg)
+
+        values = list(valid_values(self._getcol(key)))
+        if not values:
+            return None
+
+        position = (len(values) - 1) * q
+        k = int(position)
+        lower = _select(values, k)
+        if position == k:
+            return lower
+
+        upper = min(values[k + 1:])
+        return lower + (upper - lower) * (position - k)
+
+    def _scan(self, key, state, dest, incremental):
+        """
+        Returns the results of a scan over a column, storing them in dest.
+        With incremental set, dest is kept up to date as rows are
+        appended.
+        """
+        results = state.run(self._getcol(key))
+        if dest is not None:
+            self._setcol(dest, results)
+            self._scans = [item for item in self._scans if item[1] != dest]
+
+        if incremental:
+            if dest is None:
+                msg = "incremental scans need a dest column"
+                raise ValueError(msg)
+
+            self._scans.append((key, dest, state))
+
+        return results
+
+    def cumsum(self, key, dest=None, incremental=False):
+        """
+        Returns the cumulative sum of a column.  Null values give None
+        and are skipped by the sum.
+
+        :param key: name of your column.
+        :param dest: (optional) name of a new or existing column to
+            store the results in.
+        :param incremental: set to True to keep dest up to date as rows
+            are appended.  Values appended to dest are replaced by the
+            results.  Other changes to the column are not followed; call
+            again after them.
+        """
+        return self._scan(key, scans.CumSum(), dest, incremental)
+
+    def cummax(self, key, dest=None, incremental=False):
+        """
+        Returns the cumulative maximum of a column.  Null values give
+        None and are skipped.
+
+        :param key: name of your column.
+        :param dest: (optional) name of a new or existing column to
+            store the results in.
+        :param incremental: set to True to keep dest up to date as rows
+            are appended.
+        """
+        return self._scan(key, scans.CumMax(), dest, incremental)
+
+    def drawdown(self, key, dest=None, incremental=False):
+        """
+        Returns the fraction each value of a column is below its
+        cumulative maximum, such as the drawdown of an equity curve.
+
+        :param key: name of your column.
+        :param dest: (optional) name of a new or existing column to
+            store the results in.
+        :param incremental: set to True to keep dest up to date as rows
+            are appended.
+        """
+        return self._scan(key, scans.Drawdown(), dest, incremental)
+
+    def pct_change(self, key, periods=1, dest=None, incremental=False):
+        """
+        Returns the fraction each value of a column changed from the
+        value periods rows before, such as the returns of closes.
+
+        :param key: name of your column.
+        :param periods: number of rows to compare each value with.
+        :param dest: (optional) name of a new or existing column to
+            store the results in.
+        :param incremental: set to True to keep dest up to date as rows
+            are appended.
+        """
+        return self._scan(key, scans.PctChange(periods), dest, incremental)
+
+    def shift(self, key, n=1, dest=None, incremental=False):
+        """
+        Returns a column shifted down n rows, or up when n is negative.
+        Rows shifted in are None.
+
+        :param key: name of your column.
+        :param n: number of rows to shift.
+        :param dest: (optional) name of a new or existing column to
+            store the results in.
+        :param incremental: set to True to keep dest up to date as rows
+            are appended.  Only for positive shifts.
+        """
+        if n < 0 and not incremental:
+            results = scans.shift(self._getcol(key), n)
+            if dest is not None:
+                self._setcol(dest, results)
+
+            return results
+
+        return self._scan(key, scans.Shift(n), dest, incremental)
+
+    def rolling_sum(self, key, window, dest=None):
+        """
+        Returns the rolling sum of a column.  Null values are skipped.
+
+        :param key: name of your column.
+        :param window: number of rows in each window.
+        :param dest: (optional) name of a new or existing column to
+            store the results in.
+        """
+        results = rolling.rolling_sum(self._getcol(key), window)
+        if dest is not None:
+            self._setcol(dest, results)
+
+        return results
+
+    def rolling_mean(self, key, window, dest=None):
+        """
+        Returns the rolling mean of a column.  Null values are skipped.
+
+        :param key: name of your column.
+        :param window: number of rows in each window.
+        :param dest: (optional) name of a new or existing column to
+            store the results in.
+        """
+        results = rolling.rolling_mean(self._getcol(key), window)
+        if dest is not None:
+            self._setcol(dest, results)
+
+        return results
+
+    def rolling_median(self, key, window, dest=None, incremental=False):
+        """
+        Returns the rolling median of a column.  Null values are skipped.
+        Each row updates a sorted window in O(log window).
+
+        :param key: name of your column.
+        :param window: number of rows in each window.
+        :param dest: (optional) name of a new or existing column to
+            store the results in.
+        :param incremental: set to True to keep dest up to date as rows
+            are appended.
+        """
+        return self.rolling_quantile(key, window, 0.5, dest, incremental)
+
+    def rolling_quantile(self, key, window, q, dest=None, incremental=False):
+        """
+        Returns the rolling q quantile of a column, interpolated such as
+        quantile().  Null values are skipped.
+
+        :param key: name of your column.
+        :param window: number of rows in each window.
+        :param q: quantile from 0 to 1.
+        :param dest: (optional) name of a new or existing column to
+            store the results in.
+        :param incremental: set to True to keep dest up to date as rows
+            are appended.
+        """
+        return self._scan(key, rolling.RollingQuantile(window, q), dest,
+                          incremental)
+
+    def rolling_rank(self, key, window, dest=None, incremental=False):
+        """
+        Returns the rank of each value of a column within the window
+        ending at its row, 1 for the smallest.  Equal values share the
+        mean of their ranks.  Null values are skipped.
+
+        :param key: name of your column.
+        :param window: number of rows in each window.
+        :param dest: (optional) name of a new or existing column to
+            store the results in.
+        :param incremental: set to True to keep dest up to date as rows
+            are appended.
+        """
+        return self._scan(key, rolling.RollingRank(window), dest,
+                          incremental)
+
+    def apply(self, func, columns, window=1, workers=1, dest=None,
+              chunksize=None):
+        """
+        Returns a list of func(*windows) for each row of your series,
+        where windows are lists of the last window values of each column.
+        Rows before the first full window are None.
+
+        With more than one worker the rows are split into overlapping
+        chunks run in a pool of processes.  The results are the same as
+        a serial run.
+
+        :param func: function called with one list per column.
+        :param columns: name of a column or list of names.
+        :param window: number of rows in each window.
+        :param workers: number of processes.  None uses every cpu.
+        :param dest: (optional) name of a new or existing column to
+            store the results in.
+        :param chunksize: (optional) number of rows per chunk.
+        """
+        if isinstance(columns, basestring):
+            columns = [columns]
+
+        values = [self._getcol(key) for key in columns]
+        results = parallel.apply(func, values, window, workers, chunksize)
+        if dest is not None:
+            self._setcol(dest, results)
+
+        return results
+
+    def resample_paths(self, key, n_paths, method='block', block=20,
+                       seed=None, workers=1, stat=None, quantiles=None):
+        """
+        Returns a dict of aggregates of a statistic over n_paths
+        resampled paths of the non null values of a column, such as the
+        spread of the total of resampled returns.  Only the aggregates
+        of the stats are kept, not the paths.  See resample.resample_paths.
+
+        :param key: name of your column.
+        :param n_paths: number of paths.
+        :param method: 'block' for a moving block bootstrap, 'iid' to
+            draw rows with replacement or 'shuffle' to permute the rows.
+        :param block: number of rows in each block of the 'block' method.
+        :param seed: (optional) seed of the run.  The same seed gives the
+            same results for any number of workers.
+        :param workers: number of processes.  None uses every cpu.
+        :param stat: (optional) function called with each path returning
+            a number.  Defaults to sum.
+        :param quantiles: (optional) list of quantiles of the stats to
+            return.
+        """
+        return resample.resample_paths(self._getcol(key), n_paths, method,
+                                       block, seed, workers, stat,
+                                       quantiles)
+
+    def to_csv(self, filename, columns=None, formats=None, header=True,
+               compression='infer', **kwargs):
+        """
+        Write your series to a csv file.
+
+        :param filename: full path of filename to write.
+        :param columns: (optional) keys of the columns to write.
+            Defaults to all columns.
+        :param formats: (optional) dict of key to format for the column.
+            See dol2csv for the formats you can use.
+        :param header: set to False to skip writing the keys as the
+            1st record. (optional - default is True.)
+        :param compression: 'gzip', 'bz2', 'xz' or None.  Defaults to
+            the compression matching the filename extension.
+        :param **kwargs: keyargs you can pass to csv.writer module.
+        """
+        if columns is None:
+            columns = self._keys
+
+        for key in columns:
+            if key not in self._keys:
+                msg = "'%s' not defined as key to series" % (key,)
+                raise KeyError(msg)
+
+        dol = dict((key, self.__dict__[key]) for key in columns)
+        dol2csv(dol, filename, columns, formats, header, compression,
+                **kwargs)
+
+    def sort(self, *args, **kwargs):
+        """
+        Sort the series in place.
+
+        :param args: keys of your columns to sort by.
+        :param kwargs: options you can use in python sort.
+            * order can be passed with 'd' for descending or
+              'a' for ascending (default).
+        """
+        keys = [self.__dict__[key] for key in args]
+
+        uids = range(self._barcnt)
+        keys.append(uids)
+
+        rows = zip(*keys)
+
+        reverse = False
+        if 'order' in kwargs:
+            orderflag = kwargs['order'].lower()
+            if orderflag.startswith('d'):
+                reverse = True
+
+        rows.sort(reverse=reverse)
+
+        uids[:] = zip(*rows)[-1]
+        self._indexes.clear()
+        if reverse or args != (self._sortkey,):
+            self._sortkey = None
+
+        adict = self.__dict__
+        for key in self._keys:
+            adict[key][:] = [adict[key][i] for i in uids]
+
+
+def concat(series, keys=None):
+    """
+    Returns one series holding the rows of many series one after the
+    other.  Each column is allocated once and typed columns are copied
+    in blocks.  Columns missing from a series are null for its rows.
+
+    :param series: list of Series.
+    :param keys: (optional) keys of the new series.  Defaults to the
+        keys of every series in the order they are first found.
+
+    Usage:
+    >>> first = Series('dates', 'closes')
+    >>> first.extend([['2011-01-03', 32.0]])
+    >>> second = Series('dates', 'opens')
+    >>> second.extend([['2011-01-04', 33.0]])
+    >>> concat([first, second]).values()
+    [('2011-01-03', 32.0, None), ('2011-01-04', None, 33.0)]
+    """
+    series = list(series)
+    for item in series:
+        if not isinstance(item, Series):
+            msg = "can only concat Series, not %r" % (type(item),)
+            raise TypeError(msg)
+
+    if keys is None:
+        keys = []
+        for item in series:
+            for key in item._keys:
+                if key not in keys:
+                    keys.append(key)
+
+    if not keys:
+        msg = "Missing keys to concat"
+        raise ValueError(msg)
+
+    result = (series[0].__class__ if series else Series)(*keys)
+    sizes = [len(item) for item in series]
+    for key in result._keys:
+        columns = [item.__dict__[key] if key in item._keys else None
+                   for item in series]
+        result.__dict__[key] = concat_columns(columns, sizes)
+
+    result._barcnt = sum(sizes)
+    return result
+
+
+def _events(source, column):
+    """
+    Yields (value, source, row) of the non null values of a column.
+    """
+    for row, value in enumerate(column):
+        if value is not None:
+            yield value, source, row
+
+
+def merge_iter(series, on='dates'):
+    """
+    Yields (source, row) for the rows of many series in the order of a
+    column each series is sorted by, such as the bars of many symbols in
+    date order.  The series are merged through a heap of their next rows,
+    so memory grows with the number of series and each row costs
+    O(log k).  Equal values are yielded in the order of their sources.
+    Rows with a null value are skipped.
+
+    :param series: list of Series, yielding the position of each series
+        as its source, or dict of source to Series, yielded in sorted
+        source order on equal values.
+    :param on: key of the column each series is sorted by.
+
+    Usage:
+    >>> goog = Series('dates', 'closes')
+    >>> goog.extend([[1, 600.0], [3, 610.0]])
+    >>> yhoo = Series('dates', 'closes')
+    >>> yhoo.extend([[2, 15.0], [3, 16.0]])
+    >>> list(merge_iter(dict(goog=goog, yhoo=yhoo)))
+    [('goog', 0), ('yhoo', 0), ('goog', 1), ('yhoo', 1)]
+    """
+    if hasattr(series, 'iteritems'):
+        sources = sorted(series.iteritems())
+
+    else:
+        sources = list(enumerate(series))
+
+    iterables = [_events(source, item._getcol(on))
+                 for source, item in sources]
+    last = None
+    for value, source, row in heapq.merge(*iterables):
+        if last is not None and value < last:
+            msg = "'%s' of source %r is not sorted at row %d" % (
+                on, source, row)
+            raise ValueError(msg)
+
+        last = value
+        yield source, row
+
+
+def _select(values, k):
+    """
+    Returns the kth smallest of values by quickselect.  values is
+    reordered in place so values[:k] hold the k smaller values and
+    values[k + 1:] the larger ones.
+    """
+    left, right = 0, len(values) - 1
+    while left < right:
+        pivot = values[random.randint(left, right)]
+        i, j = left, right
+        while i <= j:
+            while values[i] < pivot:
+                i += 1
+
+            while values[j] > pivot:
+                j -= 1
+
+            if i <= j:
+                values[i], values[j] = values[j], values[i]
+                i += 1
+                j -= 1
+
+        if k <= j:
+            right = j
+
+        elif k >= i:
+            left = i
+
+        else:
+            break
+
+    return values[k]
+
+
+def lol2dol(lol=None, *args, **kwargs):
+    """
+    Returns a dict of lists (dol) from a list of lists or dicts (lol).
+
+    Rows are read in chunks, so lol can be any iterable such as a
+    generator.  Each chunk of equal length lists is transposed at once,
+    other chunks are read a column at a time.
+
+    :param lol: (optional) iterable of lists or dicts to convert to dict
+        of lists.
+    :param *args: (optional) key names for dol.
+    :param **kwargs: (optional) key name for dol and associated key in row.
+
+    Usage:
+    >>> values = [[0, 'yhoo', 32.0], [1, 'goog', 200]]
+    >>> dol = lol2dol(values, bar=0, symbol=1, close=2)
+    >>> dol['bar']
+    [0, 1]
+    >>> dol['symbol']
+    ['yhoo', 'goog']
+    >>> dol['close']
+    [32.0, 200]
+    >>> dol = lol2dol(([bar, bar * 2.0] for bar in xrange(3)), 'bar', 'close')
+    >>> dol['close']
+    [0.0, 2.0, 4.0]
+    """
+    labels = {}
+    lolkeys = []
+    first = None
+
+    if lol is not None:
+        lol = iter(lol)
+        first = next(lol, None)
+
+    if first is not None:
+        lol = chain([first], lol)
+        try:
+            lolkeys = first.keys()
+            isdict = True
+
+        except AttributeError:
+            lolkeys = xrange(len(first))
+            isdict = False
+
+    if args:
+        if first is not None and not isdict:
+            cnts = xrange(len(args))
+            labels = dict(zip(cnts, args))
+
+        else:
+            labels = dict(zip(args, args))
+
+    if kwargs:
+        for label, key in kwargs.iteritems():
+            labels[key] = label
+
+    if not labels:
+        labels = dict(zip(lolkeys, lolkeys))
+
+    results = {}
+    for label in labels.values():
+        results[label] = []
+
+    if first is None:
+        return results
+
+    items = labels.items()
+    while True:
+        chunk = list(islice(lol, CHUNK_SIZE))
+        if not chunk:
+            break
+
+        if not isdict and len(set(imap(len, chunk))) == 1:
+            _extend_transposed(results, items, chunk)
+            continue
+
+        for key, label in items:
+            try:
+                results[label].extend(map(itemgetter(key), chunk))
+
+            except (IndexError, KeyError):
+                results[label].extend([_getvalue(row, key) for row in chunk])
+
+    return results
+
+
+def _extend_transposed(results, items, chunk):
+    """
+    Extends the results with the columns of a chunk of equal length rows.
+    """
+    columns = zip(*chunk)
+    width = len(columns)
+    for key, label in items:
+        if -width <= key < width:
+            results[label].extend(columns[key])
+
+        else:
+            results[label].extend([None] * len(chunk))
+
+
+def _getvalue(row, key):
+    """
+    Returns the value of key within row or None when missing.
+    """
+    try:
+        return row[key]
+
+    except (IndexError, KeyError):
+        return None
+
+
+class between(object):
+    """
+    Row test of csv2lol and csv2dol where keeping fields from low to
+    high.  Fields are compared as read, so use it on ISO dates or
+    strings.  None leaves an end open.
+
+    Usage:
+    >>> test = between('2011-01-01', '2011-12-31')
+    >>> test('2011-06-30'), test('2012-01-03')
+    (True, False)
+    """
+    def __init__(self, low=None, high=None):
+        self.low = low
+        self.high = high
+
+    def __call__(self, value):
+        return ((self.low is None or value >= self.low) and
+                (self.high is None or value <= self.high))
+
+    def __repr__(self):
+        return 'between(%r, %r)' % (self.low, self.high)
+
+
+def _position(keys, key):
+    """
+    Returns the position of a column given by key or position.
+    """
+    if key in keys:
+        return keys.index(key)
+
+    if isinstance(key, (int, long)) and key >= 0:
+        return key
+
+    msg = "'%s' not found in keys of csv file" % (key,)
+    raise KeyError(msg)
+
+
+def _rowfilter(keys, usecols, where):
+    """
+    Returns a tuple of (keys, func) where func maps an iterator of csv
+    rows to an iterator of the rows passing where, holding only the
+    fields of usecols.  func is None when every row and field is kept.
+    """
+    if usecols is None and not where:
+        return keys, None
+
+    tests = []
+    for key, test in (where or {}).iteritems():
+        if not callable(test):
+            test = test.__contains__
+
+        tests.append((_position(keys, key), test))
+
+    def keep(row):
+        size = len(row)
+        for i, test in tests:
+            if not test(row[i] if i < size else ''):
+                return False
+
+        return True
+
+    if usecols is None:
+        return keys, lambda rows: ifilter(keep, rows)
+
+    positions = [_position(keys, key) for key in usecols]
+    if keys:
+        keys = [keys[i] if i < len(keys) else i for i in positions]
+
+    else:
+        keys = positions
+
+    last = max(positions) if positions else -1
+    getter = itemgetter(*positions) if len(positions) > 1 else None
+
+    def project(row):
+        if getter is not None and len(row) > last:
+            return list(getter(row))
+
+        return [row[i] if i < len(row) else '' for i in positions]
+
+    if tests:
+        return keys, lambda rows: imap(project, ifilter(keep, rows))
+
+    return keys, lambda rows: imap(project, rows)
+
+
+def csv2lol(filename, header=False, compression='infer', threaded=False,
+            usecols=None, where=None, **kwargs):
+    """
+    Returns a list of lists from csv file.
+
+    :param filename: full path of filename to read.
+    :param header: set to True if 1st record is header record.
+        (optional - default is False.)
+    :param compression: 'gzip', 'bz2', 'xz' or None.  Defaults to the
+        compression matching the filename extension or magic bytes.
+    :param threaded: set to True to decompress in a separate thread.
+    :param usecols: (optional) list of the keys, or positions, of the
+        columns to keep.  Other fields are dropped as each row is read.
+    :param where: (optional) dict of key, or position, to a test of the
+        field as read: a callable such as between(low, high), or a set
+        of the values to keep.  Rows failing a test are dropped as they
+        are read.
+    :param **kwargs: keyargs you can pass to csv.reader module.
+    :rtype: (tuple of [list of keys] and [list of lists])
+    """
+    keys = []
+    results = []
+    with _open_lines(filename, compression, threaded) as f1:
+        rdr = csv.reader(f1, **kwargs)
+        if header:
+            try:
+                keys[:] = next(rdr)
+
+            except StopIteration:
+                pass
+
+        keys[:], rowfilter = _rowfilter(keys, usecols, where)
+        if rowfilter is not None:
+            rdr = rowfilter(rdr)
+
+        results[:] = list(rdr)
+
+    if results and not keys:
+        keys[:] = list(xrange(len(results[0])))
+
+    return keys, results
+
+
+def csv2dol(filename, header=False, types=None, infer=False,
+            sample=SAMPLE_SIZE, typed=False, cache=None, compression='infer',
+            threaded=False, usecols=None, where=None, **kwargs):
+    """
+    Returns a dict of lists from csv file with each column converted to
+    its type while the file is read.
+
+    With infer set to True, the first sample rows are used to pick the
+    type of each column: int, float, date or datetime for ISO formatted
+    values, category for strings with few distinct values (which are
+    interned to share memory) and str otherwise.  Empty fields of typed
+    columns are loaded as None.  An inferred column holding a value of
+    another type after the sample is widened: an int column to float,
+    and a column of numbers or dates to str when the value is neither.
+    Columns given in types raise ValueError instead.
+
+    :param filename: full path of filename to read.
+    :param header: set to True if 1st record is header record.
+        (optional - default is False.)
+    :param types: (optional) dict of key to type for the column.  A type
+        is a callable such as float or one of the names 'int', 'float',
+        'date', 'datetime', 'category' or 'str'.  Overrides inference.
+    :param infer: set to True to infer the type of the other columns.
+    :param sample: number of rows used to infer the column types.
+    :param typed: set to True to store int and float columns as
+        TypedColumns.
+    :param cache: (optional) CsvCache to load the columns from when the
+        file and options are unchanged since they were last parsed.
+    :param compression: 'gzip', 'bz2', 'xz' or None.  Defaults to the
+        compression matching the filename extension or magic bytes.
+    :param threaded: set to True to decompress in a separate thread.
+    :param usecols: (optional) list of the keys, or positions, of the
+        columns to load.  Other fields are dropped before conversion.
+    :param where: (optional) dict of key, or position, to a test of the
+        field as read: a callable such as between(low, high), or a set
+        of the values to keep.  Rows failing a test are dropped before
+        conversion.
+    :param **kwargs: keyargs you can pass to csv.reader module.
+    :rtype: (tuple of [list of keys], dict of lists and a dict of key to
+        the type name or callable each column was converted with)
+    """
+    if cache is not None:
+        options = dict(kwargs, header=header, types=types, infer=infer,
+                       sample=sample, typed=typed, compression=compression,
+                       usecols=usecols, where=where)
+        results = cache.get(filename, options)
+        if results is None:
+            results = csv2dol(filename, threaded=threaded, **options)
+            cache.put(filename, options, *results)
+
+        return results
+
+    keys = []
+    types = types or {}
+    with _open_lines(filename, compression, threaded) as f1:
+        rdr = csv.reader(f1, **kwargs)
+        if header:
+            keys[:] = next(rdr, [])
+
+        keys[:], rowfilter = _rowfilter(keys, usecols, where)
+        if rowfilter is not None:
+            rdr = rowfilter(rdr)
+
+        rows = list(islice(rdr, sample))
+        if rows and not keys:
+            keys[:] = list(xrange(len(rows[0])))
+
+        kinds = {}
+        for i, key in enumerate(keys):
+            if key in types:
+                kinds[key] = types[key]
+
+            elif infer:
+                kinds[key] = _infer_kind([row[i] for row in rows
+                                          if len(row) > i])
+
+            else:
+                kinds[key] = 'str'
+
+        dol = dict((key, _newcolumn(kinds[key], typed)) for key in keys)
+        while rows:
+            _extend_converted(dol, keys, kinds, rows, types)
+            rows = list(islice(rdr, CHUNK_SIZE))
+
+    return keys, dol, kinds
+
+
+_ISODATE = re.compile(r'\d{4}-\d{2}-\d{2}$')
+_ISODATETIME = re.compile(r'\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2})?$')
+
+
+def _parse_date(value):
+    """
+    Returns a datetime from an ISO formatted 'YYYY-MM-DD' string.
+    """
+    return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]))
+
+
+def _parse_datetime(value):
+    """
+    Returns a datetime from an ISO formatted 'YYYY-MM-DD HH:MM[:SS]'
+    string.
+    """
+    return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                    int(value[11:13]), int(value[14:16]),
+                    int(value[17:19] or 0))
+
+
+KIND_TYPECODES = {'int': 'l', 'float': 'd', int: 'l', float: 'd'}
+
+CONVERTERS = {'int': int,
+              'float': float,
+              'date': _parse_date,
+              'datetime': _parse_datetime,
+              'category': intern,
+              'str': None}
+
+
+def _infer_kind(values):
+    """
+    Returns the name of the type matching every non empty value.
+    """
+    values = [x for x in values if x != '']
+    if not values:
+        return 'str'
+
+    for kind in ('int', 'float'):
+        try:
+            map(CONVERTERS[kind], values)
+            return kind
+
+        except ValueError:
+            pass
+
+    if all(_ISODATE.match(x) for x in values):
+        return 'date'
+
+    if all(_ISODATETIME.match(x) for x in values):
+        return 'datetime'
+
+    if len(set(values)) <= len(values) // 2:
+        return 'category'
+
+    return 'str'
+
+
+def _extend_converted(dol, keys, kinds, rows, strict=()):
+    """
+    Extends each column of dol with the converted fields of rows.
+    Columns whose key is in strict raise ValueError on a field of another
+    type.  Other columns are widened when needed: int to float, and to
+    str when a field is not a number or date.  A typed int column
+    holding an int too big for its array becomes a list.
+    """
+    width = len(keys)
+    if len(set(imap(len, rows))) != 1 or len(rows[0]) < width:
+        rows = [row + [''] * (width - len(row)) for row in rows]
+
+    for key, column in izip(keys, izip(*rows)):
+        kind = kinds[key]
+        func = CONVERTERS.get(kind, kind)
+        if func is None:
+            dol[key].extend(column)
+            continue
+
+        try:
+            values = map(func, column)
+
+        except ValueError:
+            try:
+                values = [None if x == '' else func(x) for x in column]
+
+            except ValueError:
+                if key in strict:
+                    msg = "column '%s' has a value not of type %s" % (
+                        key, kind)
+                    raise ValueError(msg)
+
+                values = _widen(dol, key, kinds, column)
+
+        try:
+            dol[key].extend(values)
+
+        except OverflowError:
+            dol[key] = dol[key].tolist()
+            dol[key].extend(values)
+
+
+_UNPARSERS = {'date': lambda x: x.strftime('%Y-%m-%d'),
+              'datetime': lambda x: x.isoformat(' '),
+              'float': repr}
+
+
+def _widen(dol, key, kinds, column):
+    """
+    Widens an inferred column of dol to the kind of every field of
+    column, float for an int column if possible and str otherwise.
+    Returns the fields of column converted to the new kind.
+    """
+    if kinds[key] == 'int':
+        try:
+            values = [None if x == '' else float(x) for x in column]
+
+        except ValueError:
+            pass
+
+        else:
+            kinds[key] = 'float'
+            widened = _newcolumn('float', isinstance(dol[key], TypedColumn))
+            widened.extend(format_values(dol[key], float))
+            dol[key] = widened
+            return values
+
+    unparse = _UNPARSERS.get(kinds[key], str)
+    kinds[key] = 'str'
+    dol[key] = ['' if x is None else unparse(x) for x in dol[key]]
+    return list(column)
+
+
+def _newcolumn(kind, typed):
+    """
+    Returns an empty column for values of kind.
+    """
+    if typed and kind in KIND_TYPECODES:
+        return TypedColumn(KIND_TYPECODES[kind])
+
+    return []
+
+
+def _sniff_compression(filename):
+    """
+    Returns the compression of a file from its magic bytes, or None.
+    """
+    with open(filename, 'rb') as f1:
+        start = f1.read(MAGIC_SIZE)
+
+    for magic, compression in MAGICS:
+        if start.startswith(magic):
+            return compression
+
+    return None
+
+
+def _open_file(filename, mode, compression='infer'):
+    """
+    Returns a buffered file object for filename.
+
+    :param filename: full path of filename to open.
+    :param mode: 'rb' or 'wb'.
+    :param compression: 'gzip', 'bz2', 'xz' or None.  'infer' uses the
+        compression matching the filename extension, or when reading a
+        file without one, its magic bytes.
+    """
+    if compression == 'infer':
+        ext = os.path.splitext(filename)[1].lower()
+        compression = COMPRESSIONS.get(ext)
+        if compression is None and mode.startswith('r'):
+            compression = _sniff_compression(filename)
+
+    if not compression:
+        return open(filename, mode, BUFFER_SIZE)
+
+    if compression == 'bz2':
+        return bz2.BZ2File(filename, mode, BUFFER_SIZE)
+
+    if compression == 'gzip':
+        raw = gzip.GzipFile(filename, mode)
+
+    elif compression == 'xz':
+        if lzma is None:
+            msg = "xz compression needs the lzma module (backports.lzma)"
+            raise ValueError(msg)
+
+        raw = lzma.LZMAFile(filename, mode)
+
+    else:
+        msg = "unknown compression '%s'" % (compression,)
+        raise ValueError(msg)
+
+    if mode.startswith('r'):
+        return io.BufferedReader(raw, BUFFER_SIZE)
+
+    return io.BufferedWriter(raw, BUFFER_SIZE)
+
+
+class _ThreadedReader(object):
+    """
+    Iterator of the lines of a file read by a separate thread.
+
+    The thread reads blocks of the file, which for a compressed file
+    means decompressing them, while the caller parses earlier blocks.
+    """
+    def __init__(self, f1, blocksize=BUFFER_SIZE, queuesize=4):
+        """
+        :param f1: file object opened for reading.
+        :param blocksize: bytes read by each call to f1.read.
+        :param queuesize: number of blocks read ahead of the caller.
+        """
+        self._file = f1
+        self._blocksize = blocksize
+        self._queue = Queue.Queue(queuesize)
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        """
+        Reads blocks into the queue until the end of file, ending with an
+        empty block, or the exception raised by the read.
+        """
+        try:
+            while not self._stopped:
+                block = self._file.read(self._blocksize)
+                self._queue.put(block)
+                if not block:
+                    break
+
+        except Exception, exc:
+            self._queue.put(exc)
+
+    def __iter__(self):
+        """
+        Returns a generator of the lines within the blocks read.
+        """
+        tail = ''
+        while True:
+            block = self._queue.get()
+            if isinstance(block, Exception):
+                raise block
+
+            if not block:
+                break
+
+            block = ''.join((tail, block))
+            end = block.rfind('\n') + 1
+            tail = block[end:]
+            for line in io.BytesIO(block[:end]):
+                yield line
+
+        if tail:
+            yield tail
+
+    def close(self):
+        """
+        Stops the reading thread.
+        """
+        self._stopped = True
+        while self._thread.is_alive():
+            try:
+                self._queue.get(timeout=0.1)
+
+            except Queue.Empty:
+                pass
+
+
+@contextmanager
+def _open_lines(filename, compression='infer', threaded=False):
+    """
+    Returns a context manager for an iterator of the lines of a file,
+    decompressing them if needed.
+
+    :param filename: full path of filename to read.
+    :param compression: 'gzip', 'bz2', 'xz', None or 'infer'.
+    :param threaded: set to True to read the file in a separate thread.
+    """
+    f1 = _open_file(filename, 'rb', compression)
+    try:
+        if not threaded:
+            yield f1
+
+        else:
+            reader = _ThreadedReader(f1)
+            try:
+                yield reader
+
+            finally:
+                reader.close()
+
+    finally:
+        f1.close()
+
+
+def _formatter(aformat, values):
+    """
+    Returns a function formatting one value of a column to a string.
+    None is always formatted to an empty string.
+
+    :param aformat: callable, or format string used with the % operator
+        or with strftime for date and time values.
+    :param values: column of values the formatter will be used with.
+    """
+    if callable(aformat):
+        func = aformat
+
+    else:
+        sample = next((x for x in values if x is not None), None)
+        if hasattr(sample, 'strftime'):
+            func = lambda x: x.strftime(aformat)
+
+        else:
+            func = aformat.__mod__
+
+    return lambda x: '' if x is None else func(x)
+
+
+def dol2csv(dol, filename, keys=None, formats=None, header=True,
+            compression='infer', **kwargs):
+    """
+    Writes a dict of lists (dol) to a csv file.
+
+    Rows are streamed from the columns so the full list of rows is never
+    built in memory.
+
+    :param dol: dict of lists to write.
+    :param filename: full path of filename to write.
+    :param keys: (optional) keys of the columns to write in order.
+        Defaults to the sorted keys of dol.
+    :param formats: (optional) dict of key to format for the column.  A
+        format is either a callable returning a string or a format string
+        such as '%.2f', or '%Y-%m-%d' for date and time values.
+    :param header: set to False to skip writing the keys as the
+        1st record. (optional - default is True.)
+    :param compression: 'gzip', 'bz2', 'xz' or None.  Defaults to
+        the compression matching the filename extension.
+    :param **kwargs: keyargs you can pass to csv.writer module.
+    """
+    if keys is None:
+        keys = sorted(dol)
+
+    formats = formats or {}
+
+    columns = []
+    for key in keys:
+        values = dol[key]
+        if key in formats:
+            values = imap(_formatter(formats[key], values), values)
+
+        columns.append(values)
+
+    with _open_file(filename, 'wb', compression) as f1:
+        wrtr = csv.writer(f1, **kwargs)
+        if header:
+            wrtr.writerow(keys)
+
+        wrtr.writerows(izip(*columns))
 
 
 def format_values(values, atype, aformat=None):
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Distinct values, value counts and histograms of columns.
+
+Each function makes a single pass over the valid values of a column,
+null values are skipped.  Distinct values are found by hashing, which
+is cheap for category columns since interned strings keep their hash.
+Typed columns are binned by NumPy when it is installed.
+"""
+
+from bisect import bisect_right
+
+try:
+    import numpy
+
+except ImportError:
+    numpy = None
+
+from column import TypedColumn
+from column import valid_values
+
+
+def unique(column):
+    """
+    Returns a list of the distinct values of a column in the order they
+    are first found.
+
+    :param column: TypedColumn or list of values.
+
+    Usage:
+    >>> unique(['goog', 'yhoo', None, 'goog'])
+    ['goog', 'yhoo']
+    """
+    seen = set()
+    add = seen.add
+    results = []
+    append = results.append
+    for x in valid_values(column):
+        if x not in seen:
+            add(x)
+            append(x)
+
+    return results
+
+
+def value_counts(column):
+    """
+    Returns a list of (value, count) of the distinct values of a column,
+    the most frequent first.  Equal counts keep the order the values are
+    first found.
+
+    :param column: TypedColumn or list of values.
+
+    Usage:
+    >>> value_counts(['goog', 'yhoo', None, 'yhoo'])
+    [('yhoo', 2), ('goog', 1)]
+    """
+    counts = {}
+    order = []
+    get = counts.get
+    for x in valid_values(column):
+        count = get(x)
+        if count is None:
+            order.append(x)
+            counts[x] = 1
+
+        else:
+            counts[x] = count + 1
+
+    results = [(x, counts[x]) for x in order]
+    results.sort(key=lambda item: item[1], reverse=True)
+    return results
+
+
+def _edges(values, bins, limits):
+    """
+    Returns the list of bin edges for values.
+    """
+    if not isinstance(bins, (int, long)):
+        edges = list(bins)
+        if len(edges) < 2 or edges != sorted(edges):
+            msg = "bins must be a count or at least 2 increasing edges"
+            raise ValueError(msg)
+
+        return edges
+
+    if bins < 1:
+        msg = "bins must be at least 1"
+        raise ValueError(msg)
+
+    if limits is not None:
+        low, high = limits
+
+    elif values:
+        low, high = min(values), max(values)
+
+    else:
+        low, high = 0, 1
+
+    low, high = float(low), float(high)
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+
+    width = (high - low) / bins
+    return [low + width * i for i in xrange(bins)] + [high]
+
+
+def histogram(column, bins=10, limits=None):
+    """
+    Returns a tuple of (counts, edges) of the valid values of a column.
+    Each bin holds the values from its left edge up to its right edge,
+    the last bin also holds its right edge.  Values outside the edges
+    are not counted.
+
+    :param column: TypedColumn or list of values.
+    :param bins: number of equal width bins, or a list of bin edges.
+    :param limits: (optional) tuple of (low, high) of equal width bins.
+        Defaults to the smallest and largest value.
+
+    Usage:
+    >>> histogram([1, 2, 2, 3, None, 4], bins=3)
+    ([1, 2, 2], [1.0, 2.0, 3.0, 4.0])
+    """
+    if numpy is not None and isinstance(column, TypedColumn):
+        values = column.__array__()
+        mask = column.nullmask()
+        if mask is not None:
+            values = values[numpy.frombuffer(mask, numpy.uint8) != 0]
+
+        if limits is None and len(values):
+            limits = (values.min(), values.max())
+
+        edges = _edges((), bins, limits)
+        counts, edges = numpy.histogram(values, edges)
+        return counts.tolist(), edges.tolist()
+
+    values = list(valid_values(column))
+    edges = _edges(values, bins, limits)
+    last = len(edges) - 2
+    counts = [0] * (last + 1)
+    low, high = edges[0], edges[-1]
+
+    if isinstance(bins, (int, long)):
+        scale = bins / (high - low)
+        for x in values:
+            if low <= x <= high:
+                counts[min(int((x - low) * scale), last)] += 1
+
+        return counts, edges
+
+    for x in values:
+        if low <= x <= high:
+            counts[min(bisect_right(edges, x) - 1, last)] += 1
+
+    return counts, edges
+
+
+def _testit(verbose=None):
+    import doctest
+    doctest.testmod(verbose=verbose)
+
+if __name__ == "__main__":
+    _testit()
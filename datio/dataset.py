@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Partitioned on-disk dataset of Series.
+
+Each symbol's series is split by the year of its date column and every
+year is stored as a binary column file:
+
+    root/<symbol>/<year>.dcol
+
+A manifest in the root keeps the keys, number of rows and the min and
+max date of each partition, so a read only opens the partitions that
+overlap the dates asked for.  A read adds the symbol of each row as a
+column, so the rows of several symbols stay apart.
+"""
+
+import os
+
+try:
+    import cPickle as pickle
+
+except ImportError:
+    import pickle
+
+from colfile import read_columns
+from colfile import write_columns
+from core import Series
+from core import concat
+
+
+MANIFEST = '_manifest'
+EXTENSION = '.dcol'
+
+
+def _year(value):
+    """
+    Returns the year of a date, datetime, or ISO formatted string.
+    """
+    try:
+        return value.year
+
+    except AttributeError:
+        return int(str(value)[:4])
+
+
+def _check_symbol(symbol):
+    """
+    Raises ValueError unless a symbol names one directory of the root.
+    """
+    if (not isinstance(symbol, basestring) or symbol in ('', '.', '..') or
+        '/' in symbol or '\x00' in symbol or os.sep in symbol or
+        os.altsep and os.altsep in symbol):
+        msg = "symbol %r can not be a directory name" % (symbol,)
+        raise ValueError(msg)
+
+
+class Dataset(object):
+    """
+    Series partitioned by symbol and year.
+    """
+    def __init__(self, root, on='dates', symbolkey='symbols'):
+        """
+        :param root: directory holding the dataset.  Created when missing.
+        :param on: key of the date column used to partition a series.
+        :param symbolkey: key of the column holding the symbol of each row
+            read.  None reads no symbol column.
+        """
+        self.root = root
+        self.on = on
+        self.symbolkey = symbolkey
+        self._manifest = {}
+
+        if not os.path.isdir(root):
+            os.makedirs(root)
+
+        filename = os.path.join(root, MANIFEST)
+        if os.path.exists(filename):
+            with open(filename, 'rb') as f1:
+                self._manifest = pickle.load(f1)
+
+    def _save_manifest(self):
+        """
+        Writes the manifest next to the partitions.
+        """
+        filename = os.path.join(self.root, MANIFEST)
+        tmpname = '%s.%d.tmp' % (filename, os.getpid())
+        with open(tmpname, 'wb') as f1:
+            pickle.dump(self._manifest, f1, pickle.HIGHEST_PROTOCOL)
+
+        os.rename(tmpname, filename)
+
+    def _filename(self, symbol, year):
+        """
+        Returns the filename of a partition.
+        """
+        _check_symbol(symbol)
+        return os.path.join(self.root, symbol,
+                            ''.join((str(year), EXTENSION)))
+
+    def symbols(self):
+        """
+        Returns a sorted list of the symbols within the dataset.
+        """
+        return sorted(self._manifest)
+
+    def partitions(self, symbol):
+        """
+        Returns a sorted list of (year, stats) of a symbol's partitions.
+        stats is a dict of the keys, rows, min and max of the partition.
+        """
+        return sorted(self._manifest.get(symbol, {}).iteritems())
+
+    def write(self, symbol, series, append=False):
+        """
+        Stores a series as the partitions of a symbol.  The partitions of
+        the years within the series are replaced, other years are kept.
+
+        :param symbol: name of the symbol, used as a directory name.
+        :param series: Series holding the dataset's date column.
+        :param append: set to True to append the rows to the existing
+            partitions of those years instead of replacing them.  Only
+            the keys of the existing partitions are kept.
+        """
+        _check_symbol(symbol)
+        dates = series._getcol(self.on)
+
+        rows = {}
+        for i, value in enumerate(dates):
+            if value is None:
+                msg = "row %d has no value for '%s'" % (i, self.on)
+                raise ValueError(msg)
+
+            rows.setdefault(_year(value), []).append(i)
+
+        directory = os.path.join(self.root, symbol)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        partitions = self._manifest.setdefault(symbol, {})
+        for year, positions in rows.iteritems():
+            part = series.take(positions)
+            if append and year in partitions:
+                existing = self._load(symbol, year, None)
+                existing.extend(part)
+                part = existing
+
+            keys = part.keys()
+            dol = dict((key, part.__dict__[key]) for key in keys)
+            write_columns(self._filename(symbol, year), keys, dol,
+                          rows=len(part))
+
+            partdates = part.__dict__[self.on]
+            partitions[year] = dict(keys=list(keys), rows=len(part),
+                                    min=min(partdates), max=max(partdates))
+
+        self._save_manifest()
+
+    def _load(self, symbol, year, columns):
+        """
+        Returns the series stored in a partition.
+        """
+        keys, dol, meta = read_columns(self._filename(symbol, year), columns)
+        series = Series(*keys)
+        series.__dict__.update(dol)
+        series._barcnt = len(dol[keys[0]]) if keys else 0
+        return series
+
+    def read(self, symbols=None, start=None, end=None, columns=None):
+        """
+        Returns one series of the rows of symbols dated from start to end.
+        Only the partitions whose dates overlap start to end are opened.
+        The symbol of each row is in the symbolkey column, first unless
+        columns places it.
+
+        :param symbols: (optional) list of symbols.  Defaults to all.
+        :param start: (optional) first date to include.
+        :param end: (optional) last date to include.
+        :param columns: (optional) keys of the columns to read.
+        """
+        if symbols is None:
+            symbols = self.symbols()
+
+        selected = []
+        allkeys = []
+        for symbol in symbols:
+            for year, stats in self.partitions(symbol):
+                for key in stats['keys']:
+                    if key not in allkeys:
+                        allkeys.append(key)
+
+                if start is not None and stats['max'] < start:
+                    continue
+
+                if end is not None and stats['min'] > end:
+                    continue
+
+                selected.append((symbol, year, stats))
+
+        keys = list(columns) if columns is not None else allkeys
+        if not keys:
+            msg = "no partitions found for %s" % (symbols,)
+            raise ValueError(msg)
+
+        if self.symbolkey is not None and self.symbolkey not in keys:
+            keys.insert(0, self.symbolkey)
+
+        readkeys = [key for key in keys if key != self.symbolkey]
+        if self.on not in readkeys:
+            readkeys.append(self.on)
+
+        parts = []
+        for symbol, year, stats in selected:
+            part = self._load(symbol, year, readkeys)
+            inside = ((start is None or stats['min'] >= start) and
+                      (end is None or stats['max'] <= end))
+            if not inside:
+                dates = part.__dict__[self.on]
+                part = part.take([i for i, x in enumerate(dates)
+                                  if (start is None or x >= start) and
+                                     (end is None or x <= end)])
+
+            if self.symbolkey is not None:
+                part.initcol(self.symbolkey, symbol)
+
+            parts.append(part)
+
+        return concat(parts, keys)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Append-only journal for crash-safe Series.
+
+Each append, or upsert, to a journaled Series writes one record to the
+journal file:
+
+    length | crc32 | sequence | pickled (barcnt, dol, rows)
+
+rows is None for appended rows.  A record of rows updated in place
+holds their row numbers in rows and their new values in dol.
+
+Each record is flushed to the operating system as it is written, so it
+survives a crash of the process.  Records are fsync'd in batches, so a
+crash of the machine may lose the records since the last fsync.
+
+A column snapshot of the whole Series is kept next to the journal
+(journal path + '.snap') and stores the sequence number of the last
+record it contains, so a crash during compaction never replays a record
+twice.
+"""
+
+import os
+import time
+import struct
+import zlib
+
+try:
+    import cPickle as pickle
+
+except ImportError:
+    import pickle
+
+from colfile import read_columns
+from colfile import write_columns
+
+
+_RECORD = struct.Struct('<IIQ')
+_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+def snapname(path):
+    """
+    Returns the filename of the column snapshot for a journal.
+    """
+    return ''.join((path, '.snap'))
+
+
+class Journal(object):
+    """
+    Append-only record file with batched fsync.
+    """
+    def __init__(self, path, sync_every=64, sync_interval=1.0,
+                 compact_every=None, seq=0):
+        """
+        :param path: full path of the journal file.
+        :param sync_every: fsync after this many records.
+        :param sync_interval: fsync when this many seconds have passed
+            since the last fsync.  Checked as each record is written, so
+            the last records wait for the next write, sync() or close().
+        :param compact_every: (optional) number of records after which the
+            owner should compact the journal into a snapshot.
+        :param seq: sequence number of the last record already written.
+        """
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.compact_every = compact_every
+
+        self._seq = seq
+        self._pending = 0
+        self._records = 0
+        self._lastsync = time.time()
+        self._file = open(path, 'ab')
+
+    def write(self, barcnt, dol, rows=None):
+        """
+        Appends a record to the journal and flushes it to the operating
+        system.  The fsync is batched, see sync().
+
+        :param barcnt: number of rows in the record.
+        :param dol: dict of lists of the appended, or updated, values.
+        :param rows: (optional) list of the row numbers updated in place
+            by the values, None for appended rows.
+        """
+        self._seq += 1
+        payload = pickle.dumps((barcnt, dol, rows), _PROTOCOL)
+        crc = zlib.crc32(payload) & 0xffffffff
+        self._file.write(_RECORD.pack(len(payload), crc, self._seq))
+        self._file.write(payload)
+        self._file.flush()
+
+        self._pending += 1
+        self._records += 1
+        if (self._pending >= self.sync_every or
+            time.time() - self._lastsync >= self.sync_interval):
+            self.sync()
+
+    def sync(self):
+        """
+        Fsyncs the records written since the last sync.
+        """
+        if self._pending:
+            os.fsync(self._file.fileno())
+
+        self._pending = 0
+        self._lastsync = time.time()
+
+    def compact_due(self):
+        """
+        Returns True when the journal should be compacted.
+        """
+        return bool(self.compact_every and
+                    self._records >= self.compact_every)
+
+    def compact(self, keys, dol, barcnt, meta=None):
+        """
+        Writes a column snapshot and truncates the journal.
+
+        :param keys: column names of the series.
+        :param dol: dict of lists of every column in the series.
+        :param barcnt: number of rows in the series.
+        :param meta: (optional) dict of settings of the series to keep
+            in the snapshot.
+        """
+        self.sync()
+        meta = dict(meta or {}, seq=self._seq)
+        write_columns(snapname(self.path), keys, dol, rows=barcnt,
+                      meta=meta, sync=True)
+
+        self._file.close()
+        self._file = open(self.path, 'wb')
+        self._records = 0
+
+    def close(self):
+        """
+        Syncs and closes the journal file.
+        """
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+
+def read_records(path, seq=0):
+    """
+    Returns a generator of (seq, barcnt, dol, rows) records from a
+    journal.  rows is None for appended rows.
+
+    Reading stops at the first torn or corrupt record, which is what a
+    crash in the middle of a write leaves behind.  The journal is then
+    truncated to the last good record.
+
+    :param path: full path of the journal file.
+    :param seq: skip records with a sequence number up to seq.
+    """
+    if not os.path.exists(path):
+        return
+
+    goodsize = 0
+    with open(path, 'rb') as f1:
+        while True:
+            header = f1.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                break
+
+            length, crc, recseq = _RECORD.unpack(header)
+            payload = f1.read(length)
+            if len(payload) < length:
+                break
+
+            if zlib.crc32(payload) & 0xffffffff != crc:
+                break
+
+            goodsize = f1.tell()
+            if recseq <= seq:
+                continue
+
+            record = pickle.loads(payload)
+            if len(record) == 2:
+                record += (None,)
+
+            yield (recseq,) + record
+
+        torn = goodsize != f1.tell()
+
+    if torn:
+        with open(path, 'r+b') as f1:
+            f1.truncate(goodsize)
+
+
+def read_snapshot(path):
+    """
+    Returns a tuple of (keys, dol, barcnt, seq, meta) from a journal
+    snapshot, where meta is the dict of settings kept with it.
+
+    :param path: full path of the journal file.
+    """
+    keys, dol, meta = read_columns(snapname(path))
+    barcnt = len(dol[keys[0]]) if keys else 0
+    return keys, dol, barcnt, meta.pop('seq', 0), meta
@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Lazy queries over csv files.
+
+scan_csv() returns a Scan, a plan of operations that only runs when
+collect() is called.  The plan is rewritten before it runs:
+
+    * the columns needed by select, filter and sort are the only ones
+      read from the file;
+    * filters of fields not yet formatted are tested as each row is
+      read, before any conversion;
+    * every format of a column is fused into one conversion made while
+      the file is read;
+    * the other filters are tested together in one pass over the rows.
+
+So a scan reads the file once, filters the converted rows once and
+sorts once, whatever the number of operations.
+"""
+
+from core import Series
+from core import csv2dol
+from column import take
+
+
+def _converter(atype, aformat=None):
+    """
+    Returns a function formatting one value like Series.format.
+    """
+    if atype == int and not aformat:
+        def convert(value):
+            try:
+                return int(value)
+
+            except ValueError:
+                return int(float(value))
+
+    elif aformat:
+        convert = lambda value: atype(str(value), aformat)
+
+    else:
+        convert = atype
+
+    return convert
+
+
+def _compose(first, second):
+    """
+    Returns a function applying first then second, keeping None.
+    """
+    def convert(value):
+        value = first(value)
+        return None if value is None else second(value)
+
+    return convert
+
+
+def _test(test):
+    """
+    Returns a callable for a filter test: a callable or a set of values.
+    """
+    return test if callable(test) else test.__contains__
+
+
+def _both(first, second):
+    """
+    Returns a test passed by the values passing first and second.
+    """
+    first, second = _test(first), _test(second)
+    return lambda value: first(value) and second(value)
+
+
+class Scan(object):
+    """
+    Plan of operations over a csv file.
+
+    Usage:
+    >>> scan = scan_csv('prices.csv').select('Date', 'Close')
+    >>> scan = scan.filter('Symbol', set(['goog'])).format('Close', float)
+    >>> print scan.filter('Close', lambda x: x > 30).explain()
+    read prices.csv columns ['Date', 'Close', 'Symbol']
+      where Symbol set(['goog'])
+      convert Close
+    filter Close
+    select ['Date', 'Close']
+    """
+    def __init__(self, filename, ops=(), **kwargs):
+        """
+        :param filename: full path of the csv file.
+        :param ops: list of the operations planned so far.
+        :param **kwargs: keyargs passed on to csv2dol, except usecols and
+            where which the plan builds from select and filter.
+        """
+        for name in ('usecols', 'where'):
+            if name in kwargs:
+                msg = "use select() and filter() instead of %s" % (name,)
+                raise TypeError(msg)
+
+        self.filename = filename
+        self.ops = list(ops)
+        self.kwargs = kwargs
+
+    def _then(self, op):
+        """
+        Returns a new scan with op added to the plan.
+        """
+        return self.__class__(self.filename, self.ops + [op], **self.kwargs)
+
+    def select(self, *keys):
+        """
+        Returns a scan keeping only the columns keys.
+        """
+        return self._then(('select', keys))
+
+    def format(self, key, atype, aformat=None):
+        """
+        Returns a scan formatting a column such as Series.format.  Empty
+        fields are formatted to None.
+        """
+        return self._then(('format', key, _converter(atype, aformat),
+                           atype if atype == float and not aformat else None))
+
+    def filter(self, key, test):
+        """
+        Returns a scan keeping the rows whose value of a column passes
+        test: a callable, such as datio.between(low, high), or a set of
+        the values to keep.  The test is made on the value as formatted
+        by the earlier operations of the scan.
+        """
+        return self._then(('filter', key, test))
+
+    def sort(self, *keys, **kwargs):
+        """
+        Returns a scan sorting the rows such as Series.sort.
+        """
+        return self._then(('sort', keys, kwargs))
+
+    def plan(self):
+        """
+        Returns a dict of the rewritten plan: the columns to read, the
+        filters tested on the fields as read, the conversion of each
+        column, the filters tested after conversion, the sort and the
+        keys of the result.
+        """
+        keys = None
+        needed = set()
+        where = {}
+        converters = {}
+        filters = []
+        sort = None
+        infer = self.kwargs.get('infer', False)
+        typed = self.kwargs.get('types') or {}
+
+        for op in self.ops:
+            name = op[0]
+            if name == 'select':
+                keys = list(op[1])
+
+            elif name == 'format':
+                key, convert, kind = op[1:]
+                needed.add(key)
+                if key in converters:
+                    first = converters[key]
+                    first = first if callable(first) else _converter(first)
+                    converters[key] = _compose(first, convert)
+
+                else:
+                    converters[key] = kind or convert
+
+            elif name == 'filter':
+                key, test = op[1:]
+                needed.add(key)
+                if key in converters or key in typed or infer:
+                    filters.append((key, _test(test)))
+
+                elif key in where:
+                    where[key] = _both(where[key], test)
+
+                else:
+                    where[key] = test
+
+            elif name == 'sort':
+                needed.update(op[1])
+                sort = op[1:]
+
+        usecols = None
+        if keys is not None:
+            usecols = keys + sorted(needed.difference(keys))
+
+        return dict(usecols=usecols, where=where, types=converters,
+                    filters=filters, sort=sort, keys=keys)
+
+    def explain(self):
+        """
+        Returns a description of the rewritten plan.
+        """
+        plan = self.plan()
+        lines = ['read %s columns %s' % (self.filename,
+                                         plan['usecols'] or 'all')]
+        for key, test in sorted(plan['where'].iteritems()):
+            lines.append('  where %s %r' % (key, test))
+
+        for key in sorted(plan['types']):
+            lines.append('  convert %s' % (key,))
+
+        for key, test in plan['filters']:
+            lines.append('filter %s' % (key,))
+
+        if plan['sort'] is not None:
+            lines.append('sort %s' % (', '.join(map(str, plan['sort'][0])),))
+
+        if plan['keys'] is not None and plan['keys'] != plan['usecols']:
+            lines.append('select %s' % (plan['keys'],))
+
+        return '\n'.join(lines)
+
+    def collect(self):
+        """
+        Runs the plan and returns a Series of the results.
+        """
+        plan = self.plan()
+        kwargs = dict(self.kwargs)
+        types = dict(kwargs.pop('types', None) or {})
+        types.update(plan['types'])
+        readkeys, dol, kinds = csv2dol(self.filename, types=types,
+                                       usecols=plan['usecols'],
+                                       where=plan['where'], **kwargs)
+
+        barcnt = len(dol[readkeys[0]]) if readkeys else 0
+        if plan['filters']:
+            tests = [(dol[key], test) for key, test in plan['filters']]
+            positions = [i for i in xrange(barcnt)
+                         if all(test(column[i]) for column, test in tests)]
+            if len(positions) < barcnt:
+                for key in readkeys:
+                    dol[key] = take(dol[key], positions)
+
+                barcnt = len(positions)
+
+        series = Series(*readkeys)
+        series.__dict__.update(dol)
+        series._barcnt = barcnt
+
+        if plan['sort'] is not None:
+            sortkeys, sortargs = plan['sort']
+            series.sort(*sortkeys, **sortargs)
+
+        keys = plan['keys']
+        if keys is None or keys == readkeys:
+            return series
+
+        result = Series(*keys)
+        for key in keys:
+            result.__dict__[key] = series.__dict__[key]
+
+        result._barcnt = barcnt
+        return result
+
+
+def scan_csv(filename, header=True, **kwargs):
+    """
+    Returns a lazy Scan of a csv file.  Nothing is read until collect().
+
+    :param filename: full path of filename to read.
+    :param header: set to False if the 1st record is not a header.
+    :param **kwargs: keyargs you can pass to csv2dol, such as types,
+        infer, typed or compression.  Filters of columns given a type are
+        tested after conversion.
+    """
+    return Scan(filename, header=header, **kwargs)
+
+
+def _testit(verbose=None):
+    import doctest
+    doctest.testmod(verbose=verbose)
+
+if __name__ == "__main__":
+    _testit()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Memory accounting for columns and Series.
+
+A column's size is its container plus, for a TypedColumn, its typed
+buffer and validity mask.  A deep size also counts the objects held by
+a list column.  Each element is counted once per row, so an object
+shared by many rows, such as an interned category, is counted for
+every row holding it.  Large list columns are sampled: the mean size of
+evenly spaced elements is scaled to the length of the column.
+
+Every Series registers itself here when created so summary() can
+report the live Series of the process.
+"""
+
+import sys
+import weakref
+from array import array
+
+from column import TypedColumn
+
+
+SAMPLE_SIZE = 1000
+
+_live = weakref.WeakSet()
+
+
+def column_usage(column, deep=False, sample=SAMPLE_SIZE):
+    """
+    Returns the number of bytes used by a column.
+
+    :param column: TypedColumn or list of values.
+    :param deep: set to True to count the objects held by a list.
+    :param sample: number of elements sized when deep.  Columns longer
+        than sample are estimated from evenly spaced elements.  None
+        sizes every element.
+    """
+    size = sys.getsizeof(column)
+    if isinstance(column, TypedColumn):
+        data = column.data
+        if isinstance(data, array):
+            size += sys.getsizeof(data)
+
+        else:
+            size += data.nbytes
+
+        if column.valid is not None:
+            size += sys.getsizeof(column.valid)
+
+        return size
+
+    if not deep or not len(column):
+        return size
+
+    getsizeof = sys.getsizeof
+    count = len(column)
+    if sample is None or count <= sample:
+        return size + sum(getsizeof(x) for x in column)
+
+    step = count / float(sample)
+    total = sum(getsizeof(column[int(i * step)]) for i in xrange(sample))
+    return size + int(total * count / float(sample))
+
+
+def register(series):
+    """
+    Adds a series to the registry of live Series.  The registry holds
+    weak references, so a series leaves it once it is garbage.
+    """
+    _live.add(series)
+
+
+def live():
+    """
+    Returns a list of the live Series.
+    """
+    return list(_live)
+
+
+def summary(deep=False, sample=SAMPLE_SIZE):
+    """
+    Returns a list of (bytes, rows, keys, series) for every live series,
+    largest first.
+
+    :param deep: set to True to count the objects held by list columns.
+    :param sample: number of elements sized per column when deep.
+    """
+    results = []
+    for series in live():
+        usage = series.memory_usage(deep, sample)
+        results.append((sum(usage.itervalues()), len(series),
+                        list(series.keys()), series))
+
+    results.sort(key=lambda x: x[0], reverse=True)
+    return results
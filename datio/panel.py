@@ -0,0 +1,378 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Panels of many Series aligned on one date axis.
+
+A Panel holds the numeric fields of many symbols over the sorted union
+of their dates.  Each field is one dense block: an array with a row of
+every symbol's value for each date, and a validity mask marking the
+cells a symbol has no value for.
+
+A date's row is contiguous, so cross sections are cheap.  The values of
+one symbol are every len(symbols)-th cell of the block, returned as a
+StridedView sharing the block's memory.
+"""
+
+from array import array
+from bisect import bisect_left
+from itertools import izip
+
+try:
+    import numpy
+
+except ImportError:
+    numpy = None
+
+from column import NULL
+from column import TypedColumn
+from core import Series
+
+
+class StridedView(object):
+    """
+    Column of every step-th cell of a panel block.  Changes made through
+    a view are made to the block.
+    """
+    def __init__(self, data, valid, start, step, length):
+        """
+        :param data: array of the block's values.
+        :param valid: validity mask bytearray of the block.
+        :param start: index of the first cell.
+        :param step: distance between cells.
+        :param length: number of cells.
+        """
+        self.data = data
+        self.valid = valid
+        self.start = start
+        self.step = step
+        self.length = length
+
+    def _cell(self, index):
+        """
+        Returns the block index of row index of the view.
+        """
+        if index < 0:
+            index += self.length
+
+        if not 0 <= index < self.length:
+            msg = "view index out of range"
+            raise IndexError(msg)
+
+        return self.start + index * self.step
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in xrange(*index.indices(self.length))]
+
+        cell = self._cell(index)
+        return self.data[cell] if self.valid[cell] else None
+
+    def __setitem__(self, index, value):
+        cell = self._cell(index)
+        if value is None:
+            self.data[cell] = 0
+            self.valid[cell] = 0
+
+        else:
+            self.data[cell] = value
+            self.valid[cell] = 1
+
+    def __iter__(self):
+        stop = self.start + self.length * self.step
+        cells = slice(self.start, stop, self.step)
+        return (x if v else None for x, v in
+                izip(self.data[cells], self.valid[cells]))
+
+    def count(self, value):
+        """
+        Returns the number of values equal to value.
+        """
+        if value is None:
+            stop = self.start + self.length * self.step
+            return self.valid[self.start:stop:self.step].count(NULL)
+
+        return self.tolist().count(value)
+
+    def tolist(self):
+        """
+        Returns a list of the values with None for null cells.
+        """
+        return list(self)
+
+    def __eq__(self, other):
+        try:
+            return len(self) == len(other) and self.tolist() == list(other)
+
+        except TypeError:
+            return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+
+def _numeric(column):
+    """
+    Returns True if the first non null value of a column is a number.
+    """
+    if isinstance(column, TypedColumn):
+        return True
+
+    for x in column:
+        if x is not None:
+            return isinstance(x, (int, long, float))
+
+    return False
+
+
+class Panel(object):
+    """
+    Numeric fields of many symbols on a shared sorted date axis.
+
+    Usage:
+    >>> goog = Series('dates', 'closes')
+    >>> goog.extend([[1, 600.0], [2, 610.0]])
+    >>> yhoo = Series('dates', 'closes')
+    >>> yhoo.extend([[2, 15.0], [3, 16.0]])
+    >>> panel = Panel(dict(goog=goog, yhoo=yhoo))
+    >>> panel.dates, panel.symbols
+    ([1, 2, 3], ['goog', 'yhoo'])
+    >>> panel.at(2, 'closes')
+    [610.0, 15.0]
+    >>> panel.view('yhoo', 'closes')
+    [None, 15.0, 16.0]
+    """
+    def __init__(self, series, on='dates', fields=None, typecode='d'):
+        """
+        :param series: dict of symbol to Series.
+        :param on: key of the date column of every series.
+        :param fields: (optional) keys of the fields to hold.  Defaults
+            to the numeric columns of the series.
+        :param typecode: array typecode of the blocks.
+        """
+        self.on = on
+        self.typecode = typecode
+        self.symbols = sorted(series)
+
+        dates = set()
+        for symbol in self.symbols:
+            dates.update(x for x in series[symbol]._getcol(on)
+                         if x is not None)
+
+        self.dates = sorted(dates)
+
+        if fields is None:
+            fields = []
+            for symbol in self.symbols:
+                item = series[symbol]
+                for key in item.keys():
+                    if key != on and key not in fields and \
+                       _numeric(item.__dict__[key]):
+                        fields.append(key)
+
+        self.fields = list(fields)
+        self._rows = dict((date, i) for i, date in enumerate(self.dates))
+        self._blocks = {}
+
+        width = len(self.symbols)
+        size = len(self.dates) * width
+        for field in self.fields:
+            data = array(typecode, [0]) * size
+            valid = bytearray(size)
+            for j, symbol in enumerate(self.symbols):
+                item = series[symbol]
+                if field not in item.keys():
+                    continue
+
+                for date, value in izip(item.__dict__[on],
+                                        item.__dict__[field]):
+                    if date is None or value is None:
+                        continue
+
+                    cell = self._rows[date] * width + j
+                    data[cell] = value
+                    valid[cell] = 1
+
+            self._blocks[field] = (data, valid)
+
+    def __len__(self):
+        """
+        Returns the number of dates in your panel.
+        """
+        return len(self.dates)
+
+    def _block(self, field):
+        """
+        Returns the (data, valid) block of a field.
+        """
+        if field not in self._blocks:
+            msg = "'%s' not defined as field to panel" % (field,)
+            raise KeyError(msg)
+
+        return self._blocks[field]
+
+    def _row(self, date):
+        """
+        Returns the row of a date.
+        """
+        if date not in self._rows:
+            msg = "'%s' not found in dates of panel" % (date,)
+            raise KeyError(msg)
+
+        return self._rows[date]
+
+    def _column(self, symbol):
+        """
+        Returns the column of a symbol.
+        """
+        i = bisect_left(self.symbols, symbol)
+        if i == len(self.symbols) or self.symbols[i] != symbol:
+            msg = "'%s' not found in symbols of panel" % (symbol,)
+            raise KeyError(msg)
+
+        return i
+
+    def at(self, date, field=None):
+        """
+        Returns the cross section of a date.  With a field, a view of
+        the field's value for each symbol.  Otherwise a Series with a row
+        per symbol holding the symbol and every field.
+
+        :param date: date of the cross section.
+        :param field: (optional) name of a field.
+        """
+        start = self._row(date) * len(self.symbols)
+        if field is not None:
+            data, valid = self._block(field)
+            return StridedView(data, valid, start, 1, len(self.symbols))
+
+        series = Series('symbols', *self.fields)
+        series.__dict__['symbols'] = list(self.symbols)
+        stop = start + len(self.symbols)
+        for field in self.fields:
+            data, valid = self._blocks[field]
+            series.__dict__[field] = TypedColumn.wrap(
+                self.typecode, data[start:stop], valid[start:stop])
+
+        series._barcnt = len(self.symbols)
+        return series
+
+    def view(self, symbol, field):
+        """
+        Returns a view of a field's values of a symbol for every date.
+        The view shares memory with your panel.
+
+        :param symbol: name of the symbol.
+        :param field: name of the field.
+        """
+        data, valid = self._block(field)
+        width = len(self.symbols)
+        return StridedView(data, valid, self._column(symbol), width,
+                           len(self.dates))
+
+    def series(self, symbol):
+        """
+        Returns a Series of the dates and fields of a symbol.  The field
+        columns are views sharing memory with your panel, so the series
+        can be read and updated in place but not appended to.
+
+        :param symbol: name of the symbol.
+        """
+        series = Series(self.on, *self.fields)
+        series.__dict__[self.on] = list(self.dates)
+        for field in self.fields:
+            series.__dict__[field] = self.view(symbol, field)
+
+        series._barcnt = len(self.dates)
+        return series
+
+    def to_numpy(self, field):
+        """
+        Returns a 2-dimensional ndarray view of a field with a row per
+        date and a column per symbol.  Null cells hold 0.
+
+        :param field: name of the field.
+        """
+        if numpy is None:
+            msg = "NumPy is not installed"
+            raise ImportError(msg)
+
+        data, valid = self._block(field)
+        view = numpy.frombuffer(data, self.typecode)
+        return view.reshape(len(self.dates), len(self.symbols))
+
+    def rank(self, field, date, descending=False):
+        """
+        Returns a list of the rank of each symbol's value of a field on a
+        date, 1 for the smallest value (largest when descending).  Equal
+        values are ranked in symbol order and null values are None.
+
+        :param field: name of the field.
+        :param date: date to rank.
+        :param descending: set to True to rank the largest value first.
+        """
+        data, valid = self._block(field)
+        width = len(self.symbols)
+        start = self._row(date) * width
+        return self._rank(data, valid, start, width, descending)
+
+    def _rank(self, data, valid, start, width, descending):
+        """
+        Returns the ranks of the cells of one row of a block.
+        """
+        cells = [j for j in xrange(width) if valid[start + j]]
+        if descending:
+            cells.sort(key=lambda j: -data[start + j])
+
+        else:
+            cells.sort(key=lambda j: data[start + j])
+
+        ranks = [None] * width
+        for rank, j in enumerate(cells):
+            ranks[j] = rank + 1
+
+        return ranks
+
+    def ranks(self, field, dest, descending=False):
+        """
+        Ranks the symbols on every date into a new or existing field.
+        See rank().
+
+        :param field: name of the field.
+        :param dest: name of the field to store the ranks in.
+        :param descending: set to True to rank the largest value first.
+        """
+        data, valid = self._block(field)
+        width = len(self.symbols)
+        size = len(self.dates) * width
+        rankdata = array(self.typecode, [0]) * size
+        rankvalid = bytearray(size)
+        for start in xrange(0, size, width):
+            ranks = self._rank(data, valid, start, width, descending)
+            for j, rank in enumerate(ranks):
+                if rank is not None:
+                    rankdata[start + j] = rank
+                    rankvalid[start + j] = 1
+
+        self._blocks[dest] = (rankdata, rankvalid)
+        if dest not in self.fields:
+            self.fields.append(dest)
+
+
+def _testit(verbose=None):
+    import doctest
+    doctest.testmod(verbose=verbose)
+
+if __name__ == "__main__":
+    _testit()
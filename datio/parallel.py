@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Parallel window functions over columns.
+
+apply() calls a function on the window of values ending at each row.
+The rows are split into chunks and each chunk also reads the window - 1
+rows before it, so every chunk computes the same results as a serial
+run.  The chunks run in a pool of processes.
+
+Where processes are forked the columns are handed to the pool through a
+module global before it starts, so the workers read them from memory
+shared with the parent instead of receiving a pickled copy.  Elsewhere
+each chunk is sent with its overlap rows.
+"""
+
+import os
+import multiprocessing
+
+
+_FORK = hasattr(os, 'fork')
+
+# (func, columns, window) inherited by forked workers.
+_shared = None
+
+
+def _results(func, columns, window, start, stop, offset=0):
+    """
+    Returns the results of func for rows start to stop.  columns hold
+    the rows from offset on.
+    """
+    results = []
+    for i in xrange(start, stop):
+        if i < window - 1:
+            results.append(None)
+            continue
+
+        first = i - window + 1 - offset
+        last = i + 1 - offset
+        results.append(func(*[column[first:last] for column in columns]))
+
+    return results
+
+
+def _run(task):
+    """
+    Returns the results of one chunk within a worker.
+    """
+    start, stop, chunk = task
+    if chunk is None:
+        func, columns, window = _shared
+        return _results(func, columns, window, start, stop)
+
+    func, columns, window, offset = chunk
+    return _results(func, columns, window, start, stop, offset)
+
+
+def chunks(size, window, chunksize):
+    """
+    Returns a list of (start, stop, offset) row ranges covering size
+    rows.  offset is the first row a chunk reads, window - 1 rows before
+    its start.
+
+    :param size: number of rows.
+    :param window: number of rows in each window.
+    :param chunksize: number of rows computed by each chunk.
+    """
+    ranges = []
+    for start in xrange(0, size, chunksize):
+        stop = min(start + chunksize, size)
+        ranges.append((start, stop, max(0, start - window + 1)))
+
+    return ranges
+
+
+def apply(func, columns, window=1, workers=None, chunksize=None):
+    """
+    Returns a list of func(*windows) for each row, where windows are the
+    lists of the last window values of each column.  Rows before the
+    first full window are None.
+
+    :param func: function called with one list per column.  Must be
+        picklable, a module level function, where processes are not
+        forked.
+    :param columns: list of columns of the same length.
+    :param window: number of rows in each window.
+    :param workers: (optional) number of processes.  Defaults to the
+        number of cpus.  Use 1 to run in this process.
+    :param chunksize: (optional) number of rows per chunk.  Defaults to
+        splitting the rows in four chunks per worker.
+
+    Usage:
+    >>> apply(max, [[1, 3, 2, 5]], window=2, workers=1)
+    [None, 3, 3, 5]
+    """
+    if window < 1:
+        msg = "window must be at least 1"
+        raise ValueError(msg)
+
+    size = len(columns[0]) if columns else 0
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    if workers < 2 or size < 2:
+        return _results(func, columns, window, 0, size)
+
+    if chunksize is None:
+        chunksize = -(-size // (workers * 4))
+
+    chunksize = max(chunksize, 1)
+    ranges = chunks(size, window, chunksize)
+
+    global _shared
+    if _FORK:
+        _shared = (func, columns, window)
+        tasks = [(start, stop, None) for start, stop, offset in ranges]
+
+    else:
+        tasks = [(start, stop,
+                  (func, [column[offset:stop] for column in columns],
+                   window, offset))
+                 for start, stop, offset in ranges]
+
+    pool = multiprocessing.Pool(min(workers, len(tasks)))
+    try:
+        parts = pool.map(_run, tasks, 1)
+        pool.close()
+
+    except:
+        pool.terminate()
+        raise
+
+    finally:
+        pool.join()
+        _shared = None
+
+    results = []
+    for part in parts:
+        results.extend(part)
+
+    return results
+
+
+def _testit(verbose=None):
+    import doctest
+    doctest.testmod(verbose=verbose)
+
+if __name__ == "__main__":
+    _testit()
@@ -0,0 +1,331 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Readers of fixed-width text and packed binary record files.
+
+The file is memory mapped and each field is decoded a column at a time
+straight from the mapped bytes into a column of the Series.  Numeric
+fields are loaded into TypedColumns.
+
+When NumPy is installed the records are viewed as a structured array
+over the mapped file, so each field is one vectorized conversion.
+Otherwise fixed-width fields are sliced from the map a column at a time
+and binary records are unpacked with struct.
+"""
+
+import mmap
+import re
+import struct
+from array import array
+from itertools import izip
+
+try:
+    import numpy
+
+except ImportError:
+    numpy = None
+
+from column import TypedColumn
+from core import Series
+
+
+_CODES = re.compile(r'\s*(\d*)\s*([xcbB?hHiIlLqQfds])')
+
+_ORDERS = {'@': '=', '=': '=', '<': '<', '>': '>', '!': '>'}
+
+# struct codes of float fields and of signed and unsigned integer fields.
+_FLOATS = 'fd'
+_SIGNED = 'bhilq'
+_UNSIGNED = 'BHILQ'
+
+
+def _array_typecode(kind, size):
+    """
+    Returns the array typecode holding numbers of a kind ('f', 'i' or
+    'u') and size in bytes, or None when array has none.
+    """
+    codes = {'f': 'fd', 'i': 'bhil', 'u': 'BHIL'}[kind]
+    for code in codes:
+        if array(code).itemsize == size:
+            return code
+
+    return None
+
+
+def _mapped(filename):
+    """
+    Returns a read only memory map of a file, or an empty string for an
+    empty file.
+    """
+    with open(filename, 'rb') as f1:
+        f1.seek(0, 2)
+        if not f1.tell():
+            return ''
+
+        return mmap.mmap(f1.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _close(buf):
+    """
+    Closes a memory map returned by _mapped.
+    """
+    if isinstance(buf, mmap.mmap):
+        buf.close()
+
+
+def _series(keys, columns, barcnt):
+    """
+    Returns a Series of the columns.
+    """
+    series = Series(*keys)
+    series.__dict__.update(izip(keys, columns))
+    series._barcnt = barcnt
+    return series
+
+
+def _convert(atype, fields):
+    """
+    Returns the column of the text fields converted to atype.  Blank
+    fields are None and int and float columns are TypedColumns.
+    """
+    values = [atype(x) if x else None for x in (f.strip() for f in fields)]
+    if atype in (int, float):
+        return TypedColumn('l' if atype == int else 'd', values)
+
+    return values
+
+
+def _numpy_fixed(buf, offset, reclen, barcnt, layout):
+    """
+    Returns the columns of the layout's fields decoded by NumPy.
+    """
+    itemsize = max(stop for key, start, stop, atype in layout)
+    dtype = numpy.dtype(dict(
+        names=[str(i) for i in xrange(len(layout))],
+        formats=['S%d' % (stop - start,)
+                 for key, start, stop, atype in layout],
+        offsets=[start for key, start, stop, atype in layout],
+        itemsize=itemsize))
+    records = numpy.ndarray((barcnt,), dtype, buf, offset, (reclen,))
+
+    columns = []
+    for i, (key, start, stop, atype) in enumerate(layout):
+        fields = numpy.char.strip(records[str(i)])
+        if atype not in (int, float):
+            columns.append(_convert(atype, fields.tolist()))
+            continue
+
+        blank = fields == ''
+        values = numpy.where(blank, '0', fields).astype(atype)
+        typecode = 'l' if atype == int else 'd'
+        column = TypedColumn(typecode)
+        column.data.fromstring(values.astype(typecode).tostring())
+        if blank.any():
+            column.valid = bytearray((~blank).astype(numpy.uint8).tostring())
+
+        columns.append(column)
+
+    return columns
+
+
+def fixed2series(filename, layout, skip=0):
+    """
+    Returns a Series of a fixed-width text file.  Every record is one
+    line of the same length.
+
+    :param filename: full path of filename to read.
+    :param layout: list of (key, start, stop) or (key, start, stop, atype)
+        of each field to load.  start and stop are the positions of the
+        field within the line such as a slice.  atype is a callable such
+        as float, defaults to str.  Fields are stripped of spaces and
+        blank fields are None.  int and float fields are TypedColumns.
+    :param skip: number of lines to skip, such as a header line.
+
+    Usage:
+    >>> fixed2series('ticks.txt', [('dates', 0, 8, int),
+    ...                            ('symbols', 8, 12),
+    ...                            ('closes', 12, 20, float)])
+    ...                                                 # doctest: +SKIP
+    """
+    layout = [tuple(field) + (str,) * (4 - len(field)) for field in layout]
+    for key, start, stop, atype in layout:
+        if not 0 <= start < stop:
+            msg = "field '%s' needs 0 <= start < stop" % (key,)
+            raise ValueError(msg)
+
+    keys = [field[0] for field in layout]
+    buf = _mapped(filename)
+    try:
+        offset = 0
+        for i in xrange(skip):
+            offset = buf.find('\n', offset) + 1
+            if not offset:
+                offset = len(buf)
+                break
+
+        end = buf.find('\n', offset)
+        reclen = (end if end >= 0 else len(buf)) + 1 - offset
+        barcnt = -(-(len(buf) - offset) // reclen)
+
+        if barcnt and max(field[2] for field in layout) >= reclen:
+            msg = "fields extend past the end of the %d byte line" % (
+                reclen - 1,)
+            raise ValueError(msg)
+
+        if numpy is not None and barcnt:
+            columns = _numpy_fixed(buf, offset, reclen, barcnt, layout)
+
+        else:
+            columns = []
+            stops = xrange(offset, offset + barcnt * reclen, reclen)
+            for key, start, stop, atype in layout:
+                fields = [buf[i + start:i + stop] for i in stops]
+                columns.append(_convert(atype, fields))
+
+        return _series(keys, columns, barcnt)
+
+    finally:
+        _close(buf)
+
+
+def _fields(struct_format):
+    """
+    Returns the byte order and a list of (code, offset, size) of each
+    field of a struct format.  A string field of n bytes is one field.
+    """
+    order = '@'
+    body = struct_format
+    if body[:1] in _ORDERS:
+        order, body = body[0], body[1:]
+
+    fields = []
+    prefix = ''
+    pos = 0
+    for match in _CODES.finditer(body):
+        if match.start() != pos:
+            break
+
+        pos = match.end()
+        count, code = match.groups()
+        count = int(count) if count else 1
+        if code == 'x':
+            prefix += '%dx' % (count,)
+            continue
+
+        repeat = 1 if code == 's' else count
+        item = '%ds' % (count,) if code == 's' else code
+        for i in xrange(repeat):
+            size = struct.calcsize(order + item)
+            prefix += item
+            offset = struct.calcsize(order + prefix) - size
+            fields.append((code, offset, size))
+
+    if pos != len(body.rstrip()):
+        msg = "unsupported struct format '%s'" % (struct_format,)
+        raise ValueError(msg)
+
+    return order, fields
+
+
+def _typecode(code, size):
+    """
+    Returns the array typecode of a numeric struct field, or None.
+    """
+    if code in _FLOATS:
+        return _array_typecode('f', size)
+
+    if code in _SIGNED:
+        return _array_typecode('i', size)
+
+    if code in _UNSIGNED:
+        return _array_typecode('u', size)
+
+    return None
+
+
+def struct2series(filename, struct_format, keys):
+    """
+    Returns a Series of a file of packed binary records.
+
+    :param filename: full path of filename to read.
+    :param struct_format: struct format of one record such as '<ld8s'.
+        Pad bytes (x) are skipped and a string field (s) of n bytes is
+        one field with its trailing null bytes removed.
+    :param keys: list of keys of the fields in order.  Fields with a key
+        of None are not loaded.
+    """
+    order, fields = _fields(struct_format)
+    if len(keys) != len(fields):
+        msg = "%d keys given for %d fields of '%s'" % (
+            len(keys), len(fields), struct_format)
+        raise ValueError(msg)
+
+    record = struct.Struct(struct_format)
+    buf = _mapped(filename)
+    try:
+        barcnt, extra = divmod(len(buf), record.size)
+        if extra:
+            msg = "file size is not a multiple of the %d byte record" % (
+                record.size,)
+            raise ValueError(msg)
+
+        loaded = [(key, field) for key, field in izip(keys, fields)
+                  if key is not None]
+        columns = []
+
+        if numpy is not None and barcnt:
+            for key, (code, offset, size) in loaded:
+                typecode = _typecode(code, size)
+                if typecode is None:
+                    dtype = {'s': 'S%d' % (size,), 'c': 'S1', '?': '?'}[code]
+                    values = numpy.ndarray((barcnt,), dtype, buf, offset,
+                                           (record.size,))
+                    columns.append(values.tolist())
+                    continue
+
+                kind = 'f' if code in _FLOATS else \
+                       'i' if code in _SIGNED else 'u'
+                dtype = numpy.dtype('%s%s%d' % (_ORDERS[order], kind, size))
+                values = numpy.ndarray((barcnt,), dtype, buf, offset,
+                                       (record.size,))
+                column = TypedColumn(typecode)
+                column.data.fromstring(values.astype(
+                    column.data.typecode).tostring())
+                columns.append(column)
+
+        else:
+            rows = [record.unpack_from(buf, i)
+                    for i in xrange(0, barcnt * record.size, record.size)]
+            for i, (code, offset, size) in enumerate(fields):
+                if keys[i] is None:
+                    continue
+
+                values = [row[i] for row in rows]
+                typecode = _typecode(code, size)
+                if typecode is not None:
+                    columns.append(TypedColumn(typecode, values))
+
+                elif code == 's':
+                    columns.append([x.rstrip('\x00') for x in values])
+
+                else:
+                    columns.append(values)
+
+        return _series([key for key, field in loaded], columns, barcnt)
+
+    finally:
+        _close(buf)
+
+
+def _testit(verbose=None):
+    import doctest
+    doctest.testmod(verbose=verbose)
+
+if __name__ == "__main__":
+    _testit()
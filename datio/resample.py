@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Monte Carlo resampling of a column.
+
+resample_paths() draws many resampled paths of the valid values of a
+column, calls a statistic on each path and returns aggregates of the
+statistics instead of the paths.  The positions of a path are drawn in
+one step and its values gathered with column.take, so no path is built
+a row at a time.
+
+Every path has its own seed drawn from the seed of the run and the paths
+are split in chunks of a fixed size, whatever the number of workers.  So
+the same seed gives the same results run serially or in a pool of
+processes.  Each chunk returns the running moments of its statistics,
+merged in chunk order as the chunks finish.
+
+Where processes are forked the values are handed to the pool through a
+module global, as in the parallel module.  Elsewhere each chunk is sent
+the values.
+"""
+
+import os
+import random
+import multiprocessing
+
+from column import TypedColumn
+from column import take
+from column import valid_values
+
+
+_FORK = hasattr(os, 'fork')
+
+METHODS = ('block', 'iid', 'shuffle')
+
+CHUNK_SIZE = 100
+
+# values inherited by forked workers.
+_shared = None
+
+
+def positions(size, method='block', block=20, rand=random):
+    """
+    Returns a list of size row positions of one resampled path.
+
+    :param size: number of rows to resample.
+    :param method: 'block' for a moving block bootstrap, joining blocks
+        of block rows starting at random rows; 'iid' to draw each row at
+        random with replacement; 'shuffle' for a random permutation.
+    :param block: number of rows in each block.
+    :param rand: random.Random instance drawing the positions.
+    """
+    if method == 'shuffle':
+        results = range(size)
+        rand.shuffle(results)
+        return results
+
+    if method == 'iid':
+        block = 1
+
+    elif method != 'block':
+        msg = "method must be one of %s, not %r" % (METHODS, method)
+        raise ValueError(msg)
+
+    if block < 1:
+        msg = "block must be at least 1"
+        raise ValueError(msg)
+
+    block = min(block, size)
+    if block == 1:
+        return [int(rand.random() * size) for i in xrange(size)]
+
+    randrange = rand.randrange
+    starts = [randrange(size - block + 1) for i in xrange(-(-size // block))]
+    offsets = range(block)
+    results = [start + j for start in starts for j in offsets]
+    del results[size:]
+    return results
+
+
+def _moments(stats):
+    """
+    Returns (count, mean, m2, min, max) of a list of numbers, where m2 is
+    the sum of squared differences from the mean.
+    """
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    for x in stats:
+        count += 1
+        delta = x - mean
+        mean += delta / count
+        m2 += delta * (x - mean)
+
+    low = min(stats) if stats else None
+    high = max(stats) if stats else None
+    return count, mean, m2, low, high
+
+
+def _merge(first, second):
+    """
+    Returns the moments of two sets of numbers from their moments.
+    """
+    count1, mean1, m21, low1, high1 = first
+    count2, mean2, m22, low2, high2 = second
+    if not count1:
+        return second
+
+    if not count2:
+        return first
+
+    count = count1 + count2
+    delta = mean2 - mean1
+    mean = mean1 + delta * count2 / count
+    m2 = m21 + m22 + delta * delta * count1 * count2 / count
+    return count, mean, m2, min(low1, low2), max(high1, high2)
+
+
+def _paths(values, seeds, method, block, stat, keep):
+    """
+    Returns the moments of stat over the paths of seeds, and the list of
+    the stats when keep is set.
+    """
+    size = len(values)
+    stats = []
+    for seed in seeds:
+        path = take(values, positions(size, method, block,
+                                      random.Random(seed)))
+        stats.append(stat(path))
+
+    return _moments(stats), (stats if keep else None)
+
+
+def _run(task):
+    """
+    Returns the results of one chunk of paths within a worker.
+    """
+    values, seeds, method, block, stat, keep = task
+    if values is None:
+        values = _shared
+
+    return _paths(values, seeds, method, block, stat, keep)
+
+
+def _quantile(values, q):
+    """
+    Returns the q quantile of sorted values such as Series.quantile.
+    """
+    position = (len(values) - 1) * q
+    k = int(position)
+    if position == k:
+        return values[k]
+
+    lower, upper = values[k], values[k + 1]
+    return lower + (upper - lower) * (position - k)
+
+
+def resample_paths(column, n_paths, method='block', block=20, seed=None,
+                   workers=1, stat=None, quantiles=None,
+                   chunksize=CHUNK_SIZE):
+    """
+    Returns a dict of the aggregates of stat over n_paths resampled paths
+    of the valid values of a column: the number of paths, the mean,
+    std (sample standard deviation), min and max of the stats, and the
+    quantiles of the stats when asked for.
+
+    :param column: TypedColumn or list of values.
+    :param n_paths: number of paths.
+    :param method: 'block', 'iid' or 'shuffle'.  See positions().
+    :param block: number of rows in each block of the 'block' method.
+    :param seed: (optional) seed of the run.  The same seed gives the
+        same results for any number of workers.
+    :param workers: number of processes.  None uses every cpu.
+    :param stat: (optional) function called with each path, a column
+        like column, returning a number.  Defaults to sum.  Must be
+        picklable, a module level function, where processes are not
+        forked.
+    :param quantiles: (optional) list of quantiles from 0 to 1 of the
+        stats to return.  The stat of every path is kept to find them.
+    :param chunksize: number of paths in each chunk.
+
+    Usage:
+    >>> results = resample_paths([1, 2, 3], 10, 'shuffle', seed=1)
+    >>> results['paths'], results['mean'], results['std']
+    (10, 6.0, 0.0)
+    """
+    if n_paths < 1:
+        msg = "n_paths must be at least 1"
+        raise ValueError(msg)
+
+    if method not in METHODS:
+        msg = "method must be one of %s, not %r" % (METHODS, method)
+        raise ValueError(msg)
+
+    if block < 1:
+        msg = "block must be at least 1"
+        raise ValueError(msg)
+
+    for q in quantiles or ():
+        if not 0 <= q <= 1:
+            msg = "quantile must be between 0 and 1, not %r" % (q,)
+            raise ValueError(msg)
+
+    if isinstance(column, TypedColumn):
+        values = TypedColumn(column.typecode, valid_values(column))
+
+    else:
+        values = list(valid_values(column))
+
+    if not len(values):
+        msg = "no values to resample"
+        raise ValueError(msg)
+
+    stat = stat or sum
+    keep = bool(quantiles)
+    master = random.Random(seed)
+    seeds = [master.getrandbits(64) for i in xrange(n_paths)]
+    chunksize = max(chunksize, 1)
+    parts = [seeds[i:i + chunksize] for i in xrange(0, n_paths, chunksize)]
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    global _shared
+    pool = None
+    if workers < 2 or len(parts) < 2:
+        results = (_paths(values, part, method, block, stat, keep)
+                   for part in parts)
+
+    else:
+        shared = None if _FORK else values
+        if _FORK:
+            _shared = values
+
+        tasks = [(shared, part, method, block, stat, keep) for part in parts]
+        pool = multiprocessing.Pool(min(workers, len(tasks)))
+        results = pool.imap(_run, tasks)
+
+    moments = (0, 0.0, 0.0, None, None)
+    stats = []
+    try:
+        for part, kept in results:
+            moments = _merge(moments, part)
+            if keep:
+                stats.extend(kept)
+
+        if pool is not None:
+            pool.close()
+
+    except:
+        if pool is not None:
+            pool.terminate()
+
+        raise
+
+    finally:
+        if pool is not None:
+            pool.join()
+            _shared = None
+
+    count, mean, m2, low, high = moments
+    aggregates = dict(paths=count, mean=mean, min=low, max=high,
+                      std=(m2 / (count - 1)) ** 0.5 if count > 1 else None)
+    if keep:
+        stats.sort()
+        aggregates['quantiles'] = [_quantile(stats, q) for q in quantiles]
+
+    return aggregates
+
+
+def _testit(verbose=None):
+    import doctest
+    doctest.testmod(verbose=verbose)
+
+if __name__ == "__main__":
+    _testit()
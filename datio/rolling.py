@@ -0,0 +1,502 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Rolling window functions over columns.
+
+Each function returns a column the length of its input holding the
+result for the window ending at each row.  Rows before the first full
+window are None.  Null values are skipped: a window is aggregated over
+its valid values and is None when it has none.
+
+Rolling sums and means of floats keep the total of the window as
+non-overlapping partial sums, as math.fsum does, so no rounding error
+builds up as values leave the window.  NaN and infinite values are
+counted apart from the total and only affect the windows holding them.
+
+The order statistics (median, quantile and rank) keep the valid values
+of the window in an IndexableSkiplist, so each row costs O(log window)
+instead of sorting every window.  They are scans (see the scans module)
+and can be kept up to date as rows are appended.
+"""
+
+import random
+from collections import deque
+from math import fsum
+from math import isinf
+from math import isnan
+from math import log
+
+from column import TypedColumn
+from column import data_and_mask
+from scans import ScanState
+
+
+def _result(column, results, typecode):
+    """
+    Returns results as a TypedColumn when column is typed.
+    """
+    if isinstance(column, TypedColumn):
+        return TypedColumn(typecode, results)
+
+    return results
+
+
+def _rolling(column, window, mean):
+    """
+    Returns the rolling sum, or mean, of a column.
+    """
+    if window < 1:
+        msg = "window must be at least 1"
+        raise ValueError(msg)
+
+    data, mask = data_and_mask(column)
+    typecode = getattr(column, 'typecode', None)
+    if typecode in ('f', 'd') or typecode is None and \
+       any(isinstance(x, float) for x in data):
+        return _rolling_floats(data, mask, window, mean)
+
+    results = [None] * len(data)
+    total = 0
+    count = 0
+
+    if mask is None:
+        for i, x in enumerate(data):
+            total += x
+            if i >= window:
+                total -= data[i - window]
+
+            if i >= window - 1:
+                results[i] = total / float(window) if mean else total
+
+        return results
+
+    for i, x in enumerate(data):
+        total += x
+        count += mask[i]
+        if i >= window:
+            total -= data[i - window]
+            count -= mask[i - window]
+
+        if i >= window - 1 and count:
+            results[i] = total / float(count) if mean else total
+
+    return results
+
+
+def _add_partial(partials, x):
+    """
+    Adds a finite float to the non-overlapping partial sums of a total
+    without rounding error.
+    """
+    i = 0
+    for y in partials:
+        if abs(x) < abs(y):
+            x, y = y, x
+
+        hi = x + y
+        lo = y - (hi - x)
+        if lo:
+            partials[i] = lo
+            i += 1
+
+        x = hi
+
+    partials[i:] = [x]
+
+
+def _rolling_floats(data, mask, window, mean):
+    """
+    Returns the rolling sum, or mean, of float data with the total of
+    each window rounded once.
+    """
+    results = [None] * len(data)
+    partials = []
+    # number of NaN, positive and negative infinite values in the window.
+    special = [0, 0, 0]
+    count = 0
+
+    def add(x, sign):
+        if isnan(x):
+            special[0] += sign
+
+        elif isinf(x):
+            special[1 if x > 0 else 2] += sign
+
+        else:
+            _add_partial(partials, sign * x)
+
+    for i, x in enumerate(data):
+        if mask is None or mask[i]:
+            add(x, 1)
+            count += 1
+
+        if i >= window and (mask is None or mask[i - window]):
+            add(data[i - window], -1)
+            count -= 1
+
+        if i < window - 1 or not count:
+            continue
+
+        nans, positive, negative = special
+        if nans or positive and negative:
+            total = float('nan')
+
+        elif positive or negative:
+            total = float('inf') if positive else float('-inf')
+
+        else:
+            total = fsum(partials)
+
+        results[i] = total / count if mean else total
+
+    return results
+
+
+def rolling_sum(column, window):
+    """
+    Returns the rolling sum of a column.
+
+    :param column: TypedColumn or list of values.
+    :param window: number of rows in each window.
+
+    Usage:
+    >>> rolling_sum([1, 2, None, 4], 2)
+    [None, 3, 2, 4]
+    """
+    results = _rolling(column, window, False)
+    return _result(column, results, getattr(column, 'typecode', 'd'))
+
+
+def rolling_mean(column, window):
+    """
+    Returns the rolling mean of a column.
+
+    :param column: TypedColumn or list of values.
+    :param window: number of rows in each window.
+
+    Usage:
+    >>> rolling_mean([1, 2, None, 4], 2)
+    [None, 1.5, 2.0, 4.0]
+    """
+    return _result(column, _rolling(column, window, True), 'd')
+
+
+class _End(object):
+    """
+    Value of the end of a skiplist, greater than every other value.
+    """
+    def __lt__(self, other):
+        return False
+
+    __le__ = __eq__ = __lt__
+
+    def __gt__(self, other):
+        return True
+
+    __ge__ = __ne__ = __gt__
+
+
+class _Node(object):
+    __slots__ = ('value', 'next', 'width')
+
+    def __init__(self, value, next, width):
+        self.value = value
+        self.next = next
+        self.width = width
+
+
+_NIL = _Node(_End(), [], [])
+
+
+class IndexableSkiplist(object):
+    """
+    Sorted collection of values with O(log n) insert, remove, lookup by
+    position and rank.  Each link holds its width, the number of values
+    it skips, so positions are found by summing widths down the levels.
+
+    Usage:
+    >>> values = IndexableSkiplist()
+    >>> for x in [5, 1, 3, 3]:
+    ...     values.insert(x)
+    >>> values.remove(1)
+    >>> list(values), values[0], values.bisect_left(3), values.bisect_right(3)
+    ([3, 3, 5], 3, 0, 2)
+    """
+    def __init__(self, expected_size=100):
+        """
+        :param expected_size: number of values the skiplist is sized for.
+        """
+        self.size = 0
+        self.maxlevels = int(1 + log(max(expected_size, 2), 2))
+        self.head = _Node(None, [_NIL] * self.maxlevels,
+                          [1] * self.maxlevels)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+
+        if not 0 <= index < self.size:
+            msg = "skiplist index out of range"
+            raise IndexError(msg)
+
+        node = self.head
+        index += 1
+        for level in reversed(xrange(self.maxlevels)):
+            while node.width[level] <= index:
+                index -= node.width[level]
+                node = node.next[level]
+
+        return node.value
+
+    def __iter__(self):
+        node = self.head.next[0]
+        while node is not _NIL:
+            yield node.value
+            node = node.next[0]
+
+    def insert(self, value):
+        """
+        Adds a value after any equal values.
+        """
+        chain = [None] * self.maxlevels
+        steps = [0] * self.maxlevels
+        node = self.head
+        for level in reversed(xrange(self.maxlevels)):
+            while node.next[level].value <= value:
+                steps[level] += node.width[level]
+                node = node.next[level]
+
+            chain[level] = node
+
+        height = min(self.maxlevels, 1 - int(log(1 - random.random(), 2.0)))
+        new = _Node(value, [None] * height, [None] * height)
+        skipped = 0
+        for level in xrange(height):
+            prev = chain[level]
+            new.next[level] = prev.next[level]
+            prev.next[level] = new
+            new.width[level] = prev.width[level] - skipped
+            prev.width[level] = skipped + 1
+            skipped += steps[level]
+
+        for level in xrange(height, self.maxlevels):
+            chain[level].width[level] += 1
+
+        self.size += 1
+
+    def remove(self, value):
+        """
+        Removes one value equal to value.  Raises ValueError when there
+        is none.
+        """
+        chain = [None] * self.maxlevels
+        node = self.head
+        for level in reversed(xrange(self.maxlevels)):
+            while node.next[level].value < value:
+                node = node.next[level]
+
+            chain[level] = node
+
+        node = chain[0].next[0]
+        if node is _NIL or node.value != value:
+            msg = "%r not found in skiplist" % (value,)
+            raise ValueError(msg)
+
+        for level in xrange(len(node.next)):
+            prev = chain[level]
+            prev.width[level] += node.width[level] - 1
+            prev.next[level] = node.next[level]
+
+        for level in xrange(len(node.next), self.maxlevels):
+            chain[level].width[level] -= 1
+
+        self.size -= 1
+
+    def _bisect(self, value, right):
+        """
+        Returns the number of values less than value, or not greater
+        than value when right is set.
+        """
+        position = 0
+        node = self.head
+        for level in reversed(xrange(self.maxlevels)):
+            while True:
+                following = node.next[level].value
+                if not (following <= value if right else following < value):
+                    break
+
+                position += node.width[level]
+                node = node.next[level]
+
+        return position
+
+    def bisect_left(self, value):
+        """
+        Returns the number of values less than value.
+        """
+        return self._bisect(value, False)
+
+    def bisect_right(self, value):
+        """
+        Returns the number of values less than or equal to value.
+        """
+        return self._bisect(value, True)
+
+
+def _quantile(values, q):
+    """
+    Returns the q quantile of a sorted sequence such as Series.quantile,
+    interpolating between two values.
+    """
+    position = (len(values) - 1) * q
+    k = int(position)
+    lower = values[k]
+    if position == k:
+        return lower
+
+    upper = values[k + 1]
+    return lower + (upper - lower) * (position - k)
+
+
+class RollingOrder(ScanState):
+    """
+    Running state of an order statistic over the window ending at each
+    row.  Subclasses compute the statistic from the sorted valid values
+    of the window.
+    """
+    typecode = 'd'
+
+    def __init__(self, window):
+        if window < 1:
+            msg = "window must be at least 1"
+            raise ValueError(msg)
+
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.last = deque(maxlen=self.window)
+        self.sorted = IndexableSkiplist(self.window)
+
+    def statistic(self, value):
+        """
+        Returns the statistic of the window ending at value.
+        """
+        raise NotImplementedError
+
+    def update(self, values):
+        results = []
+        append = results.append
+        last = self.last
+        window = self.window
+        insert = self.sorted.insert
+        remove = self.sorted.remove
+        for x in values:
+            if len(last) == window and last[0] is not None:
+                remove(last[0])
+
+            last.append(x)
+            if x is not None:
+                insert(x)
+
+            if len(last) < window or not self.sorted.size:
+                append(None)
+
+            else:
+                append(self.statistic(x))
+
+        return results
+
+
+class RollingQuantile(RollingOrder):
+    """
+    Rolling quantile, interpolated between values such as
+    Series.quantile.
+    """
+    def __init__(self, window, q=0.5):
+        if not 0 <= q <= 1:
+            msg = "quantile must be between 0 and 1, not %r" % (q,)
+            raise ValueError(msg)
+
+        self.q = q
+        RollingOrder.__init__(self, window)
+
+    def statistic(self, value):
+        return _quantile(self.sorted, self.q)
+
+
+class RollingRank(RollingOrder):
+    """
+    Rolling rank of each value within its window, 1 for the smallest.
+    Equal values share the mean of their ranks.  None for a null value.
+    """
+    def statistic(self, value):
+        if value is None:
+            return None
+
+        below = self.sorted.bisect_left(value)
+        equal = self.sorted.bisect_right(value) - below
+        return below + (equal + 1) / 2.0
+
+
+def rolling_median(column, window):
+    """
+    Returns the rolling median of a column.
+
+    :param column: TypedColumn or list of values.
+    :param window: number of rows in each window.
+
+    Usage:
+    >>> rolling_median([1, 5, None, 3, 4], 3)
+    [None, None, 3.0, 4.0, 3.5]
+    """
+    return rolling_quantile(column, window, 0.5)
+
+
+def rolling_quantile(column, window, q):
+    """
+    Returns the rolling q quantile of a column.
+
+    :param column: TypedColumn or list of values.
+    :param window: number of rows in each window.
+    :param q: quantile from 0 to 1.
+
+    Usage:
+    >>> rolling_quantile([1, 5, 2, 3, 4], 3, 1)
+    [None, None, 5, 5, 4]
+    """
+    state = RollingQuantile(window, q)
+    return state.result(column, state.update(column))
+
+
+def rolling_rank(column, window):
+    """
+    Returns the rank of each value of a column within the window ending
+    at its row.
+
+    :param column: TypedColumn or list of values.
+    :param window: number of rows in each window.
+
+    Usage:
+    >>> rolling_rank([1, 5, 5, 3, None], 3)
+    [None, None, 2.5, 1.0, None]
+    """
+    state = RollingRank(window)
+    return state.result(column, state.update(column))
+
+
+def _testit(verbose=None):
+    import doctest
+    doctest.testmod(verbose=verbose)
+
+if __name__ == "__main__":
+    _testit()
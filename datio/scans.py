@@ -0,0 +1,429 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Scan functions over columns.
+
+A scan carries a running state from row to row, such as the running
+total of a cumulative sum.  Each scan is a class whose update() takes
+the next values of a column and returns their results, so a scan can be
+run over a whole column at once or kept up to date as rows are
+appended.  The functions of this module run a new scan over a column.
+
+Null values give a None result and leave the running state unchanged.
+
+A scan of a whole TypedColumn runs over the column's array in bulk with
+NumPy when it is installed, null rows handled through the validity
+mask.  The results are the same as the row by row update(), which is
+used for list columns, for rows appended later and for int sums that
+could overflow 64 bits.
+"""
+
+from array import array
+from collections import deque
+
+try:
+    import numpy
+
+except ImportError:
+    numpy = None
+
+from column import TypedColumn
+
+
+class ScanState(object):
+    """
+    Running state of a scan over a column.
+    """
+    # typecode of a TypedColumn of results, None for the column's own.
+    typecode = None
+
+    def reset(self):
+        """
+        Starts the scan again from the first row.
+        """
+        pass
+
+    def update(self, values):
+        """
+        Returns a list of the results of the next values of a column.
+        """
+        raise NotImplementedError
+
+    def result(self, column, results):
+        """
+        Returns results as a TypedColumn when column is typed.
+        """
+        if isinstance(column, TypedColumn):
+            return TypedColumn(self.typecode or column.typecode, results)
+
+        return results
+
+    def run(self, column):
+        """
+        Returns the results of the scan over a whole column from its
+        first row.  The state is left ready to update() the rows that
+        follow.
+        """
+        self.reset()
+        if numpy is not None and isinstance(column, TypedColumn) and \
+           len(column):
+            results = self.bulk(column.__array__(), _valid(column))
+            if results is not NotImplemented:
+                values, valid = results
+                return self._typed(column, values, valid)
+
+        return self.result(column, self.update(column))
+
+    def bulk(self, data, valid):
+        """
+        Returns a tuple of (values, valid) ndarrays of the results over
+        the data of a typed column, valid a boolean ndarray of its valid
+        rows, and updates the state.  NotImplemented when the scan has
+        no bulk version.
+        """
+        return NotImplemented
+
+    def _typed(self, column, values, valid):
+        """
+        Returns a TypedColumn of the values of the valid rows.
+        """
+        typecode = self.typecode or column.typecode
+        values = numpy.where(valid, values, 0).astype(typecode)
+        data = array(typecode)
+        data.fromstring(values.tostring())
+        mask = None
+        if not valid.all():
+            mask = bytearray(valid.astype(numpy.uint8).tostring())
+
+        return TypedColumn.wrap(typecode, data, mask)
+
+
+# bound below the int64 limit of totals that sum without wrapping, with
+# room for the rounding of a float sum.
+_INT_BOUND = 2.0 ** 62
+
+
+def _valid(column):
+    """
+    Returns a boolean ndarray of the valid rows of a TypedColumn.
+    """
+    mask = column.nullmask()
+    if mask is None:
+        return numpy.ones(len(column), bool)
+
+    return numpy.frombuffer(mask, numpy.uint8) != 0
+
+
+def _lowest(data):
+    """
+    Returns the lowest value of the dtype of data.
+    """
+    if data.dtype.kind == 'f':
+        return -numpy.inf
+
+    return numpy.iinfo(data.dtype).min
+
+
+def _peaks(data, valid, peak):
+    """
+    Returns the cumulative maximum of the valid rows of data from peak,
+    or None, and the new peak.
+    """
+    peaks = numpy.maximum.accumulate(numpy.where(valid, data, _lowest(data)))
+    if peak is not None:
+        peaks = numpy.maximum(peaks, peak)
+
+    if valid.any():
+        peak = peaks[-1].item()
+
+    return peaks, peak
+
+
+class CumSum(ScanState):
+    """
+    Cumulative sum.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.total = 0
+
+    def update(self, values):
+        results = []
+        append = results.append
+        total = self.total
+        for x in values:
+            if x is None:
+                append(None)
+                continue
+
+            total += x
+            append(total)
+
+        self.total = total
+        return results
+
+    def bulk(self, data, valid):
+        dtype = numpy.float64 if data.dtype.kind == 'f' else numpy.int64
+        if dtype is numpy.int64:
+            # int64 sums wrap around; leave totals that could reach the
+            # limit to update(), whose ints turn into longs.
+            bound = numpy.abs(data.astype(numpy.float64)).sum()
+            if bound + abs(self.total) >= _INT_BOUND:
+                return NotImplemented
+
+        totals = numpy.cumsum(data, dtype=dtype)
+        if self.total:
+            totals += self.total
+
+        self.total = totals[-1].item()
+        return totals, valid
+
+
+class CumMax(ScanState):
+    """
+    Cumulative maximum.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.peak = None
+
+    def update(self, values):
+        results = []
+        append = results.append
+        peak = self.peak
+        for x in values:
+            if x is None:
+                append(None)
+                continue
+
+            if peak is None or x > peak:
+                peak = x
+
+            append(peak)
+
+        self.peak = peak
+        return results
+
+    def bulk(self, data, valid):
+        peaks, self.peak = _peaks(data, valid, self.peak)
+        return peaks, valid
+
+
+class Drawdown(ScanState):
+    """
+    Fraction each value is below the cumulative maximum, 0 at a new
+    maximum.  None while the maximum is 0.
+    """
+    typecode = 'd'
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.peak = None
+
+    def update(self, values):
+        results = []
+        append = results.append
+        peak = self.peak
+        for x in values:
+            if x is None:
+                append(None)
+                continue
+
+            if peak is None or x > peak:
+                peak = x
+
+            append(x / float(peak) - 1 if peak else None)
+
+        self.peak = peak
+        return results
+
+    def bulk(self, data, valid):
+        peaks, self.peak = _peaks(data, valid, self.peak)
+        valid = valid & (peaks != 0)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            results = data.astype(float) / peaks - 1
+
+        return results, valid
+
+
+class PctChange(ScanState):
+    """
+    Fraction each value changed from the value periods rows before.
+    None when either value is null or the earlier value is 0.
+    """
+    typecode = 'd'
+
+    def __init__(self, periods=1):
+        if periods < 1:
+            msg = "periods must be at least 1"
+            raise ValueError(msg)
+
+        self.periods = periods
+        self.reset()
+
+    def reset(self):
+        self.last = deque([None] * self.periods, self.periods)
+
+    def update(self, values):
+        results = []
+        append = results.append
+        last = self.last
+        for x in values:
+            prev = last[0]
+            if x is None or not prev:
+                append(None)
+
+            else:
+                append(x / float(prev) - 1)
+
+            last.append(x)
+
+        return results
+
+    def bulk(self, data, valid):
+        periods = self.periods
+        prev = numpy.zeros(len(data))
+        prevvalid = numpy.zeros(len(data), bool)
+        prev[periods:] = data[:-periods]
+        prevvalid[periods:] = valid[:-periods]
+        tail = max(len(data) - periods, 0)
+        self.last.extend(x.item() if v else None for x, v in
+                         zip(data[tail:], valid[tail:]))
+
+        valid = valid & prevvalid & (prev != 0)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            results = data.astype(float) / prev - 1
+
+        return results, valid
+
+
+class Shift(ScanState):
+    """
+    Value n rows before each row.  The first n rows are None.
+    """
+    def __init__(self, n=1):
+        if n < 0:
+            msg = "only positive shifts can be updated as rows are appended"
+            raise ValueError(msg)
+
+        self.n = n
+        self.reset()
+
+    def reset(self):
+        self.last = deque([None] * self.n, self.n) if self.n else None
+
+    def update(self, values):
+        last = self.last
+        if last is None:
+            return list(values)
+
+        results = []
+        append = results.append
+        for x in values:
+            append(last[0])
+            last.append(x)
+
+        return results
+
+
+def _run(scan, column):
+    """
+    Returns the results of a new scan over a whole column.
+    """
+    return scan.run(column)
+
+
+def cumsum(column):
+    """
+    Returns the cumulative sum of a column.
+
+    :param column: TypedColumn or list of values.
+
+    Usage:
+    >>> cumsum([1, 2, None, 4])
+    [1, 3, None, 7]
+    """
+    return _run(CumSum(), column)
+
+
+def cummax(column):
+    """
+    Returns the cumulative maximum of a column.
+
+    :param column: TypedColumn or list of values.
+
+    Usage:
+    >>> cummax([1, 3, None, 2])
+    [1, 3, None, 3]
+    """
+    return _run(CumMax(), column)
+
+
+def drawdown(column):
+    """
+    Returns the drawdown of a column from its cumulative maximum.
+
+    :param column: TypedColumn or list of values.
+
+    Usage:
+    >>> drawdown([100, 120, 90, 130])
+    [0.0, 0.0, -0.25, 0.0]
+    """
+    return _run(Drawdown(), column)
+
+
+def pct_change(column, periods=1):
+    """
+    Returns the percent change of a column over periods rows.
+
+    :param column: TypedColumn or list of values.
+    :param periods: number of rows to compare each value with.
+
+    Usage:
+    >>> pct_change([100, 125, None, 99])
+    [None, 0.25, None, None]
+    """
+    return _run(PctChange(periods), column)
+
+
+def shift(column, n=1):
+    """
+    Returns a column shifted down n rows, or up when n is negative.
+    Rows shifted in are None.
+
+    :param column: TypedColumn or list of values.
+    :param n: number of rows to shift.
+
+    Usage:
+    >>> shift([1, 2, 3], 1)
+    [None, 1, 2]
+    >>> shift([1, 2, 3], -1)
+    [2, 3, None]
+    """
+    if n >= 0:
+        return _run(Shift(n), column)
+
+    values = list(column)
+    count = min(-n, len(values))
+    results = values[count:] + [None] * count
+    return ScanState().result(column, results)
+
+
+def _testit(verbose=None):
+    import doctest
+    doctest.testmod(verbose=verbose)
+
+if __name__ == "__main__":
+    _testit()
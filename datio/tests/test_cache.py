@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Test the cache module.
+
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if not libpath in sys.path:
+    sys.path.insert(1, libpath)
+del libpath
+
+from cache import CsvCache
+from column import TypedColumn
+from core import between
+from core import csv2dol
+
+
+def parse_open(value):
+    return float(value) if value else None
+
+
+class CsvCache_TestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cachedir = os.path.join(self.tmpdir, 'cache')
+        self.filename = os.path.join(self.tmpdir, 'prices.csv')
+        shutil.copy('testfiles/csv2dol_types.csv', self.filename)
+        os.utime(self.filename, (1000000000, 1000000000))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _rewrite(self, content):
+        with open(self.filename, 'wb') as f1:
+            f1.write(content)
+        os.utime(self.filename, (1000000000, 1000000000))
+
+    def test_miss_then_hit(self):
+        cache = CsvCache(self.cachedir)
+        results = csv2dol(self.filename, header=True, infer=True,
+                          typed=True, cache=cache)
+        self.assertEquals(len(cache.entries()), 1)
+
+        size = os.path.getsize(self.filename)
+        self._rewrite('x' * (size - 1) + '\n')
+
+        cached = csv2dol(self.filename, header=True, infer=True, typed=True,
+                         cache=cache)
+        self.assertEquals(cached, results)
+        self.assertTrue(isinstance(cached[1]['Open'], TypedColumn))
+        self.assertEquals(cached[2]['Date'], 'date')
+
+    def test_changed_file(self):
+        cache = CsvCache(self.cachedir)
+        csv2dol(self.filename, header=True, cache=cache)
+        self._rewrite('Date,Open\n2011-11-21,34.20\n')
+
+        keys, dol, kinds = csv2dol(self.filename, header=True, cache=cache)
+        self.assertEquals(keys, ['Date', 'Open'])
+        self.assertEquals(len(cache.entries()), 2)
+
+    def test_changed_options(self):
+        cache = CsvCache(self.cachedir)
+        keys, dol, kinds = csv2dol(self.filename, header=True, cache=cache)
+        self.assertEquals(dol['Open'][0], '34.20')
+
+        keys, dol, kinds = csv2dol(self.filename, header=True, infer=True,
+                                   cache=cache)
+        self.assertEquals(dol['Open'][0], 34.2)
+        self.assertEquals(len(cache.entries()), 2)
+
+    def test_where_options(self):
+        cache = CsvCache(self.cachedir)
+        where = dict(Symbol=set(['yhoo', 'goog', 'msft']),
+                     Date=between('2011-11-22'))
+        results = csv2dol(self.filename, header=True, usecols=['Date'],
+                          where=where, cache=cache)
+        self.assertEquals(results[1]['Date'], ['2011-11-22', '2011-11-23',
+                                               '2011-11-24'])
+
+        self._rewrite('x' * os.path.getsize(self.filename))
+        where = dict(Date=between('2011-11-22'),
+                     Symbol=set(['msft', 'goog', 'yhoo']))
+        cached = csv2dol(self.filename, header=True, usecols=['Date'],
+                         where=where, cache=cache)
+        self.assertEquals(cached, results)
+        self.assertEquals(len(cache.entries()), 1)
+
+    def test_function_options(self):
+        cache = CsvCache(self.cachedir)
+        keys, dol, kinds = csv2dol(self.filename, header=True, cache=cache,
+                                   types=dict(Open=parse_open))
+        self.assertEquals(dol['Open'][0], 34.2)
+        keys, dol, kinds = csv2dol(self.filename, header=True, cache=cache,
+                                   where=dict(Symbol=lambda x: x == 'goog'))
+        self.assertEquals(dol['Symbol'], ['goog'])
+        self.assertEquals(cache.entries(), [])
+
+        csv2dol(self.filename, header=True, cache=cache,
+                types=dict(Open=float, Volume='float'),
+                where=dict(Date=between('2011-11-22')))
+        self.assertEquals(len(cache.entries()), 1)
+
+    def test_unpicklable_types(self):
+        cache = CsvCache(self.cachedir)
+        keys, dol, kinds = csv2dol(self.filename, header=True, cache=cache,
+                                   types=dict(Open=lambda x: x or None))
+        self.assertEquals(dol['Open'][2], None)
+        self.assertEquals(cache.entries(), [])
+
+    def test_evict(self):
+        cache = CsvCache(self.cachedir)
+        csv2dol(self.filename, header=True, cache=cache)
+        csv2dol(self.filename, header=True, infer=True, cache=cache)
+        for mtime, size, entryname in cache.entries():
+            os.utime(entryname, (1000, 1000))
+
+        csv2dol(self.filename, header=True, cache=cache)
+        entries = cache.entries()
+        self.assertEquals(len(entries), 2)
+
+        cache.max_bytes = max(size for mtime, size, entryname in entries)
+        cache.evict()
+        self.assertEquals(cache.entries(), entries[1:])
+
+    def test_evict_oversized(self):
+        cache = CsvCache(self.cachedir, max_bytes=1)
+        keys, dol, kinds = csv2dol(self.filename, header=True, infer=True,
+                                   cache=cache)
+        self.assertEquals(dol['Open'][0], 34.2)
+        self.assertEquals(cache.entries(), [])
+
+    def test_clear(self):
+        cache = CsvCache(self.cachedir)
+        csv2dol(self.filename, header=True, cache=cache)
+        cache.clear()
+        self.assertEquals(cache.size(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Test the colfile module.
+
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if not libpath in sys.path:
+    sys.path.insert(1, libpath)
+del libpath
+
+from colfile import read_columns
+from colfile import write_columns
+from column import TypedColumn
+
+
+class Colfile_TestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'prices.col')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_roundtrip(self):
+        dol = dict(bar=[0, 1], symbol=['yhoo', 'goog'], close=[23.0, None])
+        write_columns(self.path, ['bar', 'symbol', 'close'], dol,
+                      meta=dict(seq=3))
+        keys, results, meta = read_columns(self.path)
+        self.assertEquals(keys, ['bar', 'symbol', 'close'])
+        self.assertEquals(results, dol)
+        self.assertEquals(meta, dict(seq=3))
+
+    def test_projection(self):
+        dol = dict(bar=[0, 1], symbol=['yhoo', 'goog'], close=[23.0, 200])
+        write_columns(self.path, ['bar', 'symbol', 'close'], dol)
+        keys, results, meta = read_columns(self.path, ['close', 'open'])
+        self.assertEquals(keys, ['close', 'open'])
+        self.assertEquals(results, dict(close=[23.0, 200],
+                                        open=[None, None]))
+
+    def test_typed(self):
+        dol = dict(bar=TypedColumn('l', [0, 1, 2]),
+                   close=TypedColumn('d', [23.0, None, 25.0]))
+        write_columns(self.path, ['bar', 'close'], dol)
+        keys, results, meta = read_columns(self.path)
+        self.assertTrue(isinstance(results['close'], TypedColumn))
+        self.assertEquals(results['bar'].typecode, 'l')
+        self.assertEquals(results['bar'], [0, 1, 2])
+        self.assertEquals(results['close'], [23.0, None, 25.0])
+
+    def test_empty(self):
+        write_columns(self.path, ['bar'], dict(bar=[]))
+        keys, results, meta = read_columns(self.path)
+        self.assertEquals(results, dict(bar=[]))
+
+    def test_not_colfile(self):
+        with open(self.path, 'wb') as f1:
+            f1.write('bar,close\n')
+        self.assertRaises(IOError, read_columns, self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
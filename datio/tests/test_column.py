@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Test the column module.
+
+"""
+
+import sys
+import os
+import unittest
+
+libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if not libpath in sys.path:
+    sys.path.insert(1, libpath)
+del libpath
+
+from column import RingColumn
+from column import TypedColumn
+from column import concat
+from column import data_and_mask
+from column import from_numpy
+from column import insert_rows
+from column import take
+from column import to_numpy
+from column import valid_values
+
+try:
+    import numpy
+
+except ImportError:
+    numpy = None
+
+
+class TypedColumn_TestCase(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def test_new_empty(self):
+        column = TypedColumn('d')
+        self.assertEquals(len(column), 0)
+        self.assertEquals(column, [])
+        self.assertEquals(column.valid, None)
+
+    def test_new_values(self):
+        column = TypedColumn('d', [1.0, 2, 3.5])
+        self.assertEquals(column, [1.0, 2.0, 3.5])
+        self.assertEquals(column.valid, None)
+        self.assertEquals(column.nullcount(), 0)
+
+    def test_new_nulls(self):
+        column = TypedColumn('l', [1, None, 3])
+        self.assertEquals(column, [1, None, 3])
+        self.assertEquals(list(column.data), [1, 0, 3])
+        self.assertEquals(column.valid, bytearray([1, 0, 1]))
+        self.assertEquals(column.nullcount(), 1)
+
+    def test_new_all_nulls(self):
+        column = TypedColumn('d', [None] * 3)
+        self.assertEquals(column, [None, None, None])
+        self.assertEquals(column.nullcount(), 3)
+
+    def test_new_badtype(self):
+        self.assertRaises(TypeError, TypedColumn, 'd', ['1.0'])
+
+    def test_getitem(self):
+        column = TypedColumn('d', [1.0, None, 3.0])
+        self.assertEquals(column[0], 1.0)
+        self.assertEquals(column[1], None)
+        self.assertEquals(column[-1], 3.0)
+        self.assertEquals(column[1:], [None, 3.0])
+
+    def test_setitem(self):
+        column = TypedColumn('d', [1.0, 2.0, 3.0])
+        column[1] = None
+        self.assertEquals(column, [1.0, None, 3.0])
+        column[1] = 5.0
+        self.assertEquals(column, [1.0, 5.0, 3.0])
+
+    def test_setitem_slice(self):
+        column = TypedColumn('d', [1.0, 2.0, 3.0])
+        column[:] = [4.0, None]
+        self.assertEquals(column, [4.0, None])
+        column[1:] = [5.0, 6.0]
+        self.assertEquals(column, [4.0, 5.0, 6.0])
+
+    def test_setitem_slice_badtype(self):
+        column = TypedColumn('d', [1.0, 2.0])
+
+        def assign():
+            column[:] = ['a', 'b']
+
+        self.assertRaises(TypeError, assign)
+        self.assertEquals(column, [1.0, 2.0])
+
+    def test_append(self):
+        column = TypedColumn('d', [1.0])
+        column.append(None)
+        column.append(3.0)
+        self.assertEquals(column, [1.0, None, 3.0])
+
+    def test_extend_typed(self):
+        column = TypedColumn('d', [1.0])
+        column.extend(TypedColumn('d', [None, 3.0]))
+        column.extend(TypedColumn('d', [4.0]))
+        self.assertEquals(column, [1.0, None, 3.0, 4.0])
+
+    def test_extend_generator(self):
+        column = TypedColumn('l', [1])
+        column.extend(x for x in [2, None])
+        self.assertEquals(column, [1, 2, None])
+
+    def test_equals(self):
+        self.assertEquals(TypedColumn('d', [1.0, None]),
+                          TypedColumn('d', [1.0, None]))
+        self.assertNotEquals(TypedColumn('d', [0.0]),
+                             TypedColumn('d', [None]))
+        self.assertNotEquals(TypedColumn('d', [1.0]), [1.0, 2.0])
+        self.assertNotEquals(TypedColumn('d', [1.0]), None)
+
+    def test_compressed(self):
+        column = TypedColumn('d', [1.0, None, 3.0])
+        self.assertEquals(list(column.compressed()), [1.0, 3.0])
+
+    def test_nullmask_all_valid(self):
+        column = TypedColumn('d', [1.0, None])
+        column[1] = 2.0
+        self.assertEquals(column.nullmask(), None)
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class RingColumn_TestCase(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def test_append_evicts(self):
+        column = RingColumn(3)
+        for i in xrange(5):
+            column.append(i)
+
+        self.assertEquals(column, [2, 3, 4])
+        self.assertEquals(len(column), 3)
+        self.assertEquals((column[0], column[-1]), (2, 4))
+        self.assertEquals(column[1:], [3, 4])
+        self.assertEquals(column[::-1], [4, 3, 2])
+        self.assertRaises(IndexError, column.__getitem__, 3)
+
+    def test_typed(self):
+        column = RingColumn(2, 'd', [1.0, None, 3.0])
+        self.assertEquals(column, [None, 3.0])
+        self.assertEquals(column.count(None), 1)
+        column[0] = 2.0
+        self.assertEquals(column.tolist(), [2.0, 3.0])
+        self.assertRaises(TypeError, column.append, 'x')
+
+    def test_setitem_slice(self):
+        column = RingColumn(3, 'l', [1, 2, 3, 4])
+        column[:] = [5, 6]
+        self.assertEquals(column, [5, 6])
+        column[1:] = [7, 8]
+        self.assertEquals(column, [5, 7, 8])
+        self.assertRaises(TypeError, column.__setitem__, slice(None), ['x'])
+        self.assertEquals(column, [5, 7, 8])
+
+    def test_memory_constant(self):
+        column = RingColumn(100, 'd')
+        column.extend([1.0] * 100)
+        size = sys.getsizeof(column)
+        column.extend([2.0] * 1000)
+        self.assertEquals(sys.getsizeof(column), size)
+        self.assertEquals(column[0], 2.0)
+
+    def test_badcapacity(self):
+        self.assertRaises(ValueError, RingColumn, 0)
+
+
+class Numpy_TestCase(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def test_to_numpy_view(self):
+        column = TypedColumn('d', [1.0, 2.0, 3.0])
+        view = to_numpy(column)
+        self.assertEquals(view.dtype, numpy.float64)
+        self.assertEquals(view.tolist(), [1.0, 2.0, 3.0])
+        view[0] = 5.0
+        self.assertEquals(column[0], 5.0)
+
+    def test_to_numpy_masked(self):
+        column = TypedColumn('l', [1, None, 3])
+        view = to_numpy(column, masked=True)
+        self.assertEquals(view.tolist(), [1, None, 3])
+        view.data[2] = 4
+        self.assertEquals(column[2], 4)
+
+    def test_to_numpy_list(self):
+        values = [1.0, 2.0]
+        results = to_numpy(values)
+        self.assertEquals(results.tolist(), values)
+
+    def test_array_protocol(self):
+        column = TypedColumn('d', [1.0, 2.0])
+        self.assertEquals(numpy.asarray(column).sum(), 3.0)
+
+    def test_from_numpy_view(self):
+        values = numpy.arange(3.0)
+        column = from_numpy(values)
+        self.assertTrue(column.data is values)
+        self.assertEquals(column, [0.0, 1.0, 2.0])
+        values[1] = 7.0
+        self.assertEquals(column[1], 7.0)
+
+    def test_from_numpy_grow(self):
+        values = numpy.arange(3.0)
+        column = from_numpy(values)
+        column.append(None)
+        self.assertEquals(column, [0.0, 1.0, 2.0, None])
+        self.assertEquals(values.tolist(), [0.0, 1.0, 2.0])
+
+    def test_from_numpy_strided(self):
+        values = numpy.arange(6.0)[::2]
+        self.assertEquals(from_numpy(values), [0.0, 2.0, 4.0])
+        self.assertEquals(type(from_numpy(values)), list)
+
+    def test_from_numpy_2d(self):
+        self.assertRaises(ValueError, from_numpy, numpy.zeros((2, 2)))
+
+
+class Helpers_TestCase(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def test_data_and_mask_list(self):
+        data, mask = data_and_mask([1, None, 3])
+        self.assertEquals(data, [1, 0, 3])
+        self.assertEquals(mask, bytearray([1, 0, 1]))
+
+    def test_data_and_mask_list_valid(self):
+        values = [1, 2]
+        data, mask = data_and_mask(values)
+        self.assertTrue(data is values)
+        self.assertEquals(mask, None)
+
+    def test_valid_values(self):
+        self.assertEquals(list(valid_values([1, None, 3])), [1, 3])
+        column = TypedColumn('l', [1, None, 3])
+        self.assertEquals(list(valid_values(column)), [1, 3])
+
+    def test_concat_typed(self):
+        column = concat([TypedColumn('d', [1.0, 2.0]), None,
+                         TypedColumn('d', [None, 4.0])], [2, 1, 2])
+        self.assertTrue(isinstance(column, TypedColumn))
+        self.assertEquals(column, [1.0, 2.0, None, None, 4.0])
+
+    def test_concat_typed_valid(self):
+        column = concat([TypedColumn('l', [1]), TypedColumn('l', [2, 3])],
+                        [1, 2])
+        self.assertEquals(column, [1, 2, 3])
+        self.assertEquals(column.valid, None)
+
+    def test_concat_mixed(self):
+        column = concat([TypedColumn('l', [1]), ['a', None], None,
+                         TypedColumn('d', [2.0])], [1, 2, 1, 1])
+        self.assertEquals(column, [1, 'a', None, None, 2.0])
+        self.assertTrue(isinstance(column, list))
+
+    def test_insert(self):
+        column = TypedColumn('l', [1, 3])
+        column.insert(1, 2)
+        column.insert(0, None)
+        self.assertEquals(column, [None, 1, 2, 3])
+
+    def test_insert_rows(self):
+        values = ['a', 'c']
+        insert_rows(values, [0, 1, 2], ['x', 'b', 'd'])
+        self.assertEquals(values, ['x', 'a', 'b', 'c', 'd'])
+
+        column = TypedColumn('d', [1.0, None])
+        insert_rows(column, [1, 1], [1.5, 1.75])
+        self.assertEquals(column, [1.0, 1.5, 1.75, None])
+
+        column = TypedColumn('d', [1.0, 2.0])
+        insert_rows(column, [0], [None])
+        self.assertEquals(column, [None, 1.0, 2.0])
+
+    def test_take(self):
+        self.assertEquals(take(['a', 'b', 'c'], [2, 0]), ['c', 'a'])
+        column = take(TypedColumn('l', [1, None, 3]), [2, 1, 2])
+        self.assertTrue(isinstance(column, TypedColumn))
+        self.assertEquals(column, [3, None, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,17 +13,38 @@ Test the core module.
 
 import sys
 import os
+import csv
+import bz2
+import gzip
+import random
+import shutil
+import tempfile
 import unittest
+from datetime import datetime
 
 libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if not libpath in sys.path:
     sys.path.insert(1, libpath)
 del libpath
 
+import core
 from core import Series
+from core import between
+from core import concat
+from core import merge_iter
 from core import csv2lol
+from core import csv2dol
+from core import dol2csv
+from core import _ThreadedReader
 from core import lol2dol
 from core import format_values
+from column import TypedColumn
+
+try:
+    import numpy
+
+except ImportError:
+    numpy = None
 
 
 class Series_TestCase(unittest.TestCase):
@@ -235,6 +256,391 @@ class Series_TestCase(unittest.TestCase):
         self.assertEquals(series[1], (1, 'goog', 200))
         self.assertEquals(len(series), 2)
 
+    def test_extend_list(self):
+        values = [[0, 'yhoo', 23.0]]
+        series = Series('bar', 'symbol', 'close')
+        series.from_values(values)
+        series.extend([[1, 'goog', 200], [2, 'goog', 201]])
+
+        self.assertEquals(series.bar, [0, 1, 2])
+        self.assertEquals(series.symbol, ['yhoo', 'goog', 'goog'])
+        self.assertEquals(series.close, [23.0, 200, 201])
+        self.assertEquals(len(series), 3)
+
+    def test_extend_dict_kwargs_some(self):
+        values = [dict(bar=0, symbol='yhoo', close=23.0)]
+        series = Series('bar', 'symbol', 'close')
+        series.from_values(values)
+        values = [dict(bar=1, symbol='goog'), dict(bar=2, symbol='goog')]
+        series.extend(values, bar='bar')
+
+        self.assertEquals(series.bar, [0, 1, 2])
+        self.assertEquals(series.symbol, ['yhoo', None, None])
+        self.assertEquals(series.close, [23.0, None, None])
+        self.assertEquals(len(series), 3)
+
+    def test_extend_series(self):
+        values = [[0, 'yhoo', 23.0]]
+        series = Series('bar', 'symbol', 'close')
+        series.from_values(values)
+        series.astype('close', 'd')
+        other = Series('bar', 'close', 'open')
+        other.from_values([[1, 200, 199], [2, 201, 200]])
+        other.astype('close', 'd')
+        series.extend(other)
+
+        self.assertEquals(series.bar, [0, 1, 2])
+        self.assertEquals(series.symbol, ['yhoo', None, None])
+        self.assertEquals(series.close, [23.0, 200.0, 201.0])
+        self.assertTrue(isinstance(series.close, TypedColumn))
+        self.assertEquals(len(series), 3)
+
+    def test_extend_typed_rejected(self):
+        series = Series('dates', 'closes')
+        series.append(['a', 1.0])
+        series.astype('closes', float)
+        self.assertRaises(TypeError, series.append, ['b', 'oops'])
+        self.assertRaises(TypeError, series.extend, [['b', 2.0],
+                                                     ['c', 'oops']])
+
+        self.assertEquals(series.dates, ['a'])
+        self.assertEquals(series.closes, [1.0])
+        self.assertEquals(len(series), 1)
+        series.append(['b', 2.0])
+        self.assertEquals(series.values(), [('a', 1.0), ('b', 2.0)])
+
+        series = Series('dates', 'closes', capacity=2)
+        series.astype('closes', float)
+        series.append(['a', 1.0])
+        self.assertRaises(TypeError, series.append, ['b', 'oops'])
+        self.assertEquals(series.values(), [('a', 1.0)])
+
+    def test_apply(self):
+        series = Series('highs', 'lows')
+        series.from_values([[float(i % 7), float(i % 5)] for i in xrange(50)])
+        serial = series.apply(max, 'highs', window=3)
+        results = series.apply(max, ['highs'], window=3, workers=2,
+                               dest='maxhighs')
+
+        self.assertEquals(results, serial)
+        self.assertEquals(results[:4], [None, None, 2.0, 3.0])
+        self.assertEquals(series.maxhighs, serial)
+        self.assertRaises(KeyError, series.apply, max, 'opens')
+
+    def test_upsert(self):
+        series = Series('dates', 'closes', 'volumes')
+        series.from_values([['2011-01-03', 10.0, 100],
+                            ['2011-01-04', 11.0, 110]])
+        counts = series.upsert([['2011-01-04', 11.5, 115],
+                                ['2011-01-05', 12.0, 120]])
+
+        self.assertEquals(counts, (1, 1))
+        self.assertEquals(series.closes, [10.0, 11.5, 12.0])
+        self.assertEquals(series.volumes, [100, 115, 120])
+        self.assertEquals(len(series), 3)
+
+        counts = series.upsert([{'dates': '2011-01-05', 'closes': 12.5}],
+                               dates='dates', closes='closes')
+        self.assertEquals(counts, (1, 0))
+        self.assertEquals(series[2], ('2011-01-05', 12.5, 120))
+
+    def test_upsert_index_follows_appends(self):
+        series = Series('dates', 'closes')
+        series.upsert([['2011-01-03', 10.0]])
+        series.append(['2011-01-04', 11.0])
+        series.upsert([['2011-01-04', 11.5]])
+        self.assertEquals(series.closes, [10.0, 11.5])
+
+        series.sort('closes', order='d')
+        series.upsert([['2011-01-03', 9.0]])
+        self.assertEquals(series.values(), [('2011-01-04', 11.5),
+                                            ('2011-01-03', 9.0)])
+
+    def test_upsert_other_key_index(self):
+        series = Series('a', 'b')
+        series.extend([[1, 'x'], [2, 'y']])
+        series.upsert([[1, 'x']], key='b')
+        series.upsert([[1, 'z']], key='a')
+        self.assertEquals(series.upsert([[7, 'x']], key='b'), (0, 1))
+        self.assertEquals(series.values(), [(1, 'z'), (2, 'y'), (7, 'x')])
+
+    def test_upsert_repeated_in_batch(self):
+        series = Series('dates', 'closes')
+        series.astype('closes', 'd')
+        counts = series.upsert([['2011-01-03', 10.0], ['2011-01-03', 10.5],
+                                ['2011-01-04', None]])
+
+        self.assertEquals(counts, (1, 2))
+        self.assertEquals(series.values(), [('2011-01-03', 10.5),
+                                            ('2011-01-04', None)])
+        self.assertTrue(isinstance(series.closes, TypedColumn))
+
+    def test_upsert_missing_key(self):
+        series = Series('dates', 'closes')
+        self.assertRaises(KeyError, series.upsert, [[1.0]], 'dates', 'closes')
+        self.assertRaises(KeyError, series.upsert, [[1, 1.0]], 'bars')
+
+    def test_drop_duplicates(self):
+        series = Series('dates', 'closes')
+        series.from_values([['a', 1], ['b', 2], ['a', 3], ['c', 4],
+                            ['b', 5]])
+        closes = series.closes
+        self.assertEquals(series.drop_duplicates('dates'), 2)
+        self.assertEquals(series.values(), [('a', 3), ('c', 4), ('b', 5)])
+        self.assertTrue(series.closes is closes)
+        self.assertEquals(series.drop_duplicates('dates'), 0)
+
+    def test_drop_duplicates_first(self):
+        series = Series('dates', 'closes')
+        series.from_values([['a', 1], ['b', 2], ['a', 3]])
+        series.astype('closes', 'd')
+        series.drop_duplicates('dates', keep='first')
+        self.assertEquals(series.values(), [('a', 1.0), ('b', 2.0)])
+        self.assertRaises(ValueError, series.drop_duplicates, 'dates', None)
+
+    def test_nlargest(self):
+        series = Series('dates', 'volumes')
+        series.from_values([['a', 5], ['b', None], ['c', 9], ['d', 5],
+                            ['e', 1]])
+        results = series.nlargest(3, 'volumes')
+
+        self.assertEquals(results.values(), [('c', 9), ('a', 5), ('d', 5)])
+        self.assertEquals(series.nlargest(2, 'volumes', positions=True),
+                          [2, 0])
+        self.assertEquals(series.dates, ['a', 'b', 'c', 'd', 'e'])
+        self.assertEquals(len(series.nlargest(10, 'volumes')), 4)
+
+    def test_nsmallest_typed(self):
+        series = Series('dates', 'volumes')
+        series.from_values([['a', 5], ['b', None], ['c', 9], ['d', 1]])
+        series.astype('volumes', 'l')
+        results = series.nsmallest(2, 'volumes')
+
+        self.assertEquals(results.values(), [('d', 1), ('a', 5)])
+        self.assertTrue(isinstance(results.volumes, TypedColumn))
+        self.assertEquals(series.nsmallest(0, 'volumes', True), [])
+
+    def test_quantile(self):
+        series = Series('closes')
+        series.from_values([[x] for x in [7, 1, None, 3, 5, 9]])
+        self.assertEquals(series.quantile('closes', 0.5), 5)
+        self.assertEquals(series.quantile('closes', 0), 1)
+        self.assertEquals(series.quantile('closes', 1), 9)
+        self.assertEquals(series.quantile('closes', [0.25, 0.375]), [3, 4.0])
+        self.assertEquals(series.closes, [7, 1, None, 3, 5, 9])
+        self.assertRaises(ValueError, series.quantile, 'closes', 1.5)
+
+    def test_quantile_matches_sort(self):
+        rand = random.Random(7)
+        values = [rand.randint(0, 50) for i in xrange(501)]
+        series = Series('closes')
+        series.from_values([[x] for x in values])
+        series.astype('closes', 'd')
+        values.sort()
+        for q in (0.0, 0.1, 0.5, 0.9, 0.999, 1.0):
+            position = (len(values) - 1) * q
+            k = int(position)
+            expected = values[k]
+            if k < len(values) - 1:
+                expected += (values[k + 1] - values[k]) * (position - k)
+
+            self.assertAlmostEquals(series.quantile('closes', q), expected)
+
+    def test_quantile_none(self):
+        series = Series('closes')
+        series.from_values([[None]])
+        self.assertEquals(series.quantile('closes', 0.5), None)
+
+    def test_keep_sorted_append(self):
+        series = Series('dates', 'closes')
+        series.from_values([['2011-01-05', 3], ['2011-01-03', 1]])
+        series.keep_sorted('dates')
+        self.assertEquals(series.dates, ['2011-01-03', '2011-01-05'])
+
+        series.append(['2011-01-04', 2])
+        series.append(['2011-01-06', 4])
+        series.append(['2011-01-01', 0])
+        self.assertEquals(series.closes, [0, 1, 2, 3, 4])
+
+        series.append(['2011-01-04', 2.5])
+        self.assertEquals(series.closes, [0, 1, 2, 2.5, 3, 4])
+
+    def test_keep_sorted_extend(self):
+        series = Series('dates', 'closes', 'opens')
+        series.extend([[1, 1.0, 1], [3, 3.0, 3], [5, 5.0, 5]])
+        series.astype('closes', 'd')
+        series.keep_sorted('dates')
+        series.extend([[4, 4.0], [0, None], [6, 6.0], [3, 3.5]])
+
+        self.assertEquals(series.dates, [0, 1, 3, 3, 4, 5, 6])
+        self.assertEquals(series.closes, [None, 1.0, 3.0, 3.5, 4.0, 5.0,
+                                          6.0])
+        self.assertTrue(isinstance(series.closes, TypedColumn))
+        self.assertEquals(series.opens, [None, 1, 3, None, None, 5, None])
+        self.assertEquals(len(series), 7)
+
+    def test_keep_sorted_matches_sort(self):
+        rand = random.Random(3)
+        series = Series('dates', 'uids')
+        series.keep_sorted('dates')
+        other = Series('dates', 'uids')
+        uid = 0
+        for batch in xrange(20):
+            rows = []
+            for i in xrange(rand.randint(1, 5)):
+                rows.append([rand.randint(0, 30), uid])
+                uid += 1
+
+            series.extend(rows)
+            other.extend(rows)
+
+        other.sort('dates')
+        self.assertEquals(series.values(), other.values())
+
+    def test_keep_sorted_stops(self):
+        series = Series('dates', 'closes')
+        series.keep_sorted('dates')
+        series.extend([[2, 1], [1, 2]])
+        series.sort('closes')
+        series.append([0, 3])
+        self.assertEquals(series.dates, [2, 1, 0])
+        self.assertRaises(KeyError, series.keep_sorted, 'opens')
+
+    def test_keep_sorted_missing_key(self):
+        series = Series('dates', 'closes')
+        series.keep_sorted('dates')
+        self.assertRaises(KeyError, series.append, [1.0], 'closes')
+
+    def test_scans(self):
+        series = Series('dates', 'equity')
+        series.from_values([[1, 100.0], [2, 125.0], [3, 99.0]])
+        series.astype('equity', 'd')
+
+        self.assertEquals(series.cumsum('equity'), [100.0, 225.0, 324.0])
+        self.assertEquals(series.cummax('equity', dest='peaks'),
+                          [100.0, 125.0, 125.0])
+        self.assertEquals(series.peaks, [100.0, 125.0, 125.0])
+        self.assertEquals(series.drawdown('equity')[2], 99.0 / 125.0 - 1)
+        self.assertEquals(series.pct_change('equity')[:2], [None, 0.25])
+        self.assertEquals(series.shift('dates', -1, dest='dates'),
+                          [2, 3, None])
+        self.assertEquals(series.dates, [2, 3, None])
+
+    def test_scans_incremental(self):
+        series = Series('dates', 'equity')
+        series.from_values([[1, 100.0], [2, 110.0]])
+        series.drawdown('equity', dest='dd', incremental=True)
+        series.shift('equity', dest='prev', incremental=True)
+        series.append([3, 99.0])
+        series.extend([[4, None], [5, 121.0]])
+
+        self.assertEquals(series.dd, [0.0, 0.0, 99.0 / 110.0 - 1, None, 0.0])
+        self.assertEquals(series.prev, [None, 100.0, 110.0, 99.0, None])
+        self.assertEquals(len(series.dd), len(series))
+
+        series.cumsum('equity', dest='prev')
+        series.append([6, 1.0])
+        self.assertEquals(series.prev[-1], None)
+        self.assertRaises(ValueError, series.cumsum, 'equity',
+                          incremental=True)
+        self.assertRaises(ValueError, series.shift, 'equity', -1, 'next',
+                          True)
+
+    def test_scans_keep_sorted(self):
+        series = Series('dates', 'equity')
+        series.keep_sorted('dates')
+        series.cumsum('equity', dest='total', incremental=True)
+        series.extend([[1, 1], [3, 3]])
+        series.append([2, 2])
+        self.assertEquals(series.total, [1, 3, 6])
+
+    def test_capacity(self):
+        series = Series('bars', 'closes', capacity=3)
+        series.astype('closes', 'd')
+        for i in xrange(5):
+            series.append([i, i * 10.0])
+
+        self.assertEquals(len(series), 3)
+        self.assertEquals(series[-1], (4, 40.0))
+        self.assertEquals(series[0], (2, 20.0))
+        self.assertEquals(series.values(), [(2, 20.0), (3, 30.0), (4, 40.0)])
+        self.assertEquals(series.closes, [20.0, 30.0, 40.0])
+        self.assertEquals(series.closes.typecode, 'd')
+        self.assertEquals(series.mean('closes'), 30.0)
+
+        series.extend([[5, 50.0], [6, None], [7, 70.0], [8, 80.0]])
+        self.assertEquals(series.bars, [6, 7, 8])
+        self.assertEquals(series.closes, [None, 70.0, 80.0])
+
+    def test_capacity_columns(self):
+        series = Series('bars', capacity=2)
+        series.from_values([[1], [2], [3]])
+        self.assertEquals(len(series), 2)
+
+        series.initcol('flags', 0)
+        series.appendcol('closes', [1.0, 2.0])
+        series.append([4, 1, 3.0])
+        self.assertEquals(series.values(), [(3, 0, 2.0), (4, 1, 3.0)])
+
+        series.format('bars', str)
+        self.assertEquals(series.bars, ['3', '4'])
+        series.append(['5'])
+        self.assertEquals(series.bars, ['4', '5'])
+        self.assertRaises(ValueError, series.keep_sorted, 'bars')
+        self.assertRaises(TypeError, Series, 'bars', size=2)
+
+    def test_capacity_scans(self):
+        series = Series('closes', capacity=2)
+        series.cumsum('closes', dest='total', incremental=True)
+        series.extend([[1], [2]])
+        series.append([3])
+        self.assertEquals(series.total, [3, 6])
+
+    def test_capacity_scans_evicted(self):
+        series = Series('v', capacity=3)
+        series.extend([[1], [1]])
+        series.cumsum('v', dest='c', incremental=True)
+        series.cummax('c', dest='peak', incremental=True)
+        series.extend([[1], [1], [1], [1]])
+        self.assertEquals(series.v, [1, 1, 1])
+        self.assertEquals(series.c, [4, 5, 6])
+        self.assertEquals(series.peak, [4, 5, 6])
+
+    def test_resample_paths(self):
+        series = Series('returns')
+        series.extend([[0.01], [-0.02], [None], [0.03]])
+        results = series.resample_paths('returns', 50, 'block', block=2,
+                                        seed=3, quantiles=[0.5])
+        self.assertEquals(results['paths'], 50)
+        self.assertEquals(results, series.resample_paths(
+            'returns', 50, 'block', block=2, seed=3, workers=2,
+            quantiles=[0.5]))
+        self.assertRaises(KeyError, series.resample_paths, 'closes', 5)
+
+    def test_counts(self):
+        series = Series('symbols', 'volumes')
+        series.from_values([['goog', 10], ['yhoo', 20], ['goog', 35],
+                            [None, 40]])
+        series.astype('volumes', 'l')
+
+        self.assertEquals(series.unique('symbols'), ['goog', 'yhoo'])
+        self.assertEquals(series.value_counts('symbols'),
+                          [('goog', 2), ('yhoo', 1)])
+        self.assertEquals(series.histogram('volumes', bins=3)[0], [1, 1, 2])
+        self.assertRaises(KeyError, series.unique, 'closes')
+
+    def test_take(self):
+        values = [[0, 'yhoo', 23.0], [1, 'goog', None], [2, 'goog', 25.0]]
+        series = Series('bar', 'symbol', 'close')
+        series.from_values(values)
+        series.astype('close', 'd')
+        results = series.take([2, 1])
+
+        self.assertEquals(results.values(), [(2, 'goog', 25.0),
+                                             (1, 'goog', None)])
+        self.assertTrue(isinstance(results.close, TypedColumn))
+        self.assertEquals(len(series), 3)
+
     def test_append_dict_args_none(self):
         values = [dict(bar=0, symbol='yhoo', close=23.0)]
         series = Series('bar', 'symbol', 'close')
@@ -405,6 +811,197 @@ class Series_TestCase(unittest.TestCase):
         self.assertRaises(ValueError, series.appendcol, 'open', [22.0])
 
 
+class Series_typed_TestCase(unittest.TestCase):
+    def setUp(self):
+        values = [[0, 'yhoo', 23.0], [1, 'goog', None], [2, 'goog', 25.0]]
+        self.series = Series('bar', 'symbol', 'close')
+        self.series.from_values(values)
+
+    def test_astype(self):
+        self.series.astype('close', float)
+        self.assertTrue(isinstance(self.series.close, TypedColumn))
+        self.assertEquals(self.series.close.typecode, 'd')
+        self.assertEquals(self.series.close, [23.0, None, 25.0])
+        self.assertEquals(self.series[1], (1, 'goog', None))
+
+    def test_astype_none(self):
+        self.series.astype('close', 'd')
+        self.series.astype('close', None)
+        self.assertEquals(type(self.series.close), list)
+        self.assertEquals(self.series.close, [23.0, None, 25.0])
+
+    def test_astype_badkey(self):
+        self.assertRaises(KeyError, self.series.astype, 'open', 'd')
+
+    def test_typed_append(self):
+        self.series.astype('close', 'd')
+        self.series.append([3, 'goog', 26.0])
+        self.series.append([4, 'goog'], 'bar', 'symbol')
+        self.assertEquals(self.series.close, [23.0, None, 25.0, 26.0, None])
+        self.assertEquals(len(self.series), 5)
+
+    def test_typed_sort(self):
+        self.series.astype('bar', int)
+        self.series.sort('symbol')
+        self.assertEquals(self.series.bar, [1, 2, 0])
+        self.assertTrue(isinstance(self.series.bar, TypedColumn))
+
+    def test_typed_format(self):
+        self.series.astype('bar', int)
+        self.series.format('bar', float)
+        self.assertEquals(self.series.bar, [0.0, 1.0, 2.0])
+        self.series.format('bar', str)
+        self.assertEquals(self.series.bar, ['0.0', '1.0', '2.0'])
+
+    def test_initcol_typed(self):
+        self.series.initcol('sma', typecode='d')
+        self.assertTrue(isinstance(self.series.sma, TypedColumn))
+        self.assertEquals(self.series.sma, [None, None, None])
+        self.series.sma[2] = 24.0
+        self.assertEquals(self.series[2], (2, 'goog', 25.0, 24.0))
+
+    def test_aggregates(self):
+        for atype in (None, 'd'):
+            self.series.astype('close', atype)
+            self.assertEquals(self.series.count('close'), 2)
+            self.assertEquals(self.series.sum('close'), 48.0)
+            self.assertEquals(self.series.mean('close'), 24.0)
+            self.assertEquals(self.series.min('close'), 23.0)
+            self.assertEquals(self.series.max('close'), 25.0)
+
+    def test_aggregates_empty(self):
+        self.series.initcol('open', typecode='d')
+        self.assertEquals(self.series.count('open'), 0)
+        self.assertEquals(self.series.sum('open'), 0)
+        self.assertEquals(self.series.mean('open'), None)
+        self.assertEquals(self.series.min('open'), None)
+        self.assertEquals(self.series.max('open'), None)
+
+    def test_rolling_mean_dest(self):
+        self.series.astype('close', 'd')
+        self.series.rolling_mean('close', 2, dest='sma')
+        self.assertEquals(self.series.keys(),
+                          ['bar', 'symbol', 'close', 'sma'])
+        self.assertEquals(self.series.sma, [None, 23.0, 25.0])
+        self.series.rolling_sum('close', 2, dest='sma')
+        self.assertEquals(self.series.sma, [None, 23.0, 25.0])
+
+    def test_rolling_order_incremental(self):
+        series = Series('closes')
+        series.extend([[3], [1], [None]])
+        series.rolling_median('closes', 3, dest='median', incremental=True)
+        series.rolling_rank('closes', 3, dest='rank', incremental=True)
+        series.append([5])
+        series.extend([[4], [4]])
+        self.assertEquals(series.median, [None, None, 2.0, 3.0, 4.5, 4])
+        self.assertEquals(series.rank, [None, None, None, 2.0, 1.0, 1.5])
+        self.assertEquals(series.rolling_quantile('closes', 3, 1),
+                          [None, None, 3, 5, 5, 5])
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class Series_numpy_TestCase(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def test_to_numpy(self):
+        series = Series('bar', 'close')
+        series.from_values([[0, 23.0], [1, 24.0]])
+        series.astype('close', 'd')
+        view = series.to_numpy('close')
+        view[1] = 25.0
+        self.assertEquals(series.close, [23.0, 25.0])
+        self.assertEquals(series.to_numpy('bar').tolist(), [0, 1])
+
+    def test_from_arrays(self):
+        closes = numpy.array([23.0, 24.0])
+        series = Series.from_arrays(('bar', numpy.arange(2)), close=closes)
+        self.assertEquals(series.keys(), ['bar', 'close'])
+        self.assertEquals(len(series), 2)
+        self.assertEquals(series[1], (1, 24.0))
+        self.assertTrue(series.to_numpy('close') is closes)
+
+    def test_from_arrays_append(self):
+        series = Series.from_arrays(close=numpy.array([23.0, 24.0]))
+        series.append([25.0])
+        self.assertEquals(series.close, [23.0, 24.0, 25.0])
+
+    def test_from_arrays_mismatch(self):
+        self.assertRaises(ValueError, Series.from_arrays,
+                          bar=numpy.arange(2), close=numpy.arange(3.0))
+
+    def test_from_arrays_none(self):
+        self.assertRaises(ValueError, Series.from_arrays)
+
+
+class Concat_TestCase(unittest.TestCase):
+    def setUp(self):
+        self.first = Series('dates', 'closes')
+        self.first.from_values([['2010-12-31', 32.0], ['2011-01-03', None]])
+        self.first.astype('closes', 'd')
+        self.second = Series('dates', 'closes', 'opens')
+        self.second.from_values([['2011-01-04', 33.0, 31.5]])
+        self.second.astype('closes', 'd')
+
+    def test_concat(self):
+        series = concat([self.first, self.second])
+
+        self.assertEquals(series.keys(), ['dates', 'closes', 'opens'])
+        self.assertEquals(len(series), 3)
+        self.assertEquals(series.values(),
+                          [('2010-12-31', 32.0, None),
+                           ('2011-01-03', None, None),
+                           ('2011-01-04', 33.0, 31.5)])
+        self.assertTrue(isinstance(series.closes, TypedColumn))
+
+    def test_concat_copies(self):
+        series = concat([self.first])
+        series.closes[0] = 1.0
+        series.dates[0] = 'x'
+        self.assertEquals(self.first[0], ('2010-12-31', 32.0))
+
+    def test_concat_keys(self):
+        series = concat([self.first, self.second], keys=['opens', 'dates'])
+        self.assertEquals(series.values(), [(None, '2010-12-31'),
+                                            (None, '2011-01-03'),
+                                            (31.5, '2011-01-04')])
+        self.assertEquals(len(concat([], keys=['dates'])), 0)
+
+    def test_concat_errors(self):
+        self.assertRaises(ValueError, concat, [])
+        self.assertRaises(TypeError, concat, [self.first, [[1, 2]]])
+
+
+class MergeIter_TestCase(unittest.TestCase):
+    def setUp(self):
+        self.goog = Series('dates', 'closes')
+        self.goog.extend([[1, 600.0], [2, 601.0], [4, 603.0]])
+        self.yhoo = Series('dates', 'closes')
+        self.yhoo.extend([[2, 15.0], [None, 15.5], [3, 16.0], [5, 17.0]])
+
+    def test_merge_list(self):
+        events = list(merge_iter([self.goog, self.yhoo]))
+        self.assertEquals(events, [(0, 0), (0, 1), (1, 0), (1, 2), (0, 2),
+                                   (1, 3)])
+
+    def test_merge_dict(self):
+        events = merge_iter(dict(yhoo=self.yhoo, goog=self.goog))
+        self.assertEquals(next(events), ('goog', 0))
+        self.assertEquals(list(events), [('goog', 1), ('yhoo', 0),
+                                         ('yhoo', 2), ('goog', 2),
+                                         ('yhoo', 3)])
+
+    def test_merge_empty(self):
+        self.assertEquals(list(merge_iter([])), [])
+        self.assertEquals(list(merge_iter([Series('dates')])), [])
+
+    def test_merge_errors(self):
+        self.goog.append([0, 599.0])
+        events = merge_iter([self.goog, self.yhoo])
+        self.assertRaises(ValueError, list, events)
+        self.assertRaises(KeyError, list, merge_iter([self.goog], on='x'))
+
+
 class Csv2lol_TestCase(unittest.TestCase):
     def setUp(self):
         pass
@@ -440,6 +1037,29 @@ class Csv2lol_TestCase(unittest.TestCase):
         self.assertEquals(values[2], ['2011-11-22', '34.64', 'yhoo'])
         self.assertEquals(len(values), 3)
 
+    def test_usecols_header_no(self):
+        """
+        """
+        keys, values = csv2lol('testfiles/csv2lol_header_no.csv',
+                               usecols=[2, 0])
+        self.assertEquals(keys, [2, 0])
+        self.assertEquals(values, [['yhoo', '2011-11-23'],
+                                   ['yhoo', '2011-11-22']])
+
+    def test_where(self):
+        """
+        """
+        keys, values = csv2lol('testfiles/csv2lol_header_no.csv',
+                               where={0: lambda x: x < '2011-11-23'})
+        self.assertEquals(values, [['2011-11-22', '34.64', 'yhoo']])
+
+    def test_usecols_one(self):
+        """
+        """
+        keys, values = csv2lol('testfiles/csv2lol_header_no.csv',
+                               usecols=[1], where={2: ['goog', 'yhoo']})
+        self.assertEquals(values, [['34.01'], ['34.64']])
+
     def test_header_yes(self):
         """
         """
@@ -458,6 +1078,401 @@ class Csv2lol_TestCase(unittest.TestCase):
         self.assertEquals(len(values), 1)
 
 
+class Csv2lol_compressed_TestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        with open('testfiles/csv2dol_types.csv', 'rb') as f1:
+            self.content = f1.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _gzip(self, name):
+        filename = os.path.join(self.tmpdir, name)
+        f1 = gzip.GzipFile(filename, 'wb')
+        f1.write(self.content)
+        f1.close()
+        return filename
+
+    def _bz2(self, name):
+        filename = os.path.join(self.tmpdir, name)
+        f1 = bz2.BZ2File(filename, 'wb')
+        f1.write(self.content)
+        f1.close()
+        return filename
+
+    def test_gzip(self):
+        """
+        """
+        expected = csv2lol('testfiles/csv2dol_types.csv', header=True)
+        keys, values = csv2lol(self._gzip('prices.csv.gz'), header=True)
+        self.assertEquals((keys, values), expected)
+
+    def test_bz2(self):
+        """
+        """
+        expected = csv2lol('testfiles/csv2dol_types.csv', header=True)
+        keys, values = csv2lol(self._bz2('prices.csv.bz2'), header=True)
+        self.assertEquals((keys, values), expected)
+
+    def test_magic(self):
+        """
+        """
+        expected = csv2lol('testfiles/csv2dol_types.csv')
+        self.assertEquals(csv2lol(self._gzip('gz.csv')), expected)
+        self.assertEquals(csv2lol(self._bz2('bz2.csv')), expected)
+
+    @unittest.skipIf(core.lzma is None, "lzma is not installed")
+    def test_xz(self):
+        """
+        """
+        keys, values = csv2lol('testfiles/csv2dol_types.csv', header=True)
+        filename = os.path.join(self.tmpdir, 'prices.csv.xz')
+        dol = dict((key, [row[i] for row in values])
+                   for i, key in enumerate(keys))
+        dol2csv(dol, filename, keys)
+        with open(filename, 'rb') as f1:
+            self.assertEquals(f1.read(6), '\xfd7zXZ\x00')
+
+        self.assertEquals(csv2lol(filename, header=True), (keys, values))
+        magic = os.path.join(self.tmpdir, 'xz.csv')
+        shutil.copy(filename, magic)
+        self.assertEquals(csv2lol(magic, header=True, threaded=True),
+                          (keys, values))
+
+    def test_xz_missing_lzma(self):
+        """
+        """
+        filename = os.path.join(self.tmpdir, 'prices.csv.xz')
+        with open(filename, 'wb') as f1:
+            f1.write('\xfd7zXZ\x00')
+
+        saved, core.lzma = core.lzma, None
+        try:
+            self.assertRaises(ValueError, csv2lol, filename)
+            self.assertRaises(ValueError, csv2lol, filename,
+                              compression='xz')
+            self.assertRaises(ValueError, dol2csv, dict(a=[1]), filename)
+
+        finally:
+            core.lzma = saved
+
+    def test_compression_none(self):
+        """
+        """
+        self.assertRaises(csv.Error, csv2lol, self._gzip('gz.csv'),
+                          compression=None)
+
+    def test_threaded(self):
+        """
+        """
+        expected = csv2lol('testfiles/csv2dol_types.csv', header=True)
+        keys, values = csv2lol(self._gzip('prices.csv.gz'), header=True,
+                               threaded=True)
+        self.assertEquals((keys, values), expected)
+
+    def test_csv2dol(self):
+        """
+        """
+        expected = csv2dol('testfiles/csv2dol_types.csv', header=True,
+                           infer=True)
+        results = csv2dol(self._gzip('prices.csv.gz'), header=True,
+                          infer=True, threaded=True)
+        self.assertEquals(results, expected)
+
+    def test_threaded_reader_blocks(self):
+        """
+        """
+        filename = os.path.join(self.tmpdir, 'prices.csv')
+        with open(filename, 'wb') as f1:
+            f1.write(self.content + 'tail')
+
+        with open(filename, 'rb') as f1:
+            reader = _ThreadedReader(f1, blocksize=7)
+            lines = list(reader)
+            reader.close()
+
+        self.assertEquals(''.join(lines), self.content + 'tail')
+        self.assertEquals(lines[0], 'Date,Open,Volume,Symbol,Stamp,Note\n')
+        self.assertEquals(lines[-1], 'tail')
+
+    def test_threaded_reader_close_early(self):
+        """
+        """
+        with open('testfiles/csv2dol_types.csv', 'rb') as f1:
+            reader = _ThreadedReader(f1, blocksize=1, queuesize=1)
+            next(iter(reader))
+            reader.close()
+            self.assertFalse(reader._thread.is_alive())
+
+
+class Csv2dol_TestCase(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def test_usecols(self):
+        """
+        """
+        keys, dol, kinds = csv2dol('testfiles/csv2dol_types.csv',
+                                   header=True, infer=True,
+                                   usecols=['Volume', 'Date'])
+        self.assertEquals(keys, ['Volume', 'Date'])
+        self.assertEquals(sorted(dol), ['Date', 'Volume'])
+        self.assertEquals(dol['Volume'], [1200.0, 1300.0, 1250.5, None])
+        self.assertEquals(kinds, dict(Volume='float', Date='date'))
+
+    def test_where(self):
+        """
+        """
+        keys, dol, kinds = csv2dol('testfiles/csv2dol_types.csv',
+                                   header=True, types=dict(Open=float),
+                                   usecols=['Date', 'Open'],
+                                   where=dict(Symbol=set(['yhoo']),
+                                              Date=between('2011-11-22')))
+        self.assertEquals(keys, ['Date', 'Open'])
+        self.assertEquals(dol['Date'], ['2011-11-22', '2011-11-24'])
+        self.assertEquals(dol['Open'], [34.64, 35.01])
+
+    def test_where_no_match(self):
+        """
+        """
+        keys, dol, kinds = csv2dol('testfiles/csv2dol_types.csv',
+                                   header=True, infer=True,
+                                   where={3: set(['msft'])})
+        self.assertEquals(dol['Date'], [])
+        self.assertEquals(kinds['Date'], 'str')
+
+    def test_usecols_missing(self):
+        """
+        """
+        self.assertRaises(KeyError, csv2dol, 'testfiles/csv2dol_types.csv',
+                          header=True, usecols=['Close'])
+
+    def test_empty_file(self):
+        """
+        """
+        keys, dol, kinds = csv2dol('testfiles/csv2lol_empty.csv', infer=True)
+        self.assertEquals(keys, [])
+        self.assertEquals(dol, {})
+        self.assertEquals(kinds, {})
+
+    def test_header_no(self):
+        """
+        """
+        keys, dol, kinds = csv2dol('testfiles/csv2lol_header_no.csv')
+        self.assertEquals(keys, [0, 1, 2])
+        self.assertEquals(dol[0], ['2011-11-23', '2011-11-22'])
+        self.assertEquals(dol[1], ['34.01', '34.64'])
+        self.assertEquals(dol[2], ['yhoo', 'yhoo'])
+        self.assertEquals(kinds, {0: 'str', 1: 'str', 2: 'str'})
+
+    def test_infer(self):
+        """
+        """
+        keys, dol, kinds = csv2dol('testfiles/csv2dol_types.csv',
+                                   header=True, infer=True)
+        self.assertEquals(keys, ['Date', 'Open', 'Volume', 'Symbol',
+                                 'Stamp', 'Note'])
+        self.assertEquals(kinds, dict(Date='date', Open='float',
+                                      Volume='float', Symbol='category',
+                                      Stamp='datetime', Note='str'))
+        self.assertEquals(dol['Date'][0], datetime(2011, 11, 21))
+        self.assertEquals(dol['Open'], [34.2, 34.64, None, 35.01])
+        self.assertEquals(dol['Volume'], [1200.0, 1300.0, 1250.5, None])
+        self.assertEquals(dol['Symbol'], ['yhoo', 'yhoo', 'goog', 'yhoo'])
+        self.assertTrue(dol['Symbol'][0] is dol['Symbol'][3])
+        self.assertEquals(dol['Stamp'][:3],
+                          [datetime(2011, 11, 21, 9, 30),
+                           datetime(2011, 11, 22, 9, 30),
+                           datetime(2011, 11, 23, 9, 30)])
+        self.assertEquals(dol['Stamp'][3], None)
+        self.assertEquals(dol['Note'], ['a', 'b', 'c', 'd'])
+
+    def test_infer_widen(self):
+        """
+        """
+        keys, dol, kinds = csv2dol('testfiles/csv2dol_types.csv',
+                                   header=True, infer=True, sample=2)
+        self.assertEquals(kinds['Volume'], 'float')
+        self.assertEquals(dol['Volume'], [1200.0, 1300.0, 1250.5, None])
+        self.assertTrue(isinstance(dol['Volume'][0], float))
+
+    def test_infer_mismatch(self):
+        """
+        """
+        self.assertRaises(ValueError, csv2dol, 'testfiles/csv2dol_types.csv',
+                          header=True, types=dict(Note='int'))
+
+    def test_infer_fallback(self):
+        """
+        """
+        filename = os.path.join(tempfile.mkdtemp(), 'fallback.csv')
+        with open(filename, 'wb') as f1:
+            f1.write('Volume,Open,Date,Count\n'
+                     '1200,34.2,2011-11-21,1\n'
+                     '1300,34.5,2011-11-22,2\n'
+                     'N/A,x,n/a,%d\n' % (2 ** 70,))
+
+        keys, dol, kinds = csv2dol(filename, header=True, infer=True,
+                                   sample=2, typed=True)
+        self.assertEquals(kinds, dict(Volume='str', Open='str', Date='str',
+                                      Count='int'))
+        self.assertEquals(dol['Volume'], ['1200', '1300', 'N/A'])
+        self.assertEquals(dol['Open'], ['34.2', '34.5', 'x'])
+        self.assertEquals(dol['Date'], ['2011-11-21', '2011-11-22', 'n/a'])
+        self.assertEquals(dol['Count'], [1, 2, 2 ** 70])
+
+        self.assertRaises(ValueError, csv2dol, filename, header=True,
+                          infer=True, sample=2, types=dict(Open=float))
+        shutil.rmtree(os.path.dirname(filename))
+
+    def test_types(self):
+        """
+        """
+        keys, dol, kinds = csv2dol('testfiles/csv2lol_header_no.csv',
+                                   types={1: float, 2: 'category'})
+        self.assertEquals(dol[0], ['2011-11-23', '2011-11-22'])
+        self.assertEquals(dol[1], [34.01, 34.64])
+        self.assertEquals(kinds, {0: 'str', 1: float, 2: 'category'})
+
+    def test_typed(self):
+        """
+        """
+        keys, dol, kinds = csv2dol('testfiles/csv2dol_types.csv',
+                                   header=True, infer=True, typed=True)
+        self.assertTrue(isinstance(dol['Open'], TypedColumn))
+        self.assertEquals(dol['Open'], [34.2, 34.64, None, 35.01])
+        self.assertEquals(type(dol['Symbol']), list)
+
+    def test_typed_widen(self):
+        """
+        """
+        keys, dol, kinds = csv2dol('testfiles/csv2dol_types.csv',
+                                   header=True, infer=True, sample=2,
+                                   typed=True)
+        self.assertEquals(dol['Volume'].typecode, 'd')
+        self.assertEquals(dol['Volume'], [1200.0, 1300.0, 1250.5, None])
+
+    def test_series_from_dol(self):
+        """
+        """
+        keys, dol, kinds = csv2dol('testfiles/csv2lol_header_yes.csv',
+                                   header=True, infer=True)
+        series = Series('dates', 'opens', 'closes')
+        series.from_dol(dol, dates='Date', opens='Open')
+        self.assertEquals(series.dates, [datetime(2011, 11, 23),
+                                         datetime(2011, 11, 22)])
+        self.assertEquals(series.opens, [34.01, 34.64])
+        self.assertEquals(series.closes, [None, None])
+        self.assertEquals(len(series), 2)
+
+    def test_series_from_dol_typed(self):
+        """
+        """
+        keys, dol, kinds = csv2dol('testfiles/csv2dol_types.csv',
+                                   header=True, infer=True, typed=True)
+        series = Series('Open', 'Symbol')
+        series.from_dol(dol)
+        self.assertTrue(isinstance(series.Open, TypedColumn))
+        self.assertEquals(series.Open.typecode, 'd')
+        self.assertEquals(series.Open, [34.2, 34.64, None, 35.01])
+        series.append([36.0, 'goog'])
+        self.assertEquals(len(dol['Open']), 4)
+
+        series = Series('Open', capacity=2)
+        series.from_dol(dol)
+        self.assertEquals(series.Open, [None, 35.01])
+        self.assertEquals(series.Open.typecode, 'd')
+
+
+class Dol2csv_TestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_header(self):
+        """
+        """
+        filename = os.path.join(self.tmpdir, 'prices.csv')
+        dol = dict(bar=[0, 1], symbol=['yhoo', 'goog'], close=[23.5, None])
+        dol2csv(dol, filename, ['bar', 'symbol', 'close'])
+
+        keys, values = csv2lol(filename, header=True)
+        self.assertEquals(keys, ['bar', 'symbol', 'close'])
+        self.assertEquals(values, [['0', 'yhoo', '23.5'], ['1', 'goog', '']])
+
+    def test_header_no(self):
+        """
+        """
+        filename = os.path.join(self.tmpdir, 'prices.csv')
+        dol = dict(bar=[0, 1], close=[23.5, 200])
+        dol2csv(dol, filename, header=False)
+
+        keys, values = csv2lol(filename)
+        self.assertEquals(values, [['0', '23.5'], ['1', '200']])
+
+    def test_formats(self):
+        """
+        """
+        filename = os.path.join(self.tmpdir, 'prices.csv')
+        dates = [datetime(2011, 11, 22), None]
+        dol = dict(dates=dates, close=[23.5, 200], symbol=['yhoo', 'goog'])
+        formats = dict(dates='%Y%m%d', close='%.2f', symbol=str.upper)
+        dol2csv(dol, filename, ['dates', 'close', 'symbol'], formats)
+
+        keys, values = csv2lol(filename, header=True)
+        self.assertEquals(values, [['20111122', '23.50', 'YHOO'],
+                                   ['', '200.00', 'GOOG']])
+
+    def test_gzip(self):
+        """
+        """
+        filename = os.path.join(self.tmpdir, 'prices.csv.gz')
+        dol2csv(dict(bar=[0, 1]), filename)
+
+        with gzip.open(filename, 'rb') as f1:
+            self.assertEquals(f1.read(), 'bar\r\n0\r\n1\r\n')
+
+    def test_bz2(self):
+        """
+        """
+        filename = os.path.join(self.tmpdir, 'prices.csv')
+        dol2csv(dict(bar=[0, 1]), filename, compression='bz2')
+
+        f1 = bz2.BZ2File(filename, 'rb')
+        self.assertEquals(f1.read(), 'bar\r\n0\r\n1\r\n')
+        f1.close()
+
+    def test_compression_bad(self):
+        """
+        """
+        filename = os.path.join(self.tmpdir, 'prices.csv')
+        self.assertRaises(ValueError, dol2csv, dict(bar=[0]), filename,
+                          compression='zip')
+
+    def test_series_to_csv(self):
+        """
+        """
+        filename = os.path.join(self.tmpdir, 'prices.csv')
+        series = Series('bar', 'symbol', 'close')
+        series.from_values([[0, 'yhoo', 23.0], [1, 'goog', 200]])
+        series.to_csv(filename, columns=['symbol', 'close'],
+                      formats=dict(close='%.1f'))
+
+        keys, values = csv2lol(filename, header=True)
+        self.assertEquals(keys, ['symbol', 'close'])
+        self.assertEquals(values, [['yhoo', '23.0'], ['goog', '200.0']])
+
+    def test_series_to_csv_badkey(self):
+        """
+        """
+        filename = os.path.join(self.tmpdir, 'prices.csv')
+        series = Series('bar', 'symbol', 'close')
+        self.assertRaises(KeyError, series.to_csv, filename, ['open'])
+
+
 class Lol2dol_TestCase(unittest.TestCase):
     def setUp(self):
         pass
@@ -582,6 +1597,50 @@ class Lol2dol_TestCase(unittest.TestCase):
         self.assertEquals(dol['close'], [23.0, 200])
         self.assertEquals(len(dol), 3)
 
+    def test_lol_generator(self):
+        """
+        """
+        values = ([bar, 'yhoo', 23.0 + bar] for bar in xrange(3))
+        dol = lol2dol(values, 'bar', 'symbol', 'close')
+        self.assertEquals(dol['bar'], [0, 1, 2])
+        self.assertEquals(dol['symbol'], ['yhoo', 'yhoo', 'yhoo'])
+        self.assertEquals(dol['close'], [23.0, 24.0, 25.0])
+        self.assertEquals(len(dol), 3)
+
+    def test_lol_generator_empty(self):
+        """
+        """
+        dol = lol2dol((x for x in []), 'bar', 'close')
+        self.assertEquals(dol, dict(bar=[], close=[]))
+
+    def test_lol_ragged(self):
+        """
+        """
+        values = [[0, 'yhoo', 23.0], [1, 'goog'], [2]]
+        dol = lol2dol(values, 'bar', 'symbol', 'close')
+        self.assertEquals(dol['bar'], [0, 1, 2])
+        self.assertEquals(dol['symbol'], ['yhoo', 'goog', None])
+        self.assertEquals(dol['close'], [23.0, None, None])
+        self.assertEquals(len(dol), 3)
+
+    def test_lol_tuples(self):
+        """
+        """
+        values = [(0, 'yhoo', 23.0), (1, 'goog', 200)]
+        dol = lol2dol(values, close=2, bar=0)
+        self.assertEquals(dol['bar'], [0, 1])
+        self.assertEquals(dol['close'], [23.0, 200])
+        self.assertEquals(len(dol), 2)
+
+    def test_dol_generator_missing(self):
+        """
+        """
+        values = iter([dict(bar=0, close=23.0), dict(bar=1)])
+        dol = lol2dol(values, 'bar', 'close')
+        self.assertEquals(dol['bar'], [0, 1])
+        self.assertEquals(dol['close'], [23.0, None])
+        self.assertEquals(len(dol), 2)
+
     def test_dol_single(self):
         """
         """
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Test the counts module.
+
+"""
+
+import sys
+import os
+import unittest
+
+libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if not libpath in sys.path:
+    sys.path.insert(1, libpath)
+del libpath
+
+try:
+    import numpy
+
+except ImportError:
+    numpy = None
+
+import counts
+from column import TypedColumn
+from counts import histogram
+from counts import unique
+from counts import value_counts
+
+
+class Counts_TestCase(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def test_unique(self):
+        self.assertEquals(unique([3, 1, None, 3, 2, 1]), [3, 1, 2])
+        self.assertEquals(unique(TypedColumn('l', [2, None, 2])), [2])
+        self.assertEquals(unique([]), [])
+
+    def test_value_counts(self):
+        values = ['yhoo', 'goog', 'msft', 'goog', None, 'msft', 'goog']
+        self.assertEquals(value_counts(values),
+                          [('goog', 3), ('msft', 2), ('yhoo', 1)])
+        self.assertEquals(value_counts(TypedColumn('d', [1.0, 2.0, 1.0])),
+                          [(1.0, 2), (2.0, 1)])
+
+    def test_histogram(self):
+        values = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, None]
+        hist, edges = histogram(values, bins=5)
+        self.assertEquals(hist, [2, 2, 2, 2, 3])
+        self.assertEquals(edges, [0.0, 2.0, 4.0, 6.0, 8.0, 10.0])
+
+    def test_histogram_edges(self):
+        hist, edges = histogram([1, 5, 10, 50, 200], bins=[0, 10, 100])
+        self.assertEquals(hist, [2, 2])
+        self.assertEquals(edges, [0, 10, 100])
+        self.assertRaises(ValueError, histogram, [1], [10, 0])
+        self.assertRaises(ValueError, histogram, [1], 0)
+
+    def test_histogram_limits(self):
+        hist, edges = histogram([-5, 0, 0.5, 1, 5], bins=2, limits=(0, 1))
+        self.assertEquals(hist, [1, 2])
+        hist, edges = histogram([3, 3], bins=1)
+        self.assertEquals((hist, edges), ([2], [2.5, 3.5]))
+
+    def test_histogram_typed(self):
+        values = [float(i % 17) for i in xrange(500)] + [None]
+        expected = histogram(values, bins=7)
+        column = TypedColumn('d', values)
+        self.assertEquals(histogram(column, bins=7)[0], expected[0])
+
+        if numpy is not None:
+            saved, counts.numpy = counts.numpy, None
+            try:
+                self.assertEquals(histogram(column, bins=7)[0], expected[0])
+
+            finally:
+                counts.numpy = saved
+
+
+if __name__ == "__main__":
+    unittest.main()
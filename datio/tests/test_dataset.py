@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Test the dataset module.
+
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if not libpath in sys.path:
+    sys.path.insert(1, libpath)
+del libpath
+
+from core import Series
+from column import TypedColumn
+from dataset import Dataset
+
+
+def _series(symbol, years):
+    series = Series('dates', 'symbols', 'closes')
+    for year in years:
+        for day in (1, 2):
+            series.append([datetime(year, 1, day), symbol, year + day / 10.0])
+    series.astype('closes', 'd')
+    return series
+
+
+class Dataset_TestCase(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_write_partitions(self):
+        dataset = Dataset(self.root)
+        dataset.write('goog', _series('goog', [2009, 2010]))
+        self.assertEquals(dataset.symbols(), ['goog'])
+        years = [year for year, stats in dataset.partitions('goog')]
+        self.assertEquals(years, [2009, 2010])
+        stats = dataset.partitions('goog')[1][1]
+        self.assertEquals(stats['rows'], 2)
+        self.assertEquals(stats['min'], datetime(2010, 1, 1))
+        self.assertEquals(stats['max'], datetime(2010, 1, 2))
+        self.assertTrue(os.path.exists(os.path.join(self.root, 'goog',
+                                                    '2010.dcol')))
+
+    def test_read_all(self):
+        dataset = Dataset(self.root)
+        dataset.write('goog', _series('goog', [2009, 2010]))
+        dataset.write('yhoo', _series('yhoo', [2010]))
+
+        series = Dataset(self.root).read()
+        self.assertEquals(series.keys(), ['dates', 'symbols', 'closes'])
+        self.assertEquals(len(series), 6)
+        self.assertEquals(series.symbols, ['goog'] * 4 + ['yhoo'] * 2)
+        self.assertTrue(isinstance(series.closes, TypedColumn))
+
+    def test_read_pruned(self):
+        dataset = Dataset(self.root)
+        dataset.write('goog', _series('goog', [2008, 2009, 2010]))
+        os.remove(os.path.join(self.root, 'goog', '2008.dcol'))
+        os.remove(os.path.join(self.root, 'goog', '2010.dcol'))
+
+        series = dataset.read(['goog'], start=datetime(2009, 1, 1),
+                              end=datetime(2009, 12, 31))
+        self.assertEquals(series.closes, [2009.1, 2009.2])
+
+    def test_read_boundary(self):
+        dataset = Dataset(self.root)
+        dataset.write('goog', _series('goog', [2009, 2010]))
+
+        series = dataset.read(['goog'], start=datetime(2009, 1, 2),
+                              end=datetime(2010, 1, 1))
+        self.assertEquals(series.closes, [2009.2, 2010.1])
+
+    def test_read_columns(self):
+        dataset = Dataset(self.root)
+        dataset.write('goog', _series('goog', [2009]))
+
+        series = dataset.read(columns=['closes'], end=datetime(2009, 1, 1))
+        self.assertEquals(series.keys(), ['symbols', 'closes'])
+        self.assertEquals(series.symbols, ['goog'])
+        self.assertEquals(series.closes, [2009.1])
+
+    def test_read_symbols(self):
+        dataset = Dataset(self.root)
+        series = Series('dates', 'closes')
+        series.append([datetime(2009, 1, 1), 1.0])
+        dataset.write('goog', series)
+        dataset.write('yhoo', series)
+
+        series = dataset.read(columns=['closes', 'symbols'])
+        self.assertEquals(series.keys(), ['closes', 'symbols'])
+        self.assertEquals(series.values(), [(1.0, 'goog'), (1.0, 'yhoo')])
+
+        series = Dataset(self.root, symbolkey='ticker').read()
+        self.assertEquals(series.keys(), ['ticker', 'dates', 'closes'])
+        self.assertEquals(series.ticker, ['goog', 'yhoo'])
+        series = Dataset(self.root, symbolkey=None).read()
+        self.assertEquals(series.keys(), ['dates', 'closes'])
+
+    def test_read_none(self):
+        dataset = Dataset(self.root)
+        self.assertRaises(ValueError, dataset.read, ['goog'])
+
+    def test_write_replace(self):
+        dataset = Dataset(self.root)
+        dataset.write('goog', _series('goog', [2009, 2010]))
+        dataset.write('goog', _series('goog', [2010]))
+        self.assertEquals(len(dataset.read(['goog'])), 4)
+
+    def test_write_append(self):
+        dataset = Dataset(self.root)
+        dataset.write('goog', _series('goog', [2010]))
+        series = Series('dates', 'symbols', 'closes')
+        series.append([datetime(2010, 1, 3), 'goog', 2010.3])
+        dataset.write('goog', series, append=True)
+
+        series = dataset.read(['goog'])
+        self.assertEquals(series.closes, [2010.1, 2010.2, 2010.3])
+        stats = dataset.partitions('goog')[0][1]
+        self.assertEquals(stats['max'], datetime(2010, 1, 3))
+
+    def test_write_str_dates(self):
+        series = Series('dates', 'closes')
+        series.extend([['2009-12-31', 1.0], ['2010-01-04', 2.0]])
+        dataset = Dataset(self.root)
+        dataset.write('goog', series)
+        series = dataset.read(start='2010-01-01')
+        self.assertEquals(series.closes, [2.0])
+
+    def test_write_missing_date(self):
+        series = Series('dates', 'closes')
+        series.append([None, 1.0])
+        self.assertRaises(ValueError, Dataset(self.root).write, 'goog',
+                          series)
+
+    def test_write_bad_symbol(self):
+        dataset = Dataset(self.root)
+        series = _series('goog', [2009])
+        for symbol in ('BRK/B', '../x', '..', '', None):
+            self.assertRaises(ValueError, dataset.write, symbol, series)
+
+        self.assertEquals(os.listdir(self.root), [])
+        self.assertEquals(dataset.symbols(), [])
+
+    def test_write_missing_key(self):
+        series = Series('closes')
+        self.assertRaises(KeyError, Dataset(self.root).write, 'goog', series)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Test the journal module.
+
+"""
+
+import sys
+import os
+import shutil
+import signal
+import tempfile
+import unittest
+
+libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if not libpath in sys.path:
+    sys.path.insert(1, libpath)
+del libpath
+
+from core import Series
+from journal import Journal
+from journal import read_records
+
+
+class Journal_TestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'prices.journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_records(self):
+        jrnl = Journal(self.path)
+        jrnl.write(1, dict(bar=[0]))
+        jrnl.write(2, dict(bar=[1, 2]))
+        jrnl.close()
+
+        records = list(read_records(self.path))
+        self.assertEquals(records, [(1, 1, dict(bar=[0]), None),
+                                    (2, 2, dict(bar=[1, 2]), None)])
+
+    def test_records_skip_seq(self):
+        jrnl = Journal(self.path)
+        jrnl.write(1, dict(bar=[0]))
+        jrnl.write(1, dict(bar=[1]))
+        jrnl.close()
+
+        records = list(read_records(self.path, 1))
+        self.assertEquals(records, [(2, 1, dict(bar=[1]), None)])
+
+    def test_records_torn(self):
+        jrnl = Journal(self.path)
+        jrnl.write(1, dict(bar=[0]))
+        jrnl.write(1, dict(bar=[1]))
+        jrnl.close()
+
+        size = os.path.getsize(self.path)
+        with open(self.path, 'r+b') as f1:
+            f1.truncate(size - 3)
+
+        records = list(read_records(self.path))
+        self.assertEquals(records, [(1, 1, dict(bar=[0]), None)])
+        self.assertEquals(list(read_records(self.path)), records)
+        self.assertTrue(os.path.getsize(self.path) < size - 3)
+
+    def test_records_missing(self):
+        self.assertEquals(list(read_records(self.path)), [])
+
+
+class Series_journal_TestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'prices.journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_recover(self):
+        series = Series('bar', 'symbol', 'close')
+        series.from_values([[0, 'yhoo', 23.0]])
+        series.attach_journal(self.path)
+        series.append([1, 'goog', 200])
+        series.extend([[2, 'goog', 201], [3, 'goog', 202]])
+        series.append([4, 'goog'], 'bar', 'symbol')
+        series.close_journal()
+
+        recovered = Series.recover(self.path)
+        self.assertEquals(recovered.keys(), ['bar', 'symbol', 'close'])
+        self.assertEquals(recovered.values(), series.values())
+        self.assertEquals(len(recovered), 5)
+        recovered.close_journal()
+
+    def test_recover_live(self):
+        series = Series('bar', 'close')
+        series.attach_journal(self.path, sync_every=1)
+        series.append([0, 23.0])
+        series.append([1, 24.0])
+
+        recovered = Series.recover(self.path)
+        self.assertEquals(recovered.values(), [(0, 23.0), (1, 24.0)])
+        recovered.close_journal()
+        series.close_journal()
+
+    @unittest.skipIf(not hasattr(os, 'fork'), "needs os.fork")
+    def test_recover_killed(self):
+        pid = os.fork()
+        if not pid:
+            try:
+                series = Series('bar', 'close')
+                series.attach_journal(self.path)
+                for i in xrange(10):
+                    series.append([i, 23.0 + i])
+
+            finally:
+                os.kill(os.getpid(), signal.SIGKILL)
+
+        os.waitpid(pid, 0)
+        recovered = Series.recover(self.path)
+        self.assertEquals(len(recovered), 10)
+        self.assertEquals(recovered[9], (9, 32.0))
+        recovered.close_journal()
+
+    def test_recover_continue(self):
+        series = Series('bar', 'close')
+        series.attach_journal(self.path)
+        series.append([0, 23.0])
+        series.close_journal()
+
+        recovered = Series.recover(self.path)
+        recovered.append([1, 24.0])
+        recovered.close_journal()
+
+        recovered = Series.recover(self.path)
+        self.assertEquals(recovered.values(), [(0, 23.0), (1, 24.0)])
+        recovered.close_journal()
+
+    def test_recover_compact_every(self):
+        series = Series('bar', 'close')
+        series.attach_journal(self.path, compact_every=2)
+        for bar in xrange(5):
+            series.append([bar, 20.0 + bar])
+        series.close_journal()
+
+        self.assertEquals(len(list(read_records(self.path))), 1)
+
+        recovered = Series.recover(self.path)
+        self.assertEquals(recovered.values(), series.values())
+        recovered.close_journal()
+
+    def test_recover_newcol(self):
+        series = Series('bar', 'close')
+        series.attach_journal(self.path)
+        series.append([0, 23.0])
+        series.initcol('sma')
+        series.append([1, 24.0, 23.5])
+        series.close_journal()
+
+        recovered = Series.recover(self.path)
+        self.assertEquals(recovered.keys(), ['bar', 'close', 'sma'])
+        self.assertEquals(recovered.values(),
+                          [(0, 23.0, None), (1, 24.0, 23.5)])
+        recovered.close_journal()
+
+    def test_recover_typed(self):
+        series = Series('bar', 'close')
+        series.initcol('close', typecode='d')
+        series.attach_journal(self.path)
+        series.append([0, 23.0])
+        series.append([1])
+        series.close_journal()
+
+        recovered = Series.recover(self.path)
+        self.assertEquals(recovered.close.typecode, 'd')
+        self.assertEquals(recovered.close, [23.0, None])
+        recovered.close_journal()
+
+    def test_recover_upsert(self):
+        series = Series('bar', 'close')
+        series.astype('close', 'd')
+        series.attach_journal(self.path)
+        series.extend([[1, 10.0], [2, 20.0]])
+        series.upsert([[2, 21.0], [3, 30.0], [1, None]], key='bar')
+        series.upsert([[2, 22.0]], key='bar')
+        series.close_journal()
+
+        recovered = Series.recover(self.path)
+        self.assertEquals(recovered.values(),
+                          [(1, None), (2, 22.0), (3, 30.0)])
+        self.assertEquals(recovered.values(), series.values())
+        recovered.upsert([[3, 31.0]], key='bar')
+        recovered.close_journal()
+
+        recovered = Series.recover(self.path)
+        self.assertEquals(recovered.close, [None, 22.0, 31.0])
+        recovered.close_journal()
+
+    def test_recover_sorted(self):
+        series = Series('bar', 'close')
+        series.extend([[3, 23.0], [1, 21.0]])
+        series.attach_journal(self.path)
+        series.keep_sorted('bar')
+        series.append([2, 22.0])
+        series.extend([[5, 25.0], [0, 20.0]])
+        series.close_journal()
+
+        recovered = Series.recover(self.path)
+        self.assertEquals(recovered.bar, [0, 1, 2, 3, 5])
+        self.assertEquals(recovered.values(), series.values())
+        recovered.append([4, 24.0])
+        self.assertEquals(recovered.bar, [0, 1, 2, 3, 4, 5])
+        recovered.close_journal()
+
+    def test_recover_capacity(self):
+        series = Series('bar', 'close', capacity=2)
+        series.initcol('close', typecode='d')
+        series.attach_journal(self.path)
+        series.extend([[0, 20.0], [1, 21.0], [2, 22.0]])
+        series.close_journal()
+
+        recovered = Series.recover(self.path)
+        self.assertEquals(recovered.values(), [(1, 21.0), (2, 22.0)])
+        recovered.append([3, 23.0])
+        self.assertEquals(recovered.values(), [(2, 22.0), (3, 23.0)])
+        self.assertEquals(recovered.close.typecode, 'd')
+        recovered.compact_journal()
+        recovered.close_journal()
+
+        recovered = Series.recover(self.path)
+        self.assertEquals(recovered.values(), [(2, 22.0), (3, 23.0)])
+        recovered.close_journal()
+
+    def test_compact_no_journal(self):
+        series = Series('bar', 'close')
+        self.assertRaises(ValueError, series.compact_journal)
+
+    def test_recover_missing(self):
+        self.assertRaises(IOError, Series.recover, self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Test the lazy module.
+
+"""
+
+import sys
+import os
+import unittest
+from datetime import datetime
+
+libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if not libpath in sys.path:
+    sys.path.insert(1, libpath)
+del libpath
+
+from core import Series
+from core import between
+from column import TypedColumn
+from lazy import scan_csv
+
+FILENAME = 'testfiles/csv2dol_types.csv'
+
+
+class Scan_TestCase(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def test_collect_all(self):
+        series = scan_csv(FILENAME).collect()
+        self.assertEquals(series.keys(), ['Date', 'Open', 'Volume', 'Symbol',
+                                          'Stamp', 'Note'])
+        self.assertEquals(len(series), 4)
+        self.assertEquals(series.Open[0], '34.20')
+
+    def test_matches_eager(self):
+        scan = scan_csv(FILENAME).select('Date', 'Open')
+        scan = scan.format('Date', datetime.strptime, '%Y-%m-%d')
+        scan = scan.format('Open', float).filter('Symbol', set(['yhoo']))
+        scan = scan.filter('Open', lambda x: x > 34.5).sort('Open', order='d')
+        series = scan.collect()
+
+        eager = Series('Date', 'Open', 'Symbol')
+        eager.from_values([['2011-11-22', '34.64', 'yhoo'],
+                           ['2011-11-24', '35.01', 'yhoo']])
+        eager.format('Date', datetime.strptime, '%Y-%m-%d')
+        eager.format('Open', float)
+        eager.sort('Open', order='d')
+
+        self.assertEquals(series.keys(), ['Date', 'Open'])
+        self.assertEquals(series.Date, eager.Date)
+        self.assertEquals(series.Open, eager.Open)
+        self.assertEquals(len(series), 2)
+
+    def test_plan_pushdown(self):
+        scan = scan_csv(FILENAME).select('Open')
+        scan = scan.filter('Date', between('2011-11-22', '2011-11-23'))
+        scan = scan.format('Open', float).filter('Open', lambda x: x > 0)
+        plan = scan.plan()
+
+        self.assertEquals(plan['usecols'], ['Open', 'Date'])
+        self.assertEquals(plan['where'].keys(), ['Date'])
+        self.assertEquals([key for key, test in plan['filters']], ['Open'])
+        self.assertEquals(plan['types'], dict(Open=float))
+
+    def test_typed(self):
+        series = scan_csv(FILENAME, typed=True).select('Open') \
+            .format('Open', float).collect()
+        self.assertTrue(isinstance(series.Open, TypedColumn))
+        self.assertEquals(series.Open, [34.2, 34.64, None, 35.01])
+
+    def test_format_twice(self):
+        series = scan_csv(FILENAME).select('Volume').format('Volume', float) \
+            .format('Volume', int).collect()
+        self.assertEquals(series.Volume, [1200, 1300, 1250, None])
+
+    def test_filter_twice_raw(self):
+        scan = scan_csv(FILENAME).filter('Symbol', set(['yhoo', 'goog']))
+        scan = scan.filter('Symbol', lambda x: x != 'goog').select('Note')
+        self.assertEquals(scan.collect().Note, ['a', 'b', 'd'])
+
+    def test_infer(self):
+        scan = scan_csv(FILENAME, infer=True).select('Volume')
+        series = scan.filter('Volume', lambda x: x > 1250).collect()
+        self.assertEquals(series.Volume, [1300.0, 1250.5])
+
+    def test_types_kwarg(self):
+        scan = scan_csv(FILENAME, types={'Open': float}).select('Open')
+        series = scan.filter('Open', lambda x: x > 34.5).collect()
+        self.assertEquals(series.Open, [34.64, 35.01])
+        self.assertEquals(scan.plan()['where'], {})
+
+    def test_usecols_where_kwargs(self):
+        self.assertRaises(TypeError, scan_csv, FILENAME, usecols=['Open'])
+        self.assertRaises(TypeError, scan_csv, FILENAME, where={})
+
+    def test_scan_is_immutable(self):
+        scan = scan_csv(FILENAME)
+        scan.select('Date')
+        self.assertEquals(len(scan.collect().keys()), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
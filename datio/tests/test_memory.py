@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Test the memory module.
+
+"""
+
+import sys
+import os
+import gc
+import weakref
+import unittest
+
+libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if not libpath in sys.path:
+    sys.path.insert(1, libpath)
+del libpath
+
+from core import Series
+from column import TypedColumn
+from memory import column_usage
+from memory import live
+from memory import summary
+
+
+class Memory_TestCase(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def test_list_shallow(self):
+        values = ['goog'] * 100
+        self.assertEquals(column_usage(values), sys.getsizeof(values))
+
+    def test_list_deep(self):
+        values = ['x' * 100, 'y' * 10]
+        expected = sys.getsizeof(values) + sum(map(sys.getsizeof, values))
+        self.assertEquals(column_usage(values, deep=True), expected)
+
+    def test_list_deep_sampled(self):
+        values = ['x' * 50] * 5000
+        exact = column_usage(values, deep=True, sample=None)
+        self.assertEquals(column_usage(values, deep=True, sample=10), exact)
+
+        values = [str(i) for i in xrange(5000)]
+        exact = column_usage(values, deep=True, sample=None)
+        estimate = column_usage(values, deep=True, sample=100)
+        self.assertTrue(abs(estimate - exact) < exact * 0.05)
+
+    def test_typed(self):
+        column = TypedColumn('d', [1.0] * 1000)
+        size = column_usage(column)
+        self.assertTrue(size >= 8000)
+        self.assertEquals(column_usage(column, deep=True), size)
+
+        column.append(None)
+        self.assertTrue(column_usage(column) > size + 1000)
+
+    def test_series(self):
+        series = Series('symbols', 'closes')
+        series.from_values([['goog', 1.0]] * 10)
+        series.astype('closes', 'd')
+        usage = series.memory_usage(deep=True)
+
+        self.assertEquals(sorted(usage), ['closes', 'symbols'])
+        self.assertEquals(usage['symbols'],
+                          column_usage(series.symbols, deep=True))
+        self.assertTrue(usage['symbols'] > series.memory_usage()['symbols'])
+
+    def test_registry(self):
+        series = Series('closes')
+        series.from_values([[float(i)] for i in xrange(5000)])
+        self.assertTrue(series in live())
+
+        results = summary()
+        self.assertTrue(results[0][0] >= results[-1][0])
+        rows = [(size, barcnt, keys) for size, barcnt, keys, item in results
+                if item is series]
+        self.assertEquals(rows[0][1:], (5000, ['closes']))
+
+        ref = weakref.ref(series)
+        del series, results, item
+        gc.collect()
+        self.assertEquals(ref(), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Test the panel module.
+
+"""
+
+import sys
+import os
+import unittest
+
+libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if not libpath in sys.path:
+    sys.path.insert(1, libpath)
+del libpath
+
+try:
+    import numpy
+
+except ImportError:
+    numpy = None
+
+from core import Series
+from panel import Panel
+
+
+class Panel_TestCase(unittest.TestCase):
+    def setUp(self):
+        goog = Series('dates', 'symbols', 'closes', 'volumes')
+        goog.extend([[1, 'goog', 600.0, 10], [2, 'goog', 610.0, 12],
+                     [4, 'goog', None, 9]])
+        yhoo = Series('dates', 'closes')
+        yhoo.extend([[2, 15.0], [3, 16.0], [4, 17.0]])
+        yhoo.astype('closes', 'd')
+        msft = Series('dates', 'closes', 'volumes')
+        msft.extend([[4, 25.0, 30], [1, 26.0, 31]])
+        self.panel = Panel(dict(goog=goog, yhoo=yhoo, msft=msft))
+
+    def test_axes(self):
+        panel = self.panel
+        self.assertEquals(panel.dates, [1, 2, 3, 4])
+        self.assertEquals(panel.symbols, ['goog', 'msft', 'yhoo'])
+        self.assertEquals(panel.fields, ['closes', 'volumes'])
+        self.assertEquals(len(panel), 4)
+
+    def test_at_field(self):
+        self.assertEquals(self.panel.at(4, 'closes'), [None, 25.0, 17.0])
+        self.assertEquals(self.panel.at(1, 'volumes'), [10.0, 31.0, None])
+        self.assertRaises(KeyError, self.panel.at, 5, 'closes')
+        self.assertRaises(KeyError, self.panel.at, 4, 'opens')
+
+    def test_at(self):
+        series = self.panel.at(2)
+        self.assertEquals(series.keys(), ['symbols', 'closes', 'volumes'])
+        self.assertEquals(series.values(), [('goog', 610.0, 12.0),
+                                            ('msft', None, None),
+                                            ('yhoo', 15.0, None)])
+
+    def test_view(self):
+        view = self.panel.view('msft', 'closes')
+        self.assertEquals(view, [26.0, None, None, 25.0])
+        self.assertEquals(view[-1], 25.0)
+        self.assertEquals(view[1:], [None, None, 25.0])
+
+        view[1] = 25.5
+        self.assertEquals(self.panel.at(2, 'closes'), [610.0, 25.5, 15.0])
+        view[1] = None
+        self.assertEquals(self.panel.at(2, 'closes')[1], None)
+        self.assertRaises(KeyError, self.panel.view, 'aapl', 'closes')
+        self.assertRaises(IndexError, view.__getitem__, 4)
+
+    def test_series(self):
+        series = self.panel.series('yhoo')
+        self.assertEquals(series.keys(), ['dates', 'closes', 'volumes'])
+        self.assertEquals(series.closes, [None, 15.0, 16.0, 17.0])
+        self.assertEquals(series[3], (4, 17.0, None))
+
+        series.closes[0] = 14.0
+        self.assertEquals(self.panel.at(1, 'closes')[2], 14.0)
+
+    def test_series_aggregates(self):
+        series = self.panel.series('goog')
+        self.assertEquals(series.count('closes'), 2)
+        self.assertEquals(series.mean('closes'), 605.0)
+        self.assertEquals(series.sum('volumes'), 31.0)
+        self.assertEquals(series.min('closes'), 600.0)
+        self.assertEquals(series.max('volumes'), 12.0)
+        self.assertEquals(series.closes.count(None), 2)
+        self.assertEquals(series.closes.count(610.0), 1)
+
+    def test_rank(self):
+        self.assertEquals(self.panel.rank('closes', 4), [None, 2, 1])
+        self.assertEquals(self.panel.rank('closes', 2, descending=True),
+                          [1, None, 2])
+
+    def test_ranks(self):
+        self.panel.ranks('closes', 'closes_rank', descending=True)
+        self.assertTrue('closes_rank' in self.panel.fields)
+        self.assertEquals(self.panel.view('goog', 'closes_rank'),
+                          [1.0, 1.0, None, None])
+        self.assertEquals(self.panel.at(4, 'closes_rank'), [None, 1.0, 2.0])
+
+    def test_fields(self):
+        panel = Panel(dict(a=Series('dates', 'closes')), fields=['closes'])
+        self.assertEquals(panel.dates, [])
+        self.assertEquals(panel.fields, ['closes'])
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_to_numpy(self):
+        block = self.panel.to_numpy('closes')
+        self.assertEquals(block.shape, (4, 3))
+        self.assertEquals(list(block[:, 1]), [26.0, 0.0, 0.0, 25.0])
+        block[0, 0] = 601.0
+        self.assertEquals(self.panel.view('goog', 'closes')[0], 601.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
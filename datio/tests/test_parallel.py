@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Test the parallel module.
+
+"""
+
+import sys
+import os
+import unittest
+
+libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if not libpath in sys.path:
+    sys.path.insert(1, libpath)
+del libpath
+
+from column import TypedColumn
+from parallel import apply
+from parallel import chunks
+
+
+def spread(highs, lows):
+    return max(highs) - min(lows)
+
+
+def fail(values):
+    raise ZeroDivisionError
+
+
+class Parallel_TestCase(unittest.TestCase):
+    def setUp(self):
+        self.highs = [float(i % 17) for i in xrange(200)]
+        self.lows = [float(i % 13) for i in xrange(200)]
+
+    def test_chunks(self):
+        self.assertEquals(chunks(10, 3, 4),
+                          [(0, 4, 0), (4, 8, 2), (8, 10, 6)])
+
+    def test_serial(self):
+        results = apply(spread, [[3, 5, 4], [1, 2, 0]], window=2, workers=1)
+        self.assertEquals(results, [None, 4, 5])
+
+    def test_parallel_matches_serial(self):
+        columns = [self.highs, self.lows]
+        serial = apply(spread, columns, window=20, workers=1)
+        for chunksize in (None, 1, 7, 19, 20, 500):
+            results = apply(spread, columns, window=20, workers=3,
+                            chunksize=chunksize)
+            self.assertEquals(results, serial)
+
+    def test_parallel_typed(self):
+        columns = [TypedColumn('d', self.highs), TypedColumn('d', self.lows)]
+        serial = apply(spread, columns, window=5, workers=1)
+        self.assertEquals(apply(spread, columns, window=5, workers=2), serial)
+
+    def test_window_larger_than_rows(self):
+        results = apply(sum, [[1, 2, 3]], window=5, workers=2, chunksize=1)
+        self.assertEquals(results, [None, None, None])
+
+    def test_empty(self):
+        self.assertEquals(apply(sum, [[]], window=2, workers=2), [])
+
+    def test_badwindow(self):
+        self.assertRaises(ValueError, apply, sum, [[1]], window=0)
+
+    def test_error(self):
+        self.assertRaises(ZeroDivisionError, apply, fail, [[1, 2]],
+                          workers=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Test the records module.
+
+"""
+
+import sys
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if not libpath in sys.path:
+    sys.path.insert(1, libpath)
+del libpath
+
+import records
+from column import TypedColumn
+from records import fixed2series
+from records import struct2series
+
+LINES = ("DATE    SYM CLOSE   \n"
+         "20110103goog  604.35\n"
+         "20110104yhoo        \n"
+         "20110105msft   27.98\n")
+
+LAYOUT = [('dates', 0, 8, int), ('symbols', 8, 12), ('closes', 12, 20, float)]
+
+
+class Records_TestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'ticks')
+        self.numpy = records.numpy
+
+    def tearDown(self):
+        records.numpy = self.numpy
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, data):
+        with open(self.path, 'wb') as f1:
+            f1.write(data)
+
+    def _both(self, func, *args):
+        """
+        Returns the results of func with and without NumPy.
+        """
+        results = [func(*args)]
+        if self.numpy is not None:
+            records.numpy = None
+            results.append(func(*args))
+            records.numpy = self.numpy
+
+        return results
+
+    def test_fixed2series(self):
+        self._write(LINES)
+        for series in self._both(fixed2series, self.path, LAYOUT, 1):
+            self.assertEquals(series.keys(), ['dates', 'symbols', 'closes'])
+            self.assertEquals(len(series), 3)
+            self.assertEquals(series.dates, [20110103, 20110104, 20110105])
+            self.assertEquals(series.symbols, ['goog', 'yhoo', 'msft'])
+            self.assertEquals(series.closes, [604.35, None, 27.98])
+            self.assertTrue(isinstance(series.closes, TypedColumn))
+            self.assertEquals(series.dates.typecode, 'l')
+
+    def test_fixed2series_no_newline(self):
+        self._write(LINES.replace('\n', '\r\n').rstrip())
+        for series in self._both(fixed2series, self.path, LAYOUT[:2], 1):
+            self.assertEquals(series.symbols, ['goog', 'yhoo', 'msft'])
+
+    def test_fixed2series_errors(self):
+        self._write(LINES)
+        self.assertRaises(ValueError, fixed2series, self.path,
+                          [('closes', 12, 24, float)])
+        self.assertRaises(ValueError, fixed2series, self.path,
+                          [('closes', 12, 12, float)])
+
+    def test_struct2series(self):
+        rows = [(20110103, 'goog', 604.35, 10), (20110104, 'yh', 15.5, -3)]
+        self._write(''.join(struct.pack('<l4sdxh', *row) for row in rows))
+        for series in self._both(struct2series, self.path, '<l4sdxh',
+                                 ['dates', 'symbols', 'closes', 'volumes']):
+            self.assertEquals(series.keys(),
+                              ['dates', 'symbols', 'closes', 'volumes'])
+            self.assertEquals(series.dates, [20110103, 20110104])
+            self.assertEquals(series.symbols, ['goog', 'yh'])
+            self.assertEquals(series.closes, [604.35, 15.5])
+            self.assertEquals(series.volumes, [10, -3])
+            self.assertEquals(series.volumes.typecode, 'h')
+
+    def test_struct2series_native(self):
+        rows = [(1, 2.5, 3, 4.0), (5, 6.5, 7, 8.0)]
+        self._write(''.join(struct.pack('b d I 2f', *row[:3] + (row[3], 0))
+                            for row in rows))
+        for series in self._both(struct2series, self.path, 'b d I 2f',
+                                 ['a', None, 'c', 'd', None]):
+            self.assertEquals(series.keys(), ['a', 'c', 'd'])
+            self.assertEquals(series.a, [1, 5])
+            self.assertEquals(series.c, [3, 7])
+            self.assertEquals(series.d, [4.0, 8.0])
+
+    def test_struct2series_errors(self):
+        self._write(struct.pack('<dd', 1.0, 2.0) + 'x')
+        self.assertRaises(ValueError, struct2series, self.path, '<dd',
+                          ['a', 'b'])
+        self.assertRaises(ValueError, struct2series, self.path, '<dd', ['a'])
+        self.assertRaises(ValueError, struct2series, self.path, '<dP',
+                          ['a', 'b'])
+
+    def test_empty(self):
+        self._write('')
+        self.assertEquals(len(struct2series(self.path, 'd', ['x'])), 0)
+        self.assertEquals(len(fixed2series(self.path, [('x', 0, 1)])), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
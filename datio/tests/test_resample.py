@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Test the resample module.
+
+"""
+
+import sys
+import os
+import random
+import unittest
+
+libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if not libpath in sys.path:
+    sys.path.insert(1, libpath)
+del libpath
+
+from column import TypedColumn
+from resample import positions
+from resample import resample_paths
+
+
+def last(values):
+    return values[-1]
+
+
+def fail(values):
+    raise ZeroDivisionError
+
+
+class Resample_TestCase(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(3)
+        self.returns = [rand.gauss(0, 0.01) for i in xrange(300)]
+
+    def test_positions_block(self):
+        results = positions(10, 'block', 4, random.Random(1))
+        self.assertEquals(len(results), 10)
+        for start in (0, 4):
+            first = results[start]
+            self.assertEquals(results[start:start + 4],
+                              range(first, first + 4))
+            self.assertTrue(0 <= first <= 6)
+
+        self.assertEquals(positions(3, 'block', 5, random.Random(1)),
+                          [0, 1, 2])
+
+    def test_positions_iid_shuffle(self):
+        results = positions(50, 'iid', rand=random.Random(2))
+        self.assertEquals(len(results), 50)
+        self.assertTrue(all(0 <= x < 50 for x in results))
+        results = positions(50, 'shuffle', rand=random.Random(2))
+        self.assertEquals(sorted(results), range(50))
+        self.assertRaises(ValueError, positions, 5, 'jackknife')
+        self.assertRaises(ValueError, positions, 5, 'block', 0)
+
+    def test_aggregates(self):
+        results = resample_paths(self.returns, 200, 'iid', seed=5,
+                                 quantiles=[0, 0.5, 1])
+        self.assertEquals(results['paths'], 200)
+        stats = self._stats(self.returns, 200, 'iid', 20, 5)
+        mean = sum(stats) / len(stats)
+        std = (sum((x - mean) ** 2 for x in stats) / (len(stats) - 1)) ** 0.5
+        self.assertAlmostEquals(results['mean'], mean)
+        self.assertAlmostEquals(results['std'], std)
+        self.assertEquals(results['min'], min(stats))
+        self.assertEquals(results['max'], max(stats))
+        self.assertEquals(results['quantiles'][0], min(stats))
+        self.assertEquals(results['quantiles'][2], max(stats))
+        self.assertFalse('quantiles' in resample_paths(self.returns, 2))
+
+    def _stats(self, values, n_paths, method, block, seed):
+        """
+        Returns the stat of every path drawn one at a time.
+        """
+        master = random.Random(seed)
+        seeds = [master.getrandbits(64) for i in xrange(n_paths)]
+        return [sum(values[i] for i in positions(len(values), method, block,
+                                                 random.Random(s)))
+                for s in seeds]
+
+    def test_shuffle_sum(self):
+        results = resample_paths(self.returns, 20, 'shuffle', seed=1,
+                                 stat=last)
+        self.assertTrue(results['std'] > 0)
+        results = resample_paths([1, 2, 3, None], 20, 'shuffle')
+        self.assertEquals((results['min'], results['max']), (6, 6))
+
+    def test_reproducible(self):
+        column = TypedColumn('d', self.returns + [None])
+        serial = resample_paths(self.returns, 250, seed=7, quantiles=[0.05])
+        self.assertEquals(resample_paths(column, 250, seed=7,
+                                         quantiles=[0.05]), serial)
+        self.assertEquals(resample_paths(column, 250, seed=7, workers=3,
+                                         quantiles=[0.05]), serial)
+        self.assertNotEquals(resample_paths(column, 250, seed=8), serial)
+
+    def test_errors(self):
+        self.assertRaises(ValueError, resample_paths, self.returns, 0)
+        self.assertRaises(ValueError, resample_paths, [None], 1)
+        self.assertRaises(ValueError, resample_paths, self.returns, 1,
+                          'jackknife')
+        self.assertRaises(ValueError, resample_paths, self.returns, 1,
+                          quantiles=[2])
+        self.assertRaises(ZeroDivisionError, resample_paths, self.returns,
+                          300, stat=fail, workers=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Test the rolling module.
+
+"""
+
+import sys
+import os
+import random
+import unittest
+
+libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if not libpath in sys.path:
+    sys.path.insert(1, libpath)
+del libpath
+
+from column import TypedColumn
+from rolling import IndexableSkiplist
+from rolling import rolling_mean
+from rolling import rolling_median
+from rolling import rolling_quantile
+from rolling import rolling_rank
+from rolling import rolling_sum
+
+
+def brute_quantile(values, window, q):
+    """
+    Returns the rolling quantile by sorting every window.
+    """
+    results = []
+    for i in xrange(len(values)):
+        valid = sorted(x for x in values[max(i - window + 1, 0):i + 1]
+                       if x is not None)
+        if i < window - 1 or not valid:
+            results.append(None)
+            continue
+
+        position = (len(valid) - 1) * q
+        k = int(position)
+        if position == k:
+            results.append(valid[k])
+
+        else:
+            lower, upper = valid[k], valid[k + 1]
+            results.append(lower + (upper - lower) * (position - k))
+
+    return results
+
+
+def brute_rank(values, window):
+    """
+    Returns the rolling rank by counting every window.
+    """
+    results = []
+    for i, x in enumerate(values):
+        valid = [v for v in values[max(i - window + 1, 0):i + 1]
+                 if v is not None]
+        if i < window - 1 or x is None:
+            results.append(None)
+            continue
+
+        below = sum(1 for v in valid if v < x)
+        equal = sum(1 for v in valid if v == x)
+        results.append(below + (equal + 1) / 2.0)
+
+    return results
+
+
+class Rolling_TestCase(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def test_sum(self):
+        results = rolling_sum([1, 2, 3, 4], 3)
+        self.assertEquals(results, [None, None, 6, 9])
+
+    def test_sum_nulls(self):
+        results = rolling_sum([1, None, 3, None, None, 6], 2)
+        self.assertEquals(results, [None, 1, 3, 3, None, 6])
+
+    def test_sum_typed(self):
+        column = TypedColumn('l', [1, None, 3, 4])
+        results = rolling_sum(column, 2)
+        self.assertTrue(isinstance(results, TypedColumn))
+        self.assertEquals(results.typecode, 'l')
+        self.assertEquals(results, [None, 1, 3, 7])
+
+    def test_mean(self):
+        results = rolling_mean([1.0, 2.0, 3.0, 4.0], 2)
+        self.assertEquals(results, [None, 1.5, 2.5, 3.5])
+
+    def test_mean_nulls_typed(self):
+        column = TypedColumn('d', [1.0, None, 3.0, 5.0])
+        results = rolling_mean(column, 3)
+        self.assertEquals(results.typecode, 'd')
+        self.assertEquals(results, [None, None, 2.0, 4.0])
+
+    def test_sum_floats_exact(self):
+        results = rolling_sum([1e16, 1.0, 1.0, 1.0], 2)
+        self.assertEquals(results, [None, 1e16, 2.0, 2.0])
+        column = TypedColumn('d', [1e16, 1.0, None, 1.0, 1.0])
+        self.assertEquals(rolling_mean(column, 2),
+                          [None, 5e15, 1.0, 1.0, 1.0])
+
+    def test_sum_nan_leaves_window(self):
+        nan = float('nan')
+        results = rolling_sum([1.0, nan, 2.0, 3.0], 2)
+        self.assertTrue(results[1] != results[1])
+        self.assertTrue(results[2] != results[2])
+        self.assertEquals(results[3], 5.0)
+
+        inf = float('inf')
+        results = rolling_mean([1.0, inf, 2.0, -inf, 3.0, 4.0], 2)
+        self.assertEquals(results[1:3], [inf, inf])
+        self.assertTrue(results[3] == -inf and results[4] == -inf)
+        self.assertEquals(results[5], 3.5)
+
+    def test_window_short(self):
+        self.assertEquals(rolling_mean([1.0, 2.0], 3), [None, None])
+
+    def test_window_bad(self):
+        self.assertRaises(ValueError, rolling_sum, [1, 2], 0)
+        self.assertRaises(ValueError, rolling_median, [1, 2], 0)
+        self.assertRaises(ValueError, rolling_quantile, [1, 2], 2, 1.5)
+
+    def test_median(self):
+        results = rolling_median([3, 1, 2, 5, 4], 3)
+        self.assertEquals(results, [None, None, 2, 2, 4])
+        results = rolling_median([3, 1, None, 5, 4], 2)
+        self.assertEquals(results, [None, 2.0, 1, 5, 4.5])
+        self.assertEquals(rolling_median([None, None, 1], 2), [None, None, 1])
+
+    def test_order_typed(self):
+        column = TypedColumn('l', [3, 1, None, 5])
+        results = rolling_quantile(column, 2, 0.25)
+        self.assertEquals(results.typecode, 'd')
+        self.assertEquals(results, [None, 1.5, 1, 5])
+        self.assertEquals(rolling_rank(column, 2), [None, 1.0, None, 1.0])
+
+    def test_order_brute(self):
+        rand = random.Random(7)
+        values = [rand.choice([None, rand.randint(0, 9), rand.random()])
+                  for i in xrange(500)]
+        for window in (1, 2, 5, 30):
+            for q in (0, 0.1, 0.5, 0.9, 1):
+                self.assertEquals(rolling_quantile(values, window, q),
+                                  brute_quantile(values, window, q))
+
+            self.assertEquals(rolling_rank(values, window),
+                              brute_rank(values, window))
+
+
+class Skiplist_TestCase(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def test_skiplist(self):
+        rand = random.Random(11)
+        skiplist = IndexableSkiplist(50)
+        values = []
+        for i in xrange(2000):
+            if values and rand.random() < 0.45:
+                x = values.pop(rand.randrange(len(values)))
+                skiplist.remove(x)
+
+            else:
+                x = rand.randint(0, 40)
+                values.append(x)
+                skiplist.insert(x)
+
+            expected = sorted(values)
+            self.assertEquals(len(skiplist), len(expected))
+            if expected:
+                k = rand.randrange(len(expected))
+                self.assertEquals(skiplist[k], expected[k])
+                self.assertEquals(skiplist[-1], expected[-1])
+
+            x = rand.randint(0, 40)
+            self.assertEquals(skiplist.bisect_left(x),
+                              sum(1 for v in expected if v < x))
+            self.assertEquals(skiplist.bisect_right(x),
+                              sum(1 for v in expected if v <= x))
+
+        self.assertEquals(list(skiplist), sorted(values))
+
+    def test_skiplist_errors(self):
+        skiplist = IndexableSkiplist()
+        skiplist.insert(1.0)
+        self.assertRaises(ValueError, skiplist.remove, 2.0)
+        self.assertRaises(IndexError, skiplist.__getitem__, 1)
+        skiplist.remove(1)
+        self.assertRaises(ValueError, skiplist.remove, 1)
+        self.assertEquals(list(skiplist), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
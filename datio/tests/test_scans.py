@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011, Mike Taylor
+#
+# This file is part of datio released under MIT license.
+# See the LICENSE for more information.
+"""
+
+Test the scans module.
+
+"""
+
+import sys
+import os
+import random
+import unittest
+
+libpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if not libpath in sys.path:
+    sys.path.insert(1, libpath)
+del libpath
+
+try:
+    import numpy
+
+except ImportError:
+    numpy = None
+
+import scans
+from column import TypedColumn
+from scans import CumMax
+from scans import CumSum
+from scans import Drawdown
+from scans import PctChange
+from scans import Shift
+from scans import cummax
+from scans import cumsum
+from scans import drawdown
+from scans import pct_change
+from scans import shift
+
+
+class Scans_TestCase(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def test_cumsum(self):
+        self.assertEquals(cumsum([1, None, 2, 3]), [1, None, 3, 6])
+        self.assertEquals(cumsum([]), [])
+
+    def test_cumsum_typed(self):
+        results = cumsum(TypedColumn('l', [1, None, 2]))
+        self.assertTrue(isinstance(results, TypedColumn))
+        self.assertEquals(results.typecode, 'l')
+        self.assertEquals(results, [1, None, 3])
+
+    def test_cummax(self):
+        self.assertEquals(cummax([None, 2, 1, 5, 4]), [None, 2, 2, 5, 5])
+
+    def test_drawdown(self):
+        results = drawdown(TypedColumn('l', [0, 100, 50, None, 200]))
+        self.assertEquals(results.typecode, 'd')
+        self.assertEquals(results, [None, 0.0, -0.5, None, 0.0])
+
+    def test_pct_change(self):
+        self.assertEquals(pct_change([1, 2, 3, 0, 5], 2),
+                          [None, None, 2.0, -1.0, 5 / 3.0 - 1])
+        self.assertRaises(ValueError, pct_change, [1], 0)
+
+    def test_shift(self):
+        self.assertEquals(shift([1, 2, 3], 0), [1, 2, 3])
+        self.assertEquals(shift([1, 2, 3], 2), [None, None, 1])
+        self.assertEquals(shift([1, 2, 3], -5), [None, None, None])
+        self.assertEquals(shift(TypedColumn('d', [1.0, 2.0]), -1),
+                          [2.0, None])
+        self.assertRaises(ValueError, Shift, -1)
+
+    def test_update_matches_bulk(self):
+        values = [3, None, 5, 2, 8, None, 1, 9]
+        for scan, func in ((CumSum(), cumsum),
+                           (PctChange(2), lambda x: pct_change(x, 2)),
+                           (Shift(3), lambda x: shift(x, 3))):
+            results = []
+            for i in xrange(0, len(values), 3):
+                results.extend(scan.update(values[i:i + 3]))
+
+            self.assertEquals(results, func(values))
+            scan.reset()
+            self.assertEquals(scan.update(values), func(values))
+
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class Scans_numpy_TestCase(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(5)
+        self.columns = []
+        for typecode in 'dfl':
+            values = [rand.choice([None, 0, rand.randint(-50, 50),
+                                   rand.uniform(1, 100)])
+                      for i in xrange(300)]
+            if typecode == 'l':
+                values = [None if x is None else int(x) for x in values]
+
+            self.columns.append(TypedColumn(typecode, values))
+
+        self.columns.append(TypedColumn('d', [1.5, 2.5]))
+        self.columns.append(TypedColumn('l', [None, None, None]))
+
+    def _scans(self):
+        return [CumSum(), CumMax(), Drawdown(), PctChange(), PctChange(4)]
+
+    def test_bulk_matches_update(self):
+        for column in self.columns:
+            for scan in self._scans():
+                results = scan.run(column)
+                scan.reset()
+                expected = scan.result(column, scan.update(column))
+                self.assertEquals(results.typecode, expected.typecode)
+                self.assertEquals(results, expected)
+                self.assertEquals(results.nullmask(), expected.nullmask())
+
+    def test_bulk_then_update(self):
+        column = self.columns[0]
+        for scan in self._scans():
+            scan.run(TypedColumn('d', column[:200]))
+            results = scan.update(column[200:])
+            scan.reset()
+            self.assertEquals(results, scan.update(column)[200:])
+
+    def test_bulk_int_overflow(self):
+        column = TypedColumn('l', [2 ** 61, 2 ** 61, None, -2 ** 62])
+        self.assertEquals(cumsum(column), [2 ** 61, 2 ** 62, None, 0])
+        scan = CumSum()
+        scan.run(column)
+        self.assertEquals(scan.update([2 ** 63]), [2 ** 63])
+
+        column = TypedColumn('l', [2 ** 62, 2 ** 62])
+        self.assertRaises(OverflowError, cumsum, column)
+
+    def test_no_numpy(self):
+        saved, scans.numpy = scans.numpy, None
+        try:
+            for column in self.columns:
+                expected = cumsum(column)
+                scans.numpy = saved
+                self.assertEquals(cumsum(column), expected)
+                scans.numpy = None
+
+        finally:
+            scans.numpy = saved
+
+
+if __name__ == "__main__":
+    unittest.main()